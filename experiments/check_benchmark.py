@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+#
+# Measure the overhead of check sequence validation on file_resolver and
+# file_duplicates for each check seq mode.
+#
+#   PYTHONPATH=lib python experiments/check_benchmark.py --num-files 20000
+
+import argparse
+import os.path as path
+import shutil
+import tempfile
+import time
+
+from bes.fs.file_duplicates import file_duplicates
+from bes.fs.file_duplicates_options import file_duplicates_options
+from bes.fs.file_resolver import file_resolver
+from bes.fs.file_resolver_options import file_resolver_options
+from bes.fs.file_util import file_util
+from bes.system.check import check
+
+def _make_tree(root_dir, num_files):
+  for i in range(0, num_files):
+    filename = path.join(root_dir, 'dir{}'.format(i % 100), 'file{}.txt'.format(i))
+    # unique sizes so file_duplicates does not need full checksums
+    file_util.save(filename, content = 'x' * (i + 1))
+
+def _time(func, num_iterations):
+  # warm up the os file caches
+  func()
+  best = None
+  for _ in range(0, num_iterations):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  return best
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--num-files', action = 'store', type = int, default = 10000)
+  parser.add_argument('--iterations', action = 'store', type = int, default = 3)
+  args = parser.parse_args()
+
+  tmp_dir = tempfile.mkdtemp(prefix = 'check_benchmark_')
+  try:
+    _make_tree(tmp_dir, args.num_files)
+    resolver_options = file_resolver_options(recursive = True)
+    dups_options = file_duplicates_options(recursive = True)
+    benchmarks = [
+      ( 'file_resolver', lambda: file_resolver.resolve_files([ tmp_dir ], options = resolver_options) ),
+      ( 'file_duplicates', lambda: file_duplicates.find_duplicates([ tmp_dir ], options = dups_options) ),
+    ]
+    old_mode = check.get_seq_mode()
+    try:
+      for label, func in benchmarks:
+        results = {}
+        for mode in check.SEQ_MODES:
+          check.set_seq_mode(mode)
+          results[mode] = _time(func, args.iterations)
+        full = results[check.SEQ_FULL]
+        for mode in check.SEQ_MODES:
+          print('{:>16} {:>7} {:8.3f}s {:6.1f}%'.format(label, mode, results[mode], 100.0 * results[mode] / full))
+    finally:
+      check.set_seq_mode(old_mode)
+  finally:
+    shutil.rmtree(tmp_dir)
+  return 0
+
+if __name__ == '__main__':
+  raise SystemExit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+#
+# Compare file_find.remove_empty_dirs with the old implementation that
+# re-ran find_empty_dirs until nothing was left on a synthetic tree of deep
+# empty hierarchies next to a few regular files.
+#
+#   PYTHONPATH=lib python experiments/remove_empty_dirs_benchmark.py --depth 30 --width 50
+
+import argparse
+import os
+import os.path as path
+import shutil
+import tempfile
+import time
+
+from bes.fs.dir_util import dir_util
+from bes.fs.file_find import file_find
+from bes.fs.file_util import file_util
+
+def _make_tree(root_dir, depth, width):
+  for i in range(0, width):
+    parts = [ 'd{}_{}'.format(i, level) for level in range(0, depth) ]
+    os.makedirs(path.join(root_dir, *parts))
+    file_util.save(path.join(root_dir, 'keep{}'.format(i), 'file.txt'), content = 'x')
+
+def _old_remove_empty_dirs(root_dir):
+  result = []
+  while True:
+    empties = file_find.find_empty_dirs(root_dir, relative = False)
+    if not empties:
+      break
+    for next_empty in empties:
+      dir_util.remove(next_empty)
+      result.append(next_empty)
+  return sorted(result)
+
+def _time(func, root_dir, depth, width):
+  _make_tree(root_dir, depth, width)
+  start = time.perf_counter()
+  removed = func(root_dir)
+  return time.perf_counter() - start, len(removed)
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--depth', action = 'store', type = int, default = 30)
+  parser.add_argument('--width', action = 'store', type = int, default = 50)
+  args = parser.parse_args()
+
+  tmp_dir = tempfile.mkdtemp(prefix = 'remove_empty_dirs_benchmark_')
+  try:
+    for label, func in [ ( 'old', _old_remove_empty_dirs ), ( 'new', file_find.remove_empty_dirs ) ]:
+      root_dir = path.join(tmp_dir, label)
+      elapsed, num_removed = _time(func, root_dir, args.depth, args.width)
+      print('{:>4} {:8.3f}s removed {}'.format(label, elapsed, num_removed))
+  finally:
+    shutil.rmtree(tmp_dir)
+  return 0
+
+if __name__ == '__main__':
+  raise SystemExit(main())
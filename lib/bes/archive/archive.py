@@ -1,7 +1,10 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import os, os.path as path, shutil, sys
+import hashlib
+import time
+import os, os.path as path, shutil, stat, sys
 from abc import abstractmethod, ABCMeta
+from contextlib import contextmanager
 
 from ..system.check import check
 from bes.common.algorithm import algorithm
@@ -17,12 +20,17 @@ from bes.match.matcher_always_false import matcher_always_false
 from bes.match.matcher_always_true import matcher_always_true
 from bes.match.matcher_util import matcher_util
 from bes.system.compat import with_metaclass
+from bes.system.log import logger
 
 from .archive_base import archive_base
+from .archive_extract_stats import archive_extract_stats
+from .archive_member_info import archive_member_info
 
 class archive(archive_base):
   'An archive interface.'
 
+  _log = logger('archive')
+
   def __init__(self, filename):
     check.check_string(filename)
     self.filename = filename
@@ -35,19 +43,33 @@ class archive(archive_base):
     '''
     return self._normalize_members(self._get_members())
 
+  def member_infos(self):
+    '''
+    Return a list of archive_member_info for the members sorted by member.
+    The default has no sizes or offsets.  Archive formats that can provide them
+    override _get_member_infos().
+    '''
+    infos = {}
+    for info in self._get_member_infos():
+      infos[info.member] = info
+    return [ infos[member] for member in sorted(infos.keys()) ]
+
+  def _get_member_infos(self):
+    return [ archive_member_info(member) for member in self._get_members() ]
+
   @cached_property
   def file_members(self):
     '''
     Return just file members.  cached using same rules as members()
     '''
-    return [ member for member in self.members() if not member.endswith('/') ]
+    return [ member for member in self.members if not member.endswith('/') ]
 
   @cached_property
   def dir_members(self):
     '''
     Return just dir members.  cached using same rules as members()
     '''
-    return [ member for member in self.members() if member.endswith('/') ]
+    return [ member for member in self.members if member.endswith('/') ]
   
   def extract_member_to_file(self, member, filename):
     tmp_dir = temp_file.make_temp_dir()
@@ -65,7 +87,81 @@ class archive(archive_base):
     result = file_util.read(tmp_file, codec = codec)
     file_util.remove(tmp_file)
     return result
-    
+
+  @contextmanager
+  def open_member(self, member):
+    '''
+    Return a context manager with a binary file object for reading member.
+    The default extracts member to a temp file.  Archive formats that can read
+    members straight from the archive override this.
+    '''
+    if not member in self.members:
+      raise IOError('member not found: {}'.format(member))
+    if member.endswith('/'):
+      raise IOError('member is not a file: {}'.format(member))
+    tmp_file = temp_file.make_temp_file()
+    try:
+      self.extract_member_to_file(member, tmp_file)
+      with open(tmp_file, 'rb') as fin:
+        yield fin
+    finally:
+      file_util.remove(tmp_file)
+
+  def member_checksum(self, member, hash_algorithm = 'sha256'):
+    'Return the hex checksum of member.'
+    return self.member_checksums([ member ], hash_algorithm = hash_algorithm)[member]
+
+  def member_checksums(self, members, hash_algorithm = 'sha256'):
+    '''
+    Return a dict of member to hex checksum for members.  Raises IOError if a
+    member is missing or is not a file.
+    '''
+    check.check_string_seq(members)
+    check.check_string(hash_algorithm)
+
+    result = {}
+    for member in members:
+      with self.open_member(member) as fin:
+        result[member] = self._hash_stream(fin, hash_algorithm)
+    return result
+
+  _HASH_CHUNK_SIZE = 1024 * 1024
+  @classmethod
+  def _hash_stream(clazz, fin, hash_algorithm):
+    hasher = hashlib.new(hash_algorithm)
+    for chunk in iter(lambda: fin.read(clazz._HASH_CHUNK_SIZE), b''):
+      hasher.update(chunk)
+    return hasher.hexdigest()
+
+  # True if apply_edits() is implemented
+  can_apply_edits = False
+
+  def apply_edits(self, edits):
+    '''
+    Apply an archive_edits to the archive in place by rewriting it entry by
+    entry without unpacking it.
+    '''
+    raise NotImplementedError()
+
+  def _replace_with(self, tmp_filename):
+    'Replace the archive with tmp_filename keeping its permissions.'
+    os.chmod(tmp_filename, stat.S_IMODE(os.stat(self.filename).st_mode))
+    os.replace(tmp_filename, self.filename)
+    self._forget_members()
+
+  def _make_rewrite_temp_file(self):
+    'Return a temp file next to the archive to rewrite it into.'
+    filename = path.abspath(self.filename)
+    return temp_file.make_temp_file(prefix = path.basename(filename) + '.',
+                                    suffix = '.tmp',
+                                    dir = path.dirname(filename),
+                                    delete = False)
+
+  def _forget_members(self):
+    'Forget the cached members after the archive changed.'
+    for key in [ 'members', 'file_members', 'dir_members' ]:
+      self.__dict__.pop(key, None)
+
   def common_base(self):
     'Return a common base dir for the archive or None if no common base exists.'
     return self._common_base_for_members(self.members)
@@ -123,6 +219,76 @@ class archive(archive_base):
     file_util.mkdir(dest_dir)
     return dest_dir
 
+  # Number of threads for writing files when the format allows random access
+  DEFAULT_EXTRACT_NUM_THREADS = 4
+
+  def _extract_members(self, members, dest_dir, base_dir, strip_common_ancestor, strip_head, num_threads):
+    '''
+    Extract members straight to their final paths and return archive_extract_stats.
+    base_dir, strip_common_ancestor and strip_head are resolved up front
+    instead of moving files around after extracting.
+    '''
+    check.check_int(num_threads, allow_none = True)
+
+    start = time.time()
+    dest_dir = self._determine_dest_dir(dest_dir, base_dir)
+    targets = self._extract_targets(members, dest_dir, strip_common_ancestor, strip_head)
+    num_threads = max(1, num_threads or self.DEFAULT_EXTRACT_NUM_THREADS)
+    num_files, num_bytes = self._write_targets(targets, dest_dir, num_threads)
+    stats = archive_extract_stats(num_files, num_bytes, time.time() - start)
+    self._log.log_d('extract: {}: {}', self.filename, stats)
+    return stats
+
+  def _write_targets(self, targets, dest_dir, num_threads):
+    '''
+    Write each member in targets, a dict of member to absolute filename, and
+    return ( num_files, num_bytes ).
+    '''
+    raise NotImplementedError()
+
+  @classmethod
+  def _extract_targets(clazz, members, dest_dir, strip_common_ancestor, strip_head):
+    'Return a dict of member to the absolute filename it is extracted to.'
+    common_base = None
+    if strip_common_ancestor:
+      common_base = clazz._common_base_for_members(members)
+    abs_dest_dir = path.abspath(dest_dir)
+    result = {}
+    for member in members:
+      is_dir = member.endswith('/')
+      filename = path.normpath(member)
+      filename = clazz._strip_dir(filename, common_base, is_dir)
+      filename = clazz._strip_dir(filename, strip_head, is_dir)
+      if filename in [ '', '.' ]:
+        continue
+      target = path.normpath(path.join(abs_dest_dir, filename))
+      if not target.startswith(abs_dest_dir + os.sep):
+        raise RuntimeError('Member would be extracted outside of {}: {}'.format(dest_dir, member))
+      result[member] = target
+    return result
+
+  @classmethod
+  def _strip_dir(clazz, filename, d, is_dir):
+    'Strip dir d from the head of filename.  A dir member that is d itself goes away.'
+    if not d:
+      return filename
+    d = path.normpath(d)
+    if filename == d:
+      return '' if is_dir else filename
+    if filename.startswith(d + os.sep):
+      return filename[len(d) + 1:]
+    return filename
+
+  @classmethod
+  def _make_target_dirs(clazz, targets):
+    'Create the dirs for targets.  Dir members end in "/".'
+    dirs = set()
+    for member, target in targets.items():
+      dirs.add(target if member.endswith('/') else path.dirname(target))
+    for d in sorted(dirs):
+      if not path.isdir(d):
+        os.makedirs(d, exist_ok = True)
+
   @classmethod
   def _handle_extract_strip_common_ancestor(clazz, members, strip_common_ancestor, strip_head, dest_dir):
     if strip_common_ancestor:
@@ -38,7 +38,7 @@ class archive_base(with_metaclass(ABCMeta, object)):
 
   @abstractmethod
   def extract_all(self, dest_dir, base_dir = None,
-                  strip_common_ancestor = False, strip_head = None):
+                  strip_common_ancestor = False, strip_head = None, num_threads = None):
     '''
     Extract all contents.
     
@@ -48,16 +48,17 @@ class archive_base(with_metaclass(ABCMeta, object)):
       strip_common_ancestor: If True and *all* filenames have a common ancestor
         the common ancestor will be stripped from each filename.
       strip_head: If given, this string will be stripped from the head of each filename
+      num_threads: Number of threads for writing files when the format allows it (optional)
 
     Returns:
-        None
+        An archive_extract_stats or None if the format does not keep stats
     '''
     raise NotImplementedError()
 
   @abstractmethod
   def extract(self, dest_dir, base_dir = None,
               strip_common_ancestor = False, strip_head = None,
-              include = None, exclude = None):
+              include = None, exclude = None, num_threads = None):
     '''
     Extract only some contents.
     
@@ -69,9 +70,10 @@ class archive_base(with_metaclass(ABCMeta, object)):
       strip_head: If given, this string will be stripped from the head of each filename
       include: Optional list of filenames to explicitly include in the extraction.
       exclude: Optional list of filenames to explicitly exclude in the extraction.
+      num_threads: Number of threads for writing files when the format allows it (optional)
 
     Returns:
-        None
+        An archive_extract_stats or None if the format does not keep stats
     '''
     raise NotImplementedError()
 
@@ -79,5 +81,9 @@ class archive_base(with_metaclass(ABCMeta, object)):
   def create(self, root_dir, base_dir = None,
              extra_items = None,
              include = None, exclude = None,
-             extension = None):
+             extension = None, compression_level = None, num_threads = None):
+    '''
+    Create the archive from the files in root_dir.  compression_level and
+    num_threads tune compression for formats that support them.
+    '''
     raise NotImplementedError()
@@ -0,0 +1,175 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import bz2
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import io
+import lzma
+import os
+import subprocess
+
+from bes.system.check import check
+from bes.system.log import logger
+from bes.system.which import which
+
+class archive_compressor(object):
+  '''
+  Multi threaded gzip, bz2 and xz compression for writing archives.
+
+  The data is cut into blocks that are compressed concurrently and written as
+  consecutive gzip members or bz2/xz streams.  The standard gzip, bz2 and lzma
+  modules (and so tarfile) read such files like any other.  When a local pigz,
+  pbzip2 or xz program is found and external programs are allowed it is used
+  instead.
+  '''
+
+  _log = logger('archive_compressor')
+
+  GZ = 'gz'
+  BZ2 = 'bz2'
+  XZ = 'xz'
+  COMPRESSIONS = frozenset([ GZ, BZ2, XZ ])
+
+  # The default levels match the tarfile defaults so output sizes are comparable
+  DEFAULT_LEVELS = {
+    GZ: 9,
+    BZ2: 9,
+    XZ: 6,
+  }
+
+  DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+  @classmethod
+  def default_num_threads(clazz):
+    return os.cpu_count() or 1
+
+  @classmethod
+  def open(clazz, fileobj, compression, level = None, num_threads = None,
+           block_size = None, use_external = True):
+    '''
+    Return a writable binary file object that compresses into fileobj, an open
+    binary file.  fileobj is not closed when the returned object is closed.
+    '''
+    check.check_string(compression)
+    check.check_int(level, allow_none = True)
+    check.check_int(num_threads, allow_none = True)
+    check.check_int(block_size, allow_none = True)
+    check.check_bool(use_external)
+
+    if not compression in clazz.COMPRESSIONS:
+      raise ValueError('Unknown compression: {}'.format(compression))
+    level = clazz.DEFAULT_LEVELS[compression] if level is None else level
+    num_threads = max(1, num_threads or clazz.default_num_threads())
+    block_size = block_size or clazz.DEFAULT_BLOCK_SIZE
+    if use_external:
+      cmd = clazz._external_command(compression, level, num_threads)
+      if cmd:
+        clazz._log.log_d('open: using {}', ' '.join(cmd))
+        return _pipe_compressor_writer(fileobj, cmd)
+    compress_func = clazz._compress_function(compression, level)
+    clazz._log.log_d('open: {} level {} with {} threads', compression, level, num_threads)
+    return _block_compressor_writer(fileobj, compress_func, num_threads, block_size)
+
+  @classmethod
+  def _compress_function(clazz, compression, level):
+    if compression == clazz.GZ:
+      return lambda data: gzip.compress(data, compresslevel = level, mtime = 0)
+    elif compression == clazz.BZ2:
+      return lambda data: bz2.compress(data, compresslevel = level)
+    elif compression == clazz.XZ:
+      return lambda data: lzma.compress(data, format = lzma.FORMAT_XZ, preset = level)
+    assert False
+
+  # External programs are only used with more than one thread
+  _EXTERNAL_PROGRAMS = {
+    GZ: [ ( 'pigz', [ '-p', '{num_threads}', '-{level}', '-c' ] ) ],
+    BZ2: [ ( 'pbzip2', [ '-p{num_threads}', '-{level}', '-c' ] ) ],
+    XZ: [ ( 'xz', [ '-T', '{num_threads}', '-{level}', '-c' ] ) ],
+  }
+
+  @classmethod
+  def _external_command(clazz, compression, level, num_threads):
+    if num_threads == 1:
+      return None
+    for program, args in clazz._EXTERNAL_PROGRAMS[compression]:
+      exe = which.which(program)
+      if exe:
+        return [ exe ] + [ arg.format(num_threads = num_threads, level = level) for arg in args ]
+    return None
+
+class _block_compressor_writer(io.RawIOBase):
+  'Compress fixed size blocks on a thread pool and write them in order.'
+
+  def __init__(self, fileobj, compress_func, num_threads, block_size):
+    self._fileobj = fileobj
+    self._compress_func = compress_func
+    self._block_size = block_size
+    self._max_pending = num_threads * 2
+    self._executor = ThreadPoolExecutor(max_workers = num_threads)
+    self._pending = deque()
+    self._buffer = bytearray()
+    self._position = 0
+
+  def writable(self):
+    return True
+
+  def tell(self):
+    return self._position
+
+  def write(self, data):
+    self._buffer += data
+    self._position += len(data)
+    while len(self._buffer) >= self._block_size:
+      self._submit(bytes(self._buffer[0:self._block_size]))
+      del self._buffer[0:self._block_size]
+    return len(data)
+
+  def close(self):
+    if self.closed:
+      return
+    try:
+      if self._buffer or self._position == 0:
+        self._submit(bytes(self._buffer))
+        self._buffer = bytearray()
+      while self._pending:
+        self._fileobj.write(self._pending.popleft().result())
+    finally:
+      self._executor.shutdown(wait = True)
+      super(_block_compressor_writer, self).close()
+
+  def _submit(self, block):
+    self._pending.append(self._executor.submit(self._compress_func, block))
+    # Bound memory by writing finished blocks once enough are in flight
+    while len(self._pending) > self._max_pending:
+      self._fileobj.write(self._pending.popleft().result())
+
+class _pipe_compressor_writer(io.RawIOBase):
+  'Compress by piping data through an external program.'
+
+  def __init__(self, fileobj, cmd):
+    self._cmd = cmd
+    self._process = subprocess.Popen(cmd, stdin = subprocess.PIPE, stdout = fileobj)
+    self._position = 0
+
+  def writable(self):
+    return True
+
+  def tell(self):
+    return self._position
+
+  def write(self, data):
+    self._process.stdin.write(data)
+    self._position += len(data)
+    return len(data)
+
+  def close(self):
+    if self.closed:
+      return
+    try:
+      self._process.stdin.close()
+      exit_code = self._process.wait()
+      if exit_code != 0:
+        raise RuntimeError('Failed to compress with {}: exit code {}'.format(' '.join(self._cmd), exit_code))
+    finally:
+      super(_pipe_compressor_writer, self).close()
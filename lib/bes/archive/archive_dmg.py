@@ -44,7 +44,7 @@ class archive_dmg(archive):
 
   #@abstractmethod
   def extract_all(self, dest_dir, base_dir = None,
-                  strip_common_ancestor = False, strip_head = None):
+                  strip_common_ancestor = False, strip_head = None, num_threads = None):
     dest_dir = self._determine_dest_dir(dest_dir, base_dir)
     dmg.extract(self.filename, dest_dir)
     self._handle_extract_strip_common_ancestor(self.members, strip_common_ancestor, strip_head, dest_dir)
@@ -52,7 +52,7 @@ class archive_dmg(archive):
   #@abstractmethod
   def extract(self, dest_dir, base_dir = None,
               strip_common_ancestor = False, strip_head = None,
-              include = None, exclude = None):
+              include = None, exclude = None, num_threads = None):
     dest_dir = self._determine_dest_dir(dest_dir, base_dir)
     filtered_members = self._filter_for_extract(self.members, include, exclude)
     if filtered_members == self.members:
@@ -84,7 +84,7 @@ class archive_dmg(archive):
   def create(self, root_dir, base_dir = None,
              extra_items = None,
              include = None, exclude = None,
-             extension = None):
+             extension = None, compression_level = None, num_threads = None):
     self._pre_create()
     items = self._find(root_dir, base_dir, extra_items, include, exclude)
     tmp_dir = temp_file.make_temp_dir()
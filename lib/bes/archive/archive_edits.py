@@ -0,0 +1,92 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from collections import namedtuple
+from collections import OrderedDict
+import posixpath
+
+from bes.system.check import check
+
+class archive_edits(object):
+  '''
+  Changes to apply to an archive while it is being rewritten entry by entry.
+  Members of the source archive that were removed or replaced are skipped and
+  the added members are written at the end.  Removing a dir removes everything
+  under it just like removing it from an unpacked archive would.
+  '''
+
+  added_item = namedtuple('added_item', 'arcname, content, filename, mode')
+
+  def __init__(self):
+    self._removed = set()
+    self._added = OrderedDict()
+
+  def remove(self, arcname):
+    check.check_string(arcname)
+
+    arcname = self._normalize(arcname)
+    self._removed.add(arcname)
+    for added in list(self._added.keys()):
+      if self._is_under(added, arcname):
+        del self._added[added]
+
+  def add_content(self, arcname, content, mode = None):
+    'Add or replace arcname with content.'
+    check.check_string(arcname)
+    check.check_int(mode, allow_none = True)
+
+    if check.is_string(content):
+      content = content.encode('utf-8')
+    check.check_bytes(content)
+    arcname = self._normalize(arcname)
+    self._added.pop(arcname, None)
+    self._added[arcname] = self.added_item(arcname, content, None, mode)
+
+  def add_file(self, arcname, filename):
+    'Add or replace arcname with the content and mode of filename.'
+    check.check_string(arcname)
+    check.check_string(filename)
+
+    arcname = self._normalize(arcname)
+    self._added.pop(arcname, None)
+    self._added[arcname] = self.added_item(arcname, None, filename, None)
+
+  @property
+  def added(self):
+    'The added items in the order they were added.'
+    return list(self._added.values())
+
+  @property
+  def has_removes(self):
+    'True if any members are removed.  Replaced members are not counted.'
+    return bool(self._removed)
+
+  def replaces_any(self, members):
+    'Return True if any of the added items replaces one of members.'
+    check.check_string_seq(members)
+
+    return any([ self._normalize(member) in self._added for member in members ])
+
+  def should_skip(self, member):
+    'Return True if member of the source archive should not be copied.'
+    check.check_string(member)
+
+    member = self._normalize(member)
+    if member in self._added:
+      return True
+    if not self._removed:
+      return False
+    while member:
+      if member in self._removed:
+        return True
+      member = posixpath.dirname(member)
+    return False
+
+  @classmethod
+  def _normalize(clazz, arcname):
+    return posixpath.normpath(arcname).lstrip('/')
+
+  @classmethod
+  def _is_under(clazz, member, arcname):
+    return member == arcname or member.startswith(arcname + '/')
+
+check.register_class(archive_edits, include_seq = False)
@@ -0,0 +1,18 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from collections import namedtuple
+
+class archive_extract_stats(namedtuple('archive_extract_stats', 'num_files, num_bytes, elapsed')):
+  'What an extraction did.  num_bytes is the uncompressed size of the extracted files and elapsed is in seconds.'
+
+  @property
+  def bytes_per_second(self):
+    if self.elapsed <= 0:
+      return 0.0
+    return self.num_bytes / self.elapsed
+
+  def __str__(self):
+    return '{} files {} bytes in {:.3f}s ({:.1f} MB/s)'.format(self.num_files,
+                                                             self.num_bytes,
+                                                             self.elapsed,
+                                                             self.bytes_per_second / (1024 * 1024))
@@ -0,0 +1,106 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import json
+
+from bes.common.json_util import json_util
+from bes.system.check import check
+
+from .archive_member_info import archive_member_info
+
+class archive_index(object):
+  '''
+  The detected format and the member table of one archive file.  The member
+  table is read from the archive the first time it is needed.  An index is only
+  valid for the key (size and mtime_ns) of the file it was made for.
+  '''
+
+  def __init__(self, filename, key, archive_class, format_name = None, infos = None):
+    check.check_string(filename)
+    check.check_tuple(key)
+
+    self.filename = filename
+    self.key = key
+    self.archive_class = archive_class
+    self._format_name = format_name
+    self._infos = None
+    self._members = None
+    self._member_set = None
+    self._by_member = None
+    if infos is not None:
+      self._set_infos(infos)
+
+  @property
+  def loaded(self):
+    'True if the member table has been read.'
+    return self._infos is not None
+
+  @property
+  def format_name(self):
+    if self._format_name is None:
+      self._format_name = self.archive_class.name(self.filename)
+    return self._format_name
+
+  @property
+  def infos(self):
+    'The list of archive_member_info sorted by member.'
+    if self._infos is None:
+      self._set_infos(self.archive_class(self.filename).member_infos())
+    return self._infos
+
+  @property
+  def members(self):
+    self.infos
+    return self._members
+
+  @property
+  def file_members(self):
+    return [ member for member in self.members if not member.endswith('/') ]
+
+  @property
+  def dir_members(self):
+    return [ member for member in self.members if member.endswith('/') ]
+
+  def has_member(self, member):
+    'Return True if member is in the archive.  Dirs can be given with or without a trailing "/"'
+    check.check_string(member)
+    self.infos
+    return member in self._member_set or (member.rstrip('/') + '/') in self._member_set
+
+  def info(self, member):
+    'Return the archive_member_info for member or None if not found.'
+    self.infos
+    return self._by_member.get(member, None)
+
+  def _set_infos(self, infos):
+    self._infos = infos
+    self._members = [ info.member for info in infos ]
+    self._member_set = set(self._members)
+    self._by_member = dict([ ( info.member, info ) for info in infos ])
+
+  def to_json(self):
+    d = {
+      'key': list(self.key),
+      'archive_class': self.archive_class.__name__,
+      'format_name': self.format_name,
+      'infos': [ info.to_list() for info in self.infos ],
+    }
+    return json_util.to_json(d, indent = 2)
+
+  @classmethod
+  def from_json(clazz, filename, text, archive_classes):
+    '''
+    Return an archive_index from json text.  archive_classes are the possible
+    archive classes.  Returns None if the text is not a valid index.
+    '''
+    check.check_string(filename)
+    check.check_string(text)
+
+    try:
+      o = json.loads(text)
+      classes = dict([ ( c.__name__, c ) for c in archive_classes ])
+      archive_class = classes[o['archive_class']]
+      infos = [ archive_member_info(*info) for info in o['infos'] ]
+      return archive_index(filename, tuple(o['key']), archive_class,
+                           format_name = o['format_name'], infos = infos)
+    except (ValueError, KeyError, TypeError) as ex:
+      return None
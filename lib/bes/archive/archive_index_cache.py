@@ -0,0 +1,131 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from collections import OrderedDict
+import os
+import os.path as path
+import threading
+
+from bes.system.check import check
+from bes.system.log import logger
+
+from .archive_index import archive_index
+
+class archive_index_cache(object):
+  '''
+  A cache of archive_index keyed by (path, size, mtime_ns).  The archive format
+  is detected once per file version and the member table is read once.  Files
+  that are not archives are cached as well.  With sidecar the member table is
+  also saved next to the archive in a FILENAME.bes_index file and reused by
+  other processes while the archive does not change.
+  '''
+
+  _log = logger('archive_index_cache')
+
+  DEFAULT_MAX_ENTRIES = 1024
+  SIDECAR_EXTENSION = '.bes_index'
+
+  # An unknown format is cached as this
+  _NOT_AN_ARCHIVE = object()
+
+  def __init__(self, archive_classes, max_entries = None, sidecar = False):
+    check.check_int(max_entries, allow_none = True)
+    check.check_bool(sidecar)
+
+    self._archive_classes = archive_classes
+    self._max_entries = max_entries or self.DEFAULT_MAX_ENTRIES
+    self.sidecar = sidecar
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, filename):
+    'Return the archive_index for filename or None if it is not a valid archive.'
+    check.check_string(filename)
+
+    filename = path.abspath(filename)
+    try:
+      st = os.stat(filename)
+    except OSError as ex:
+      return None
+    key = ( st.st_size, st.st_mtime_ns )
+    with self._lock:
+      entry = self._entries.get(filename, None)
+      if entry is not None and entry[0] == key:
+        self._entries.move_to_end(filename)
+        self.hits += 1
+        index = entry[1]
+        return None if index is self._NOT_AN_ARCHIVE else index
+      self.misses += 1
+    index = self._make_index(filename, key)
+    with self._lock:
+      self._entries[filename] = ( key, index or self._NOT_AN_ARCHIVE )
+      self._entries.move_to_end(filename)
+      while len(self._entries) > self._max_entries:
+        self._entries.popitem(last = False)
+    return index
+
+  def invalidate(self, filename):
+    'Forget anything cached for filename.'
+    check.check_string(filename)
+
+    with self._lock:
+      self._entries.pop(path.abspath(filename), None)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self.hits = 0
+      self.misses = 0
+
+  def save_sidecar(self, index):
+    'Save the member table of index next to the archive.  Errors are logged and ignored.'
+    sidecar_filename = self.sidecar_filename(index.filename)
+    tmp_filename = '{}.tmp.{}.{}'.format(sidecar_filename, os.getpid(), threading.get_ident())
+    try:
+      with open(tmp_filename, 'w', encoding = 'utf-8') as fout:
+        fout.write(index.to_json())
+      os.replace(tmp_filename, sidecar_filename)
+    except (IOError, OSError) as ex:
+      self._log.log_w('failed to save index {}: {}'.format(sidecar_filename, str(ex)))
+      if path.exists(tmp_filename):
+        os.remove(tmp_filename)
+
+  @classmethod
+  def sidecar_filename(clazz, filename):
+    return filename + clazz.SIDECAR_EXTENSION
+
+  def _make_index(self, filename, key):
+    if self.sidecar:
+      index = self._load_sidecar(filename, key)
+      if index:
+        return index
+    archive_class = self._determine_type(filename)
+    if not archive_class:
+      return None
+    index = archive_index(filename, key, archive_class)
+    if self.sidecar:
+      index.infos
+      self.save_sidecar(index)
+    return index
+
+  def _load_sidecar(self, filename, key):
+    sidecar_filename = self.sidecar_filename(filename)
+    if not path.isfile(sidecar_filename):
+      return None
+    try:
+      with open(sidecar_filename, 'r', encoding = 'utf-8') as fin:
+        text = fin.read()
+    except (IOError, OSError) as ex:
+      return None
+    index = archive_index.from_json(filename, text, self._archive_classes)
+    if not index or index.key != key:
+      self._log.log_d('_load_sidecar: stale or invalid {}'.format(sidecar_filename))
+      return None
+    return index
+
+  def _determine_type(self, filename):
+    for archive_class in self._archive_classes:
+      if archive_class.file_is_valid(filename):
+        return archive_class
+    return None
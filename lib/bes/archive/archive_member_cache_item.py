@@ -3,15 +3,15 @@
 
 import os.path as path
 from .archiver import archiver
-from bes.fs.file_cache_item_base import file_cache_item_base
+from bes.fs.file_cache import file_cache_item_base
 from bes.fs.file_util import file_util
 
 class archive_member_cache_item(file_cache_item_base):
-  def __init__(self, archive, member):
+  def __init__(self, archive, member, cheap_key = False):
     super(archive_member_cache_item, self).__init__()
     self._archive = path.abspath(path.normpath(archive))
     self._member = member
-    self._checksum = file_util.checksum('sha256', self._archive)
+    self._checksum = self.make_checksum(self._archive, cheap_key = cheap_key)
     
   def save(self, info):
     assert archiver.is_valid(self._archive)
@@ -19,6 +19,9 @@ class archive_member_cache_item(file_cache_item_base):
     # The checksum here is for the archive not the member
     file_util.save(info.checksum_filename, self._checksum + '\n')
 
+  def __str__(self):
+    return '{}:{}'.format(self.name(), self._checksum)
+
   def checksum(self):
     return self._checksum
 
@@ -0,0 +1,29 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from collections import namedtuple
+
+from bes.system.check import check
+
+class archive_member_info(namedtuple('archive_member_info', 'member, size, offset')):
+  '''
+  Information about one member of an archive.  member is the normalized member
+  name with dirs ending in "/".  size is the uncompressed size and offset is
+  where the member starts in the archive (the local header for zip and the
+  data in the uncompressed stream for tar).  Both can be None if unknown.
+  '''
+
+  def __new__(clazz, member, size = None, offset = None):
+    check.check_string(member)
+    check.check_int(size, allow_none = True)
+    check.check_int(offset, allow_none = True)
+
+    return clazz.__bases__[0].__new__(clazz, member, size, offset)
+
+  @property
+  def is_dir(self):
+    return self.member.endswith('/')
+
+  def to_list(self):
+    return [ self.member, self.size, self.offset ]
+
+check.register_class(archive_member_info, include_seq = False)
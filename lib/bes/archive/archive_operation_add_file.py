@@ -19,3 +19,9 @@ class archive_operation_add_file(archive_operation_base):
   def execute(self, temp_dir):
     'Execute this operation in a temp_dir of the unpacked archive.'
     file_util.save(path.join(temp_dir, self._arcname), content = self._content, mode = self._mode)
+
+  can_edit = True
+
+  def edit(self, edits):
+    'Record this operation in edits.'
+    edits.add_content(self._arcname, self._content, mode = self._mode)
@@ -12,5 +12,15 @@ class archive_operation_base(with_metaclass(ABCMeta, object)):
     'Execute this operation in a temp_dir of the unpacked archive.'
     raise NotImplementedError()
 
+  # True if edit() is implemented and the operation can be applied while streaming
+  can_edit = False
+
+  def edit(self, edits):
+    '''
+    Record this operation in edits, an archive_edits, so it can be applied while
+    the archive is rewritten entry by entry without unpacking it.
+    '''
+    raise NotImplementedError()
+
 check.register_class(archive_operation_base, name = 'archive_operation')
   
@@ -19,3 +19,10 @@ class archive_operation_remove_files(archive_operation_base):
     'Execute this operation in a temp_dir of the unpacked archive.'
     filenames = [ path.join(temp_dir, arcname) for arcname in self._file_arcnames ]
     file_util.remove(filenames)
+
+  can_edit = True
+
+  def edit(self, edits):
+    'Record this operation in edits.'
+    for arcname in self._file_arcnames:
+      edits.remove(arcname)
@@ -18,3 +18,9 @@ class archive_operation_replace_file(archive_operation_base):
   def execute(self, temp_dir):
     'Execute this operation in a temp_dir of the unpacked archive.'
     file_util.copy(self._replacement, path.join(temp_dir, self._arcname))
+
+  can_edit = True
+
+  def edit(self, edits):
+    'Record this operation in edits.'
+    edits.add_file(self._arcname, self._replacement)
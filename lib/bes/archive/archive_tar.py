@@ -1,14 +1,23 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import copy
 import gzip
-import os.path as path
+import io
+import os, os.path as path
 import tarfile
+import time
 
+from bes.fs.file_util import file_util
 from bes.fs.tar_util import tar_util
+from bes.system.check import check
 from bes.system.log import logger
 
 from .archive import archive
+from .archive_compressor import archive_compressor
 from .archive_extension import archive_extension
+from .archive_member_info import archive_member_info
 
 class archive_tar(archive):
   'A Tar archive class.'
@@ -41,6 +50,10 @@ class archive_tar(archive):
     with tarfile.open(self.filename, mode = 'r') as archive:
       return self._normalize_members([ self._member_path(member) for member in archive.getmembers() ])
 
+  def _get_member_infos(self):
+    with tarfile.open(self.filename, mode = 'r') as archive:
+      return [ archive_member_info(self._member_path(member), member.size, member.offset_data) for member in archive.getmembers() ]
+
   #@abstractmethod
   def _member_path(clazz, member):
     if member.isdir():
@@ -58,53 +71,235 @@ class archive_tar(archive):
         pass
     return False
 
+  @contextmanager
+  def open_member(self, member):
+    'Return a context manager with a binary file object that reads member straight from the archive.'
+    with tarfile.open(self.filename, mode = 'r') as archive:
+      try:
+        info = archive.getmember(member)
+      except KeyError as ex:
+        raise IOError('member not found: {}'.format(member))
+      if not (info.isfile() or info.issym() or info.islnk()):
+        raise IOError('member is not a file: {}'.format(member))
+      with archive.extractfile(info) as fin:
+        yield fin
+
+  def member_checksums(self, members, hash_algorithm = 'sha256'):
+    '''
+    Return a dict of member to hex checksum for members.  The archive is read
+    once as a stream and members are hashed as they go by.  Raises IOError if a
+    member is missing or is not a file.
+    '''
+    check.check_string_seq(members)
+    check.check_string(hash_algorithm)
+
+    wanted = set(members)
+    result = {}
+    # Links cannot be resolved in a stream.  The last entry for a name wins
+    # just like when extracting.
+    links = set()
+    not_files = set()
+    with tarfile.open(self.filename, mode = 'r|*') as archive:
+      for info in archive:
+        name = info.path
+        if not name in wanted:
+          continue
+        result.pop(name, None)
+        links.discard(name)
+        not_files.discard(name)
+        if info.isfile():
+          result[name] = self._hash_stream(archive.extractfile(info), hash_algorithm)
+        elif info.issym() or info.islnk():
+          links.add(name)
+        else:
+          not_files.add(name)
+    self._log.log_d('member_checksums: {} streamed {} links', len(result), len(links))
+    if not_files:
+      raise IOError('member is not a file: {}'.format(' '.join(sorted(not_files))))
+    missing = wanted - set(result.keys()) - links
+    if missing:
+      raise IOError('member not found: {}'.format(' '.join(sorted(missing))))
+    if links:
+      result.update(super(archive_tar, self).member_checksums(sorted(links), hash_algorithm = hash_algorithm))
+    return result
+
   #@abstractmethod
   def extract_all(self, dest_dir, base_dir = None,
-                  strip_common_ancestor = False, strip_head = None):
-    with tarfile.open(self.filename, mode = 'r') as archive:
-      dest_dir = self._determine_dest_dir(dest_dir, base_dir)
-      def is_within_directory(directory, target):
-          
-          abs_directory = os.path.abspath(directory)
-          abs_target = os.path.abspath(target)
-      
-          prefix = os.path.commonprefix([abs_directory, abs_target])
-          
-          return prefix == abs_directory
-      
-      def safe_extract(tar, path=".", members=None, *, numeric_owner=False):
-      
-          for member in tar.getmembers():
-              member_path = os.path.join(path, member.name)
-              if not is_within_directory(path, member_path):
-                  raise Exception("Attempted Path Traversal in Tar File")
-      
-          tar.extractall(path, members, numeric_owner=numeric_owner) 
-          
-      
-      safe_extract(archive, path=dest_dir)
-      self._handle_extract_strip_common_ancestor(self.members, strip_common_ancestor, strip_head, dest_dir)
+                  strip_common_ancestor = False, strip_head = None, num_threads = None):
+    return self._extract_members(self.members, dest_dir, base_dir,
+                                 strip_common_ancestor, strip_head, num_threads)
 
   #@abstractmethod
   def extract(self, dest_dir, base_dir = None,
               strip_common_ancestor = False, strip_head = None,
-              include = None, exclude = None):
+              include = None, exclude = None, num_threads = None):
     filtered_members = self._filter_for_extract(self.members, include, exclude)
-    if filtered_members == self.members:
-      return self.extract_all(dest_dir,
-                              base_dir = base_dir,
-                              strip_common_ancestor = strip_common_ancestor,
-                              strip_head = strip_head)
-    dest_dir = self._determine_dest_dir(dest_dir, base_dir)
+    return self._extract_members(filtered_members, dest_dir, base_dir,
+                                 strip_common_ancestor, strip_head, num_threads)
+
+  def _write_targets(self, targets, dest_dir, num_threads):
+    '''
+    Uncompressed archives are read with random access and regular files are
+    written concurrently.  Compressed archives are extracted in a single pass
+    over the stream.  Either way dirs get their attributes last like extractall().
+    '''
+    self._make_target_dirs(targets)
+    if num_threads > 1 and self._write_mode_for_existing() == 'w':
+      return self._write_targets_random_access(targets, dest_dir, num_threads)
+    num_files = 0
+    num_bytes = 0
+    dirs = {}
+    with tarfile.open(self.filename, mode = 'r|*') as archive:
+      for info in archive:
+        target = targets.get(self._member_path(info), None)
+        if not target:
+          continue
+        target_info = self._info_for_target(info, target, targets, dest_dir)
+        if info.isdir():
+          archive.extract(target_info, path = dest_dir, set_attrs = False)
+          dirs[target] = target_info
+          continue
+        archive.extract(target_info, path = dest_dir)
+        if info.isreg():
+          num_files += 1
+          num_bytes += info.size
+      self._set_dir_attrs(archive, dirs)
+    return num_files, num_bytes
+
+  def _write_targets_random_access(self, targets, dest_dir, num_threads):
     with tarfile.open(self.filename, mode = 'r') as archive:
-      for member in filtered_members:
-        archive.extract(member, path = dest_dir)
-      self._handle_extract_strip_common_ancestor(filtered_members, strip_common_ancestor, strip_head, dest_dir)
+      # The last entry for a name wins just like when extracting
+      infos = {}
+      for info in archive.getmembers():
+        target = targets.get(self._member_path(info), None)
+        if target:
+          infos[target] = info
+      files = [ ( target, info ) for target, info in infos.items() if info.isreg() and not info.issparse() ]
+      others = [ ( target, info ) for target, info in infos.items() if not ( info.isreg() and not info.issparse() ) ]
+      self._log.log_d('_write_targets_random_access: {} files {} others with {} threads',
+                      len(files), len(others), num_threads)
+      with open(self.filename, 'rb') as fin:
+        fd = fin.fileno()
+        def _write_one(item):
+          target, info = item
+          self._copy_range(fd, info.offset_data, info.size, target)
+          if self._should_chown():
+            archive.chown(info, target, False)
+          os.chmod(target, info.mode)
+          os.utime(target, ( info.mtime, info.mtime ))
+        with ThreadPoolExecutor(max_workers = num_threads) as executor:
+          list(executor.map(_write_one, files))
+      # Links need their targets to exist and dirs get their attributes set last
+      dirs = {}
+      for target, info in sorted(others, key = lambda item: item[0]):
+        target_info = self._info_for_target(info, target, targets, dest_dir)
+        if info.isdir():
+          archive.extract(target_info, path = dest_dir, set_attrs = False)
+          dirs[target] = target_info
+        else:
+          archive.extract(target_info, path = dest_dir)
+      self._set_dir_attrs(archive, dirs)
+    return len(files), sum([ info.size for _, info in files ])
+
+  @classmethod
+  def _set_dir_attrs(clazz, archive, dirs):
+    '''
+    Set the owner, times and mode of dirs, a dict of target to info, deepest
+    first so read only dirs and dir times survive writing their contents.
+    '''
+    for target in sorted(dirs.keys(), reverse = True):
+      info = dirs[target]
+      if clazz._should_chown():
+        archive.chown(info, target, False)
+      archive.utime(info, target)
+      archive.chmod(info, target)
+
+  _COPY_CHUNK_SIZE = 1024 * 1024
+  @classmethod
+  def _copy_range(clazz, fd, offset, size, filename):
+    with open(filename, 'wb') as fout:
+      end = offset + size
+      while offset < end:
+        chunk = os.pread(fd, min(clazz._COPY_CHUNK_SIZE, end - offset), offset)
+        if not chunk:
+          raise IOError('Unexpected end of archive: {}'.format(filename))
+        fout.write(chunk)
+        offset += len(chunk)
+
+  @classmethod
+  def _should_chown(clazz):
+    return hasattr(os, 'geteuid') and os.geteuid() == 0
+
+  def _info_for_target(self, info, target, targets, dest_dir):
+    'Return a copy of info renamed to extract to target.'
+    result = copy.copy(info)
+    result.name = path.relpath(target, dest_dir)
+    if info.islnk() and info.linkname in targets:
+      result.linkname = path.relpath(targets[info.linkname], dest_dir)
+    return result
+
+  can_apply_edits = True
+
+  def apply_edits(self, edits):
+    '''
+    Apply edits by streaming the entries of the archive into a new archive with
+    the same compression.  Uncompressed archives are appended to in place when
+    members are only added.
+    '''
+    write_mode = self._write_mode_for_existing()
+    if write_mode == 'w' and not edits.has_removes and not edits.replaces_any(self.members):
+      self._log.log_d('apply_edits: appending {} members to {}', len(edits.added), self.filename)
+      with tarfile.open(self.filename, mode = 'a') as archive:
+        self._add_edited_items(archive, edits.added)
+      self._forget_members()
+      return
+    tmp_filename = self._make_rewrite_temp_file()
+    try:
+      with tarfile.open(self.filename, mode = 'r|*') as src:
+        with tarfile.open(tmp_filename, mode = write_mode) as dst:
+          for info in src:
+            if edits.should_skip(info.path):
+              continue
+            if info.isfile():
+              dst.addfile(info, src.extractfile(info))
+            else:
+              dst.addfile(info)
+          self._add_edited_items(dst, edits.added)
+    except:
+      file_util.remove(tmp_filename)
+      raise
+    self._replace_with(tmp_filename)
+
+  @classmethod
+  def _add_edited_items(clazz, archive, items):
+    for item in items:
+      if item.filename:
+        archive.add(item.filename, arcname = item.arcname, recursive = False)
+      else:
+        info = tarfile.TarInfo(name = item.arcname)
+        info.size = len(item.content)
+        info.mode = 0o0644 if item.mode is None else item.mode
+        info.mtime = int(time.time())
+        archive.addfile(info, io.BytesIO(item.content))
+
+  _COMPRESSION_WRITE_MODES = [
+    ( b'\x1f\x8b', 'w:gz' ),
+    ( b'BZh', 'w:bz2' ),
+    ( b'\xfd7zXZ\x00', 'w:xz' ),
+  ]
+  def _write_mode_for_existing(self):
+    'Return the tarfile write mode for the compression of the existing archive.'
+    with open(self.filename, 'rb') as fin:
+      head = fin.read(6)
+    for magic, mode in self._COMPRESSION_WRITE_MODES:
+      if head.startswith(magic):
+        return mode
+    return 'w'
 
   def create(self, root_dir, base_dir = None,
              extra_items = None,
              include = None, exclude = None,
-             extension = None):
+             extension = None, compression_level = None, num_threads = None):
     self._pre_create()
     items = self._find(root_dir, base_dir, extra_items, include, exclude)
     self._log.log_d('create: extension={} filename={}'.format(extension, self.filename))
@@ -113,6 +308,25 @@ class archive_tar(archive):
     else:
       mode = archive_extension.write_format_for_filename(self.filename)
     self._log.log_d('create: mode={}'.format(mode))
-    with tarfile.open(self.filename, mode = mode) as archive:
-      for item in items:
-        archive.add(item.filename, arcname = item.arcname)
+    compression = mode.partition(':')[2]
+    num_threads = num_threads or archive_compressor.default_num_threads()
+    if compression and num_threads > 1:
+      # Compress blocks in parallel while tarfile writes a plain stream
+      with open(self.filename, 'wb') as fout:
+        with archive_compressor.open(fout, compression, level = compression_level, num_threads = num_threads) as compressor:
+          with tarfile.open(fileobj = compressor, mode = 'w|') as archive:
+            self._add_items(archive, items)
+      return
+    kwargs = {}
+    if compression_level is not None:
+      if compression == archive_compressor.XZ:
+        kwargs['preset'] = compression_level
+      elif compression:
+        kwargs['compresslevel'] = compression_level
+    with tarfile.open(self.filename, mode = mode, **kwargs) as archive:
+      self._add_items(archive, items)
+
+  @classmethod
+  def _add_items(clazz, archive, items):
+    for item in items:
+      archive.add(item.filename, arcname = item.arcname)
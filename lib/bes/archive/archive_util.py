@@ -25,14 +25,9 @@ class archive_util(object):
   
   @classmethod
   def remove_members(clazz, archive, members, debug = False):
-    'Remove members from an archive and then recreate it.'
+    'Remove members from an archive by rewriting it.  Removing a dir removes everything under it.'
     members = object_util.listify(members)
-    tmp_dir = archiver.extract_all_temp_dir(archive, delete = not debug)
-    if debug:
-      print('tmp_dir: {}'.format(tmp_dir))
-    members = [ path.normpath(path.join(tmp_dir, m)) for m in members ]
-    file_util.remove(members)
-    archiver.create(archive, tmp_dir)
+    archiver.transform(archive, [ archiver.operation_remove_files(members) ])
 
   @classmethod
   def remove_members_matching_patterns(clazz, archive, patterns, debug = False):
@@ -44,19 +39,7 @@ class archive_util(object):
   def member_checksums(clazz, archive, members, debug = False):
     'Return a dict of checksums for the given members in archive.'
     members = object_util.listify(members)
-    tmp_dir = archiver.extract_all_temp_dir(archive, delete = not debug)
-    if debug:
-      print('tmp_dir: {}'.format(tmp_dir))
-    result = {}
-    for member in members:
-      assert not member in result
-      p = path.join(tmp_dir, member)
-      if not path.exists(p):
-        raise IOError('member not found: {}'.format(member))
-      if not path.isfile(p):
-        raise IOError('member is not a file: {}'.format(member))
-      result[member] = file_util.checksum('sha256', path.join(tmp_dir, member))
-    return result
+    return archiver.member_checksums(archive, members)
     
   @classmethod
   def duplicate_members(clazz, archives, only_content_conficts = False):
@@ -95,26 +78,39 @@ class archive_util(object):
   @classmethod
   def _dups_only_with_conficts(clazz, dups):
     'Filter out dups that have the same content.'
+    checksums = clazz._checksums_for_dups(dups)
     result = {}
     for member, archives in dups.items():
-      if clazz._has_conflict(archives, member):
+      if clazz._has_conflict(checksums, archives, member):
         result[member] = archives
     return result
 
   @classmethod
-  def _has_conflict(clazz, archives, member):
+  def _checksums_for_dups(clazz, dups):
+    'Return a dict of archive to member checksums reading each archive only once.'
+    archive_members = {}
+    for member, archives in dups.items():
+      if clazz._is_dir_member(member):
+        continue
+      for archive in archives:
+        archive_members.setdefault(archive, set()).add(member)
+    result = {}
+    for archive, members in archive_members.items():
+      result[archive] = archiver.member_checksums(archive, sorted(members))
+    return result
+  
+  @classmethod
+  def _has_conflict(clazz, checksums, archives, member):
     'Return True if any archive in archives has a content conflict with member.'
-    checksum = None
     assert(archives)
     assert(member)
-    for archive in archives:
-      next_checksum = archiver.member_checksum(archive, member)
-      if checksum is None:
-        checksum = next_checksum
-      else:
-        if next_checksum != checksum:
-          return True
-    return False
+    if clazz._is_dir_member(member):
+      return False
+    return len(set([ checksums[archive][member] for archive in archives ])) > 1
+
+  @classmethod
+  def _is_dir_member(clazz, member):
+    return member.endswith('/')
   
   @classmethod
   def combine(clazz, archives, dest_archive, check_content = False,
@@ -1,14 +1,21 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import os, os.path as path, stat, zipfile
+import os, os.path as path, shutil, stat, threading, time, zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from bes.fs.file_util import file_util
+from bes.system.check import check
+from bes.system.log import logger
 
 from .archive import archive
+from .archive_member_info import archive_member_info
 
 class archive_zip(archive):
   'A Zip archive class.'
 
+  _log = logger('archive_zip')
+
   def __init__(self, filename):
     super(archive_zip, self).__init__(filename)
 
@@ -28,6 +35,10 @@ class archive_zip(archive):
     with zipfile.ZipFile(file = self.filename, mode = 'r') as archive:
       return self._normalize_members([ m.filename for m in archive.infolist() ])
 
+  def _get_member_infos(self):
+    with zipfile.ZipFile(file = self.filename, mode = 'r') as archive:
+      return [ archive_member_info(m.filename, m.file_size, m.header_offset) for m in archive.infolist() ]
+
   #@abstractmethod
   def has_member(self, member):
     '''Return True if filename is part of members.  Note that directories should end in "/" '''
@@ -39,46 +50,152 @@ class archive_zip(archive):
         pass
       return False
 
+  @contextmanager
+  def open_member(self, member):
+    'Return a context manager with a binary file object that reads member straight from the archive.'
+    with zipfile.ZipFile(file = self.filename, mode = 'r') as archive:
+      with archive.open(self._file_info(archive, member)) as fin:
+        yield fin
+
+  def member_checksums(self, members, hash_algorithm = 'sha256'):
+    '''
+    Return a dict of member to hex checksum for members reading them straight
+    from the archive.  Raises IOError if a member is missing or is not a file.
+    '''
+    check.check_string_seq(members)
+    check.check_string(hash_algorithm)
+
+    result = {}
+    with zipfile.ZipFile(file = self.filename, mode = 'r') as archive:
+      for member in members:
+        with archive.open(self._file_info(archive, member)) as fin:
+          result[member] = self._hash_stream(fin, hash_algorithm)
+    return result
+
+  @classmethod
+  def _file_info(clazz, archive, member):
+    try:
+      info = archive.getinfo(member)
+    except KeyError as ex:
+      raise IOError('member not found: {}'.format(member))
+    if info.is_dir():
+      raise IOError('member is not a file: {}'.format(member))
+    return info
+
   #@abstractmethod
   def extract_all(self, dest_dir, base_dir = None,
-                  strip_common_ancestor = False, strip_head = None):
-    with zipfile.ZipFile(file = self.filename, mode = 'r') as archive:
-      dest_dir = self._determine_dest_dir(dest_dir, base_dir)
-      archive.extractall(path = dest_dir)
-      for info in archive.infolist():
-        filename = info.filename.replace('/', os.sep)
-        p = path.join(dest_dir, filename)
-        self._fix_permissions(p, info)
-    self._handle_extract_strip_common_ancestor(self.members, strip_common_ancestor, strip_head, dest_dir)
+                  strip_common_ancestor = False, strip_head = None, num_threads = None):
+    return self._extract_members(self.members, dest_dir, base_dir,
+                                 strip_common_ancestor, strip_head, num_threads)
 
   #@abstractmethod
   def extract(self, dest_dir, base_dir = None,
               strip_common_ancestor = False, strip_head = None,
-              include = None, exclude = None):
-    dest_dir = self._determine_dest_dir(dest_dir, base_dir)
+              include = None, exclude = None, num_threads = None):
     filtered_members = self._filter_for_extract(self.members, include, exclude)
-    if filtered_members == self.members:
-      return self.extract_all(dest_dir,
-                              base_dir = base_dir,
-                              strip_common_ancestor = strip_common_ancestor,
-                              strip_head = strip_head)
+    return self._extract_members(filtered_members, dest_dir, base_dir,
+                                 strip_common_ancestor, strip_head, num_threads)
+
+  def _write_targets(self, targets, dest_dir, num_threads):
+    '''
+    Write files concurrently with one ZipFile handle per thread.  Dirs get
+    their stored modes afterwards deepest first.
+    '''
+    self._make_target_dirs(targets)
     with zipfile.ZipFile(file = self.filename, mode = 'r') as archive:
-      zip_infos = self._infos_for_files(archive, filtered_members)
-      for zip_info in zip_infos:
-        extracted = archive.extract(zip_info, path = dest_dir)
-        self._fix_permissions(extracted, zip_info)
-      self._handle_extract_strip_common_ancestor(filtered_members, strip_common_ancestor, strip_head, dest_dir)
+      infos = [ ( target, archive.getinfo(member) ) for member, target in targets.items() ]
+    files = [ ( target, info ) for target, info in infos if not info.is_dir() ]
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    def _write_one(item):
+      target, info = item
+      if not hasattr(local, 'archive'):
+        local.archive = zipfile.ZipFile(file = self.filename, mode = 'r')
+        with handles_lock:
+          handles.append(local.archive)
+      with local.archive.open(info) as fin:
+        with open(target, 'wb') as fout:
+          shutil.copyfileobj(fin, fout, self._COPY_BUFFER_SIZE)
+      self._fix_permissions(target, info)
+    try:
+      with ThreadPoolExecutor(max_workers = num_threads) as executor:
+        list(executor.map(_write_one, files))
+    finally:
+      for handle in handles:
+        handle.close()
+    dirs = [ ( target, info ) for target, info in infos if info.is_dir() ]
+    for target, info in sorted(dirs, key = lambda item: item[0], reverse = True):
+      self._fix_dir_permissions(target, info)
+    return len(files), sum([ info.file_size for _, info in files ])
 
   def create(self, root_dir, base_dir = None,
              extra_items = None,
              include = None, exclude = None,
-             extension = None):
+             extension = None, compression_level = None, num_threads = None):
     self._pre_create()
     items = self._find(root_dir, base_dir, extra_items, include, exclude)
-    with zipfile.ZipFile(file = self.filename, mode = 'w', compression = zipfile.ZIP_DEFLATED, allowZip64 = True) as archive:
+    with zipfile.ZipFile(file = self.filename, mode = 'w', compression = zipfile.ZIP_DEFLATED,
+                         allowZip64 = True, compresslevel = compression_level) as archive:
       for item in items:
         archive.write(item.filename, arcname = item.arcname)
 
+  can_apply_edits = True
+
+  def apply_edits(self, edits):
+    '''
+    Apply edits.  When members are only added they are appended to the archive
+    in place and only the central directory is rewritten.  Otherwise members
+    are streamed into a new archive one by one.
+    '''
+    if not edits.has_removes and not edits.replaces_any(self.members):
+      with zipfile.ZipFile(file = self.filename, mode = 'a', compression = zipfile.ZIP_DEFLATED, allowZip64 = True) as archive:
+        self._add_edited_items(archive, edits.added)
+      self._forget_members()
+      return
+    tmp_filename = self._make_rewrite_temp_file()
+    try:
+      with zipfile.ZipFile(file = self.filename, mode = 'r') as src:
+        with zipfile.ZipFile(file = tmp_filename, mode = 'w', compression = zipfile.ZIP_DEFLATED, allowZip64 = True) as dst:
+          for info in src.infolist():
+            if edits.should_skip(info.filename):
+              continue
+            self._copy_member(src, dst, info)
+          self._add_edited_items(dst, edits.added)
+    except:
+      file_util.remove(tmp_filename)
+      raise
+    self._replace_with(tmp_filename)
+
+  _COPY_BUFFER_SIZE = 1024 * 1024
+  @classmethod
+  def _copy_member(clazz, src, dst, info):
+    new_info = zipfile.ZipInfo(info.filename, date_time = info.date_time)
+    new_info.compress_type = info.compress_type
+    new_info.create_system = info.create_system
+    new_info.external_attr = info.external_attr
+    new_info.comment = info.comment
+    new_info.file_size = info.file_size
+    if info.is_dir():
+      dst.writestr(new_info, b'')
+      return
+    with src.open(info) as fin:
+      with dst.open(new_info, mode = 'w') as fout:
+        shutil.copyfileobj(fin, fout, clazz._COPY_BUFFER_SIZE)
+
+  @classmethod
+  def _add_edited_items(clazz, archive, items):
+    for item in items:
+      if item.filename:
+        archive.write(item.filename, arcname = item.arcname)
+      else:
+        info = zipfile.ZipInfo(item.arcname, date_time = time.localtime(time.time())[0:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.create_system = clazz._ZIP_UNIX_SYSTEM
+        mode = 0o0644 if item.mode is None else item.mode
+        info.external_attr = (stat.S_IFREG | mode) << 16
+        archive.writestr(info, item.content)
+
   @classmethod
   def _infos_for_files(clazz, archive, filenames):
     return [ archive.getinfo(filename) for filename in filenames ]
@@ -94,3 +211,12 @@ class archive_zip(archive):
     unix_attributes = info.external_attr >> 16
     if unix_attributes & stat.S_IXUSR:
       os.chmod(filename, os.stat(filename).st_mode | stat.S_IXUSR)
+
+  @classmethod
+  def _fix_dir_permissions(clazz, dirname, info):
+    'Apply the unix mode stored for a dir member.'
+    if info.create_system != clazz._ZIP_UNIX_SYSTEM:
+      return
+    mode = stat.S_IMODE(info.external_attr >> 16)
+    if mode:
+      os.chmod(dirname, mode)
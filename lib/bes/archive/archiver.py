@@ -1,5 +1,6 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import os
 import os.path as path
 
 from ..system.check import check
@@ -12,7 +13,9 @@ from bes.system.host import host
 
 from .archive_base import archive_base
 from .archive_dmg import archive_dmg
+from .archive_edits import archive_edits
 from .archive_extension import archive_extension
+from .archive_index_cache import archive_index_cache
 from .archive_tar import archive_tar
 from .archive_xz import archive_xz
 from .archive_zip import archive_zip
@@ -25,6 +28,13 @@ class archiver(object):
   'Class to deal with archives.'
 
   item = archive_base.item
+
+  # Formats are detected in this order
+  _ARCHIVE_CLASSES = [ archive_tar, archive_zip, archive_xz ] + ([ archive_dmg ] if host.is_macos() else [])
+
+  # Detected formats and member tables.  BES_ARCHIVE_INDEX_SIDECAR=1 also saves them next to the archives.
+  _index_cache = archive_index_cache(_ARCHIVE_CLASSES,
+                                     sidecar = bool(os.environ.get('BES_ARCHIVE_INDEX_SIDECAR', None)))
   
   @classmethod
   def is_valid(clazz, filename):
@@ -32,50 +42,65 @@ class archiver(object):
       return False
     if not path.isfile(filename):
       return False
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
-      return False
-    return archive_class.file_is_valid(filename)
+    return clazz._index_cache.get(filename) is not None
   
   @classmethod
   def members(clazz, filename):
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (filename))
-    return archive_class(filename).members
+    return list(clazz._get_index(filename).members)
 
   @classmethod
   def file_members(clazz, filename):
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (filename))
-    return archive_class(filename).file_members
+    return clazz._get_index(filename).file_members
 
   @classmethod
   def dir_members(clazz, filename):
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (filename))
-    return archive_class(filename).dir_members
+    return clazz._get_index(filename).dir_members
+
+  @classmethod
+  def member_infos(clazz, filename):
+    'Return a list of archive_member_info for the members of filename.'
+    return list(clazz._get_index(filename).infos)
 
   @classmethod
   def has_member(clazz, filename, member):
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
+    return clazz._get_index(filename).has_member(member)
+
+  @classmethod
+  def set_index_sidecar(clazz, sidecar):
+    'Enable or disable saving archive member indices next to archives in FILENAME.bes_index files.'
+    check.check_bool(sidecar)
+    clazz._index_cache.sidecar = sidecar
+
+  @classmethod
+  def clear_index_cache(clazz):
+    'Forget all cached archive formats and member indices.'
+    clazz._index_cache.clear()
+
+  @classmethod
+  def _get_index(clazz, filename):
+    index = clazz._index_cache.get(filename)
+    if not index:
       raise RuntimeError('Unknown archive type for %s' % (filename))
-    return archive_class(filename).has_member(member)
+    return index
+
+  @classmethod
+  def _open(clazz, filename):
+    'Return an archive object for filename with its members already known.'
+    index = clazz._get_index(filename)
+    archive = index.archive_class(filename)
+    if index.loaded:
+      archive.members = list(index.members)
+    return archive
 
   @classmethod
   def extract_all(clazz, filename, dest_dir, base_dir = None,
-                  strip_common_ancestor = False, strip_head = None):
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (filename))
-    archive = archive_class(filename)
-    archive.extract_all(dest_dir,
-                        base_dir = base_dir,
-                        strip_common_ancestor = strip_common_ancestor,
-                        strip_head = strip_head)
+                  strip_common_ancestor = False, strip_head = None, num_threads = None):
+    archive = clazz._open(filename)
+    return archive.extract_all(dest_dir,
+                               base_dir = base_dir,
+                               strip_common_ancestor = strip_common_ancestor,
+                               strip_head = strip_head,
+                               num_threads = num_threads)
     
   @classmethod
   def extract_all_temp_dir(clazz, filename, base_dir = None,
@@ -88,37 +113,30 @@ class archiver(object):
   @classmethod
   def extract(clazz, filename, dest_dir, base_dir = None,
               strip_common_ancestor = False, strip_head = None,
-              include = None, exclude = None):
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (filename))
-    archive = archive_class(filename)
+              include = None, exclude = None, num_threads = None):
+    archive = clazz._open(filename)
     return archive.extract(dest_dir,
                            base_dir = base_dir,
                            strip_common_ancestor = strip_common_ancestor,
                            strip_head = strip_head,
                            include = include,
-                           exclude = exclude)
+                           exclude = exclude,
+                           num_threads = num_threads)
 
   @classmethod
   def extract_member_to_string(clazz, archive, member, codec = None):
-    archive_class = clazz._determine_type(archive)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (archive))
-    return archive_class(archive).extract_member_to_string(member, codec = codec)
+    return clazz._open(archive).extract_member_to_string(member, codec = codec)
 
   @classmethod
-  def extract_member_to_string_cached(clazz, archive, member, cache_dir = None):
+  def extract_member_to_string_cached(clazz, archive, member, cache_dir = None,
+                                      cheap_key = False, max_bytes = None):
     from .archive_member_cache_item import archive_member_cache_item
-    item = archive_member_cache_item(archive, member)
-    return file_cache.cached_item(item, cache_dir)
+    item = archive_member_cache_item(archive, member, cheap_key = cheap_key)
+    return file_cache.cached_item(item, cache_dir = cache_dir, max_bytes = max_bytes)
   
   @classmethod
   def extract_member_to_file(clazz, archive, member, filename):
-    archive_class = clazz._determine_type(archive)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (archive))
-    archive_class(archive).extract_member_to_file(member, filename)
+    clazz._open(archive).extract_member_to_file(member, filename)
 
   @classmethod
   def extract_member_to_temp_file(clazz, archive, member, delete = True):
@@ -127,17 +145,28 @@ class archiver(object):
     return tmp_filename
 
   @classmethod
-  def member_checksum(clazz, archive, member):
-    tmp_file = clazz.extract_member_to_temp_file(archive, member)
-    chk = file_util.checksum('sha256', tmp_file)
-    file_util.remove(tmp_file)
-    return chk
+  def member_checksum(clazz, archive, member, hash_algorithm = 'sha256'):
+    'Return the hex checksum of member in archive without extracting it to disk.'
+    return clazz._open(archive).member_checksum(member, hash_algorithm = hash_algorithm)
+
+  @classmethod
+  def member_checksums(clazz, archive, members, hash_algorithm = 'sha256'):
+    'Return a dict of member to hex checksum for members in archive in one pass over archive.'
+    return clazz._open(archive).member_checksums(members, hash_algorithm = hash_algorithm)
     
   @classmethod
   def create(clazz, filename, root_dir, base_dir = None,
              extra_items = None,
              include = None, exclude = None,
-             extension = None):
+             extension = None, compression_level = None, num_threads = None):
+    '''
+    Create an archive from the files in root_dir.  Compressed tarballs are
+    compressed with num_threads threads (all cpus by default) at
+    compression_level.
+    '''
+    check.check_int(compression_level, allow_none = True)
+    check.check_int(num_threads, allow_none = True)
+
     if extension:
       archive_class = clazz._determine_type_for_ext(extension)
     else:
@@ -149,13 +178,17 @@ class archiver(object):
                                    extra_items = extra_items,
                                    include = include,
                                    exclude = exclude,
-                                   extension = extension)
+                                   extension = extension,
+                                   compression_level = compression_level,
+                                   num_threads = num_threads)
+    clazz._index_cache.invalidate(filename)
 
   @classmethod
   def recreate(clazz, archive, output_archive, base_dir):
     'Recreate the archive with the new a base_dir.  output_archive can be same as archive.'
     tmp_archive = clazz.recreate_temp_file(archive, base_dir)
     file_util.rename(tmp_archive, output_archive)
+    clazz._index_cache.invalidate(output_archive)
     
   @classmethod
   def recreate_temp_file(clazz, archive, base_dir, delete = True):
@@ -167,31 +200,27 @@ class archiver(object):
   @classmethod
   def create_temp_file(clazz, extension, root_dir, base_dir = None,
                        extra_items = None,
-                       include = None, exclude = None, delete = True):
+                       include = None, exclude = None, delete = True,
+                       compression_level = None, num_threads = None):
     if not archive_extension.is_valid_ext(extension):
       raise ValueError('invalid extension: {}'.format(extension))
     tmp_archive = temp_file.make_temp_file(suffix = '.' + extension, delete = delete)
     archiver.create(tmp_archive, root_dir, base_dir = base_dir,
                     extra_items = extra_items,
-                    include = include, exclude = exclude)
+                    include = include, exclude = exclude,
+                    compression_level = compression_level,
+                    num_threads = num_threads)
     return tmp_archive
 
   @classmethod
   def common_base(clazz, filename):
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
-      raise RuntimeError('Unknown archive type for %s' % (filename))
-    return archive_class(filename).common_base()
+    index = clazz._get_index(filename)
+    return index.archive_class._common_base_for_members(index.members)
 
   @classmethod
   def _determine_type(clazz, filename):
-    possible = [ archive_tar, archive_zip, archive_xz ] 
-    if host.is_macos():
-      possible.append(archive_dmg)
-    for p in possible:
-      if p.file_is_valid(filename):
-        return p
-    return None
+    index = clazz._index_cache.get(filename)
+    return index.archive_class if index else None
 
   @classmethod
   def _determine_type_for_create(clazz, filename):
@@ -226,20 +255,23 @@ class archiver(object):
   @classmethod
   def find_archives(clazz, where, relative = True):
     'Return valid archives found recursively in where.' 
-    files = file_find.find(where, relative = relative, file_type = file_find.FILE)
-    if relative:
-      files = [ f for f in files if archiver.is_valid(path.join(where, f)) ]
-    else:
-      files = [ f for f in files if archiver.is_valid(f) ]
-    return files
+    return sorted(clazz.iter_find_archives(where, relative = relative))
+
+  @classmethod
+  def iter_find_archives(clazz, where, relative = True):
+    'Yield valid archives found recursively in where as they are found in no particular order.' 
+    for f in file_find.iter_find(where, relative = relative, file_type = file_find.FILE):
+      filename = path.join(where, f) if relative else f
+      if archiver.is_valid(filename):
+        yield f
 
   @classmethod
   def format_name(clazz, filename):
     'Return the name of the archive format.  zip, tar, dmg, xz or unix_tar.'
-    archive_class = clazz._determine_type(filename)
-    if not archive_class:
+    index = clazz._index_cache.get(filename)
+    if not index:
       return None
-    return archive_class.name(filename)
+    return index.format_name
 
   operation_base = archive_operation_base
   operation_add_file = archive_operation_add_file
@@ -251,13 +283,22 @@ class archiver(object):
     check.check_string(archive)
     operations = object_util.listify(operations)
     check.check_archive_operation_seq(operations)
-    tmp_dir = clazz.extract_all_temp_dir(archive)
-    for operation in operations:
-      if not check.is_archive_operation(operation):
-        raise TypeError('Operation should be a subclass of archive_operation_base: {}'.format(operation))
-      operation.execute(tmp_dir)
-    tmp_new_archive = clazz.create_temp_file(archive_extension.extension_for_filename(archive), tmp_dir)
-    file_util.rename(tmp_new_archive, archive)
+    archive_object = clazz._open(archive)
+    if archive_object.can_apply_edits and all([ operation.can_edit for operation in operations ]):
+      # Rewrite the archive entry by entry without unpacking it
+      edits = archive_edits()
+      for operation in operations:
+        operation.edit(edits)
+      archive_object.apply_edits(edits)
+    else:
+      tmp_dir = clazz.extract_all_temp_dir(archive)
+      for operation in operations:
+        if not check.is_archive_operation(operation):
+          raise TypeError('Operation should be a subclass of archive_operation_base: {}'.format(operation))
+        operation.execute(tmp_dir)
+      tmp_new_archive = clazz.create_temp_file(archive_extension.extension_for_filename(archive), tmp_dir)
+      file_util.rename(tmp_new_archive, archive)
+    clazz._index_cache.invalidate(archive)
 
   @classmethod
   def is_empty(clazz, filename):
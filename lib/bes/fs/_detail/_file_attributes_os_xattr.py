@@ -0,0 +1,127 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import errno
+import os
+
+from bes.system.check import check
+from bes.fs.file_check import file_check
+from bes.system.log import logger
+
+from bes.fs.file_attributes_base import file_attributes_base
+
+class _file_attributes_os_xattr(file_attributes_base):
+  'File attributes using os.getxattr() and friends.  Linux only but needs no extra modules or executables.'
+
+  _log = logger('_file_attributes_os_xattr')
+
+  # Only the user namespace is writable by regular users
+  _NAMESPACE = 'user.'
+
+  # errno values for a missing attribute.  ENOATTR is ENODATA on linux
+  _MISSING_ERRNOS = ( errno.ENODATA, )
+
+  @classmethod
+  #@abstractmethod
+  def has_key(clazz, filename, key):
+    'Return True if filename has an attributed with key.'
+    filename = file_check.check_file(filename)
+    key = clazz._check_key(key)
+    clazz.check_file_is_readable(filename)
+
+    return clazz._getxattr(filename, key) is not None
+
+  @classmethod
+  #@abstractmethod
+  def get_bytes(clazz, filename, key):
+    'Return the attribute value with key for filename.'
+    filename = file_check.check_file(filename)
+    key = clazz._check_key(key)
+    clazz.check_file_is_readable(filename)
+
+    return clazz._getxattr(filename, key)
+
+  @classmethod
+  #@abstractmethod
+  def set_bytes(clazz, filename, key, value):
+    'Set the value of attribute with key to value for filename.'
+    filename = file_check.check_file(filename)
+    key = clazz._check_key(key)
+    check.check_bytes(value)
+    clazz.check_file_is_writable(filename)
+
+    os.setxattr(filename, clazz._encode_key(key), value)
+
+  @classmethod
+  #@abstractmethod
+  def remove(clazz, filename, key):
+    'Remove the attirbute with key from filename.'
+    filename = file_check.check_file(filename)
+    key = clazz._check_key(key)
+    clazz.check_file_is_writable(filename)
+
+    os.removexattr(filename, clazz._encode_key(key))
+
+  @classmethod
+  #@abstractmethod
+  def keys(clazz, filename):
+    'Return all the keys set for filename.'
+    check.check_string(filename)
+    clazz.check_file_is_readable(filename)
+
+    return sorted(clazz._list_keys(filename))
+
+  @classmethod
+  #@abstractmethod
+  def clear(clazz, filename):
+    'Create all attributes.'
+    check.check_string(filename)
+    clazz.check_file_is_writable(filename)
+
+    for key in clazz._list_keys(filename):
+      os.removexattr(filename, clazz._encode_key(key))
+
+  @classmethod
+  def get_all(clazz, filename):
+    'Return all attributes as a dictionary with one listxattr call.'
+    check.check_string(filename)
+    clazz.check_file_is_readable(filename)
+
+    result = {}
+    for key in clazz._list_keys(filename):
+      value = clazz._getxattr(filename, key)
+      if value is not None:
+        result[key] = value
+    return result
+
+  @classmethod
+  def get_many(clazz, filename, keys):
+    'Return a dict of key to value or None for keys with one listxattr call.'
+    filename = file_check.check_file(filename)
+    check.check_string_seq(keys)
+    clazz.check_file_is_readable(filename)
+
+    existing_keys = set(clazz._list_keys(filename))
+    result = {}
+    for key in keys:
+      key = clazz._check_key(key)
+      result[key] = clazz._getxattr(filename, key) if key in existing_keys else None
+    return result
+
+  @classmethod
+  def _getxattr(clazz, filename, key):
+    'Return the value for key or None if filename does not have it.'
+    try:
+      return os.getxattr(filename, clazz._encode_key(key))
+    except OSError as ex:
+      if ex.errno in clazz._MISSING_ERRNOS:
+        return None
+      raise
+
+  @classmethod
+  def _list_keys(clazz, filename):
+    n = len(clazz._NAMESPACE)
+    return [ key[n:] for key in os.listxattr(filename) if key.startswith(clazz._NAMESPACE) ]
+
+  @classmethod
+  def _encode_key(clazz, key):
+    return clazz._NAMESPACE + key
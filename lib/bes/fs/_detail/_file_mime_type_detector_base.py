@@ -18,3 +18,11 @@ class _file_mime_type_detector_base(with_metaclass(ABCMeta, object)):
   def detect_mime_type(clazz, filename):
     'Detect the mime type for file.'
     raise NotImplemented('detect_mime_type')
+
+  @classmethod
+  def detect_mime_types(clazz, filenames):
+    '''
+    Detect the mime type for many files and return a dict of filename to mime type.
+    Detectors that can do better than one file at a time should override this.
+    '''
+    return dict([ ( filename, clazz.detect_mime_type(filename) ) for filename in filenames ])
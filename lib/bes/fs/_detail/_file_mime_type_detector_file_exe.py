@@ -35,7 +35,45 @@ class _file_mime_type_detector_file_exe(_file_mime_type_detector_base):
     lines = text.splitlines()
     if not lines:
       return None
-    parts = lines[0].split(';')
-    if not parts:
+    return clazz._parse_line(lines[0])
+
+  # Number of files to give each file process
+  _BATCH_SIZE = 1000
+
+  @classmethod
+  def detect_mime_types(clazz, filenames):
+    '''
+    Detect the mime type for many files with one file process per batch.
+    The filenames are given to file on stdin so there are no command line
+    length or quoting issues.
+    '''
+    result = {}
+    batch = []
+    for filename in filenames:
+      # names with new lines cannot be given on stdin
+      if '\n' in filename:
+        result[filename] = clazz.detect_mime_type(filename)
+      else:
+        batch.append(filename)
+    for i in range(0, len(batch), clazz._BATCH_SIZE):
+      result.update(clazz._detect_batch(batch[i : i + clazz._BATCH_SIZE]))
+    return result
+
+  @classmethod
+  def _detect_batch(clazz, filenames):
+    cmd = [ 'file', '--brief', '--mime', '-f', '-' ]
+    input_data = ''.join([ filename + '\n' for filename in filenames ]).encode('utf-8')
+    rv = execute.execute(cmd, raise_error = False, input_data = input_data)
+    lines = rv.stdout.splitlines() if rv.exit_code == 0 else []
+    if len(lines) != len(filenames):
+      # something went wrong so do one file at a time
+      return dict([ ( filename, clazz.detect_mime_type(filename) ) for filename in filenames ])
+    return dict([ ( filename, clazz._parse_line(line) ) for filename, line in zip(filenames, lines) ])
+
+  @classmethod
+  def _parse_line(clazz, line):
+    'Parse a line like "image/png; charset=binary" or return None for errors.'
+    mime_type = line.split(';')[0].strip()
+    if not '/' in mime_type or ' ' in mime_type:
       return None
-    return parts[0].strip()
+    return mime_type
@@ -1,6 +1,6 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import sys, warnings
+import sys, threading, warnings
 
 from bes.system.check import check
 from bes.fs.file_check import file_check
@@ -29,8 +29,21 @@ class _file_mime_type_detector_magic(_file_mime_type_detector_base):
     'Detect the mime type for file.'
     filename = file_check.check_file(filename)
 
-    import magic
-    rv = magic.from_file(filename, mime = True)
+    rv = clazz._handle().from_file(filename)
     if not rv:
       return None
     return rv
+
+  _local = threading.local()
+  @classmethod
+  def _handle(clazz):
+    '''
+    Return a libmagic handle for the current thread.  Opening a handle loads
+    the magic database which is expensive so it is only done once per thread.
+    '''
+    handle = getattr(clazz._local, 'handle', None)
+    if handle is None:
+      import magic
+      handle = magic.Magic(mime = True)
+      clazz._local.handle = handle
+    return handle
@@ -1,89 +1,118 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import sys
 from bes.system.check import check
-from bes.common.string_util import string_util
 from bes.key_value.key_value import key_value
 from bes.key_value.key_value_list import key_value_list
 from bes.system.log import logger
-from bes.system.execute import execute
 
 class table_missing_error(Exception):
-  
+
   def __init__(self, message, what):
     super(table_missing_error, self).__init__(message)
     self.message = message
     self.what = what
-    
+
   def __str__(self):
     return self.message
 
 class file_metadata_db(object):
 
   log = logger('file_metadata_db')
-  
+
+  # Version 0 is the old layout with one table per file named
+  # {what}_{hash(filename)} and a hash_to_filename table.
+  # Version 1 is a single metadata table for all files.
+  _SCHEMA_VERSION = 1
+
   _METADATA_SCHEMA = '''
-create table {table_name}(
-  key   text primary key not null,
-  value text
-);
+create table metadata(
+  what     text not null,
+  filename text not null,
+  key      text not null,
+  value    text,
+  primary key (what, filename, key)
+) without rowid;
 '''
 
-  _HASH_TO_FILENAME_SCHEMA = '''
-create table hash_to_filename(
-  hash     text primary key not null,
-  filename text
-);
-'''
-  
+  # Max number of sql variables in one statement for old versions of sqlite
+  _MAX_VARIABLES = 900
+
   def __init__(self, db):
     self._db = db
-    self._ensure_hash_to_filename_table()
+    self._ensure_schema()
 
-  @classmethod
-  def _unsigned_hash(clazz, filename):
-    check.check_string(filename)
-    return hash(filename) + sys.maxsize
-    
-  @classmethod
-  def _table_name(clazz, what, filename):
-    return '{}_{}'.format(what, clazz._unsigned_hash(filename))
+  def close(self):
+    self._db.close()
+
+  @property
+  def journal_mode(self):
+    return self._db.journal_mode
+
+  @journal_mode.setter
+  def journal_mode(self, journal_mode):
+    self._db.journal_mode = journal_mode
 
   def get_values(self, what, filename):
     check.check_string(what)
     check.check_string(filename)
-    table_name = self._table_name(what, filename)
-    if not self._db.has_table(table_name):
-      return key_value_list()
-    sql = 'select key, value from {table_name} order by key asc'.format(table_name = table_name)
-    return key_value_list(self._db.select_all(sql))
+    sql = 'select key, value from metadata where what=? and filename=? order by key asc'
+    return key_value_list(self._db.select_all(sql, ( what, filename )))
+
+  def get_values_many(self, what, filenames):
+    'Return a dict of filename to key_value_list for many filenames in as few queries as possible.'
+    check.check_string(what)
+    check.check_string_seq(filenames)
+    result = dict([ ( filename, key_value_list() ) for filename in filenames ])
+    unique_filenames = sorted(result.keys())
+    for i in range(0, len(unique_filenames), self._MAX_VARIABLES):
+      chunk = unique_filenames[i : i + self._MAX_VARIABLES]
+      placeholders = ', '.join([ '?' ] * len(chunk))
+      sql = f'select filename, key, value from metadata where what=? and filename in ({placeholders}) order by filename asc, key asc'
+      for filename, key, value in self._db.select_all(sql, tuple([ what ] + chunk)):
+        result[filename].append(key_value(key, value))
+    return result
+
+  def has_values(self, what, filename):
+    check.check_string(what)
+    check.check_string(filename)
+    sql = 'select exists(select 1 from metadata where what=? and filename=? limit 1)'
+    return bool(self._db.select_one(sql, ( what, filename ))[0])
 
   def replace_values(self, what, filename, values):
     check.check_string(what)
     check.check_string(filename)
     check.check_key_value_list(values)
-    table_name = self._table_name(what, filename)
-    self._ensure_hash_to_filename(filename)
-    self._sqlite_write('replace_values', self._replace_values_i, table_name, values)
+    self._sqlite_write('replace_values', self._replace_values_i, what, filename, values)
 
   def set_value(self, what, filename, key, value):
     check.check_string(what)
     check.check_string(filename)
     check.check_string(key)
-    table_name = self._table_name(what, filename)
-    self._ensure_hash_to_filename(filename)
-    self._sqlite_write('set_value', self._set_value_i, table_name, key, value)
+    self._sqlite_write('set_value', self._set_values_i, what, [ ( filename, key, value ) ])
+
+  def set_values_many(self, what, values):
+    '''
+    Set many values in a single transaction.  values is a dict of filename to
+    a dict of key to value.  Keys not mentioned are left untouched.
+    '''
+    check.check_string(what)
+    check.check_dict(values)
+    rows = []
+    for filename, file_values in sorted(values.items()):
+      check.check_string(filename)
+      for key, value in sorted(file_values.items()):
+        check.check_string(key)
+        rows.append(( filename, key, value ))
+    if not rows:
+      return
+    self._sqlite_write('set_values_many', self._set_values_i, what, rows)
 
   def get_value(self, what, filename, key):
     check.check_string(what)
     check.check_string(filename)
     check.check_string(key)
-    table_name = self._table_name(what, filename)
-    if not self._db.has_table(table_name):
-      return None
-    sql = 'select value from {table_name} where key={key}'.format(table_name = table_name,
-                                                                  key = string_util.quote(key))
-    result = self._db.select_one(sql)
+    sql = 'select value from metadata where what=? and filename=? and key=?'
+    result = self._db.select_one(sql, ( what, filename, key ))
     if result is None:
       return None
     return result[0]
@@ -91,9 +120,7 @@ create table hash_to_filename(
   def clear(self, what, filename):
     check.check_string(what)
     check.check_string(filename)
-    table_name = self._table_name(what, filename)
-    self._ensure_hash_to_filename(filename)
-    self._sqlite_write('clear', self._clear_i, table_name)
+    self._sqlite_write('clear', self._clear_i, what, filename)
 
   def _sqlite_write(self, label, function, *args):
     'Call a write operation to the db.'
@@ -103,61 +130,49 @@ create table hash_to_filename(
     except Exception as ex:
       self.log.log_e('_sqlite_write: Caught exception: {}'.format(str(ex)))
       self.log.log_exception(ex)
-      raise
       try:
         self._db.rollback()
       except Exception as sqlite_ex:
         self.log.log_e('{}: CAUGHT EXCEPTION ROLLING BACK: {}'.format(label, str(sqlite_ex)))
       raise ex
-    
-  def _ensure_table(self, table_name):
-    'Ensure that a table exists.  Does not commit.'
-    if self._db.has_table(table_name):
-      return
-    schema = self._METADATA_SCHEMA.format(table_name = table_name)
-    self._db.execute(schema)
-
-  def _ensure_hash_to_filename(self, filename):
-    h = self._unsigned_hash(filename)
-    sql = 'insert or replace into hash_to_filename (hash, filename) values (?, ?)'
-    values = ( str(h), filename )
-    self._db.execute(sql, values)
-    
-  def _ensure_hash_to_filename_table(self):
-    if self._db.has_table('hash_to_filename'):
-      return
-    self._db.execute(self._HASH_TO_FILENAME_SCHEMA)
-    
-  def _replace_values_i(self, table_name, values):
-    'Do the replace_values work without transactions.'
-    if not values and not self._db.has_table(table_name):
-      return
-    if not values:
-      sql = 'delete from {table_name}'.format(table_name = table_name)
-      self._db.execute(sql)
+
+  def _ensure_schema(self):
+    version = self._db.user_version
+    if version >= self._SCHEMA_VERSION:
       return
-    self._ensure_table(table_name)
-    for kv in values:
-      sql = 'insert or replace into {table_name} (key, value) values (?, ?)'.format(table_name = table_name)
-      self._db.execute(sql, kv)
-      keys = self._quoted_keys(values)
-      sql = 'delete from {table_name} where key not in ({keys})'.format(table_name = table_name,
-                                                                        keys = ', '.join(keys))
-      self._db.execute(sql)
-    
-  def _clear_i(self, table_name):
-    if not self._db.has_table(table_name):
+    self._sqlite_write('migrate', self._migrate_i)
+    self._db.user_version = self._SCHEMA_VERSION
+
+  def _migrate_i(self):
+    'Create the metadata table and migrate the old table per file layout into it.  Does not commit.'
+    self._db.ensure_table('metadata', self._METADATA_SCHEMA)
+    if not self._db.has_table('hash_to_filename'):
       return
-    sql = 'drop table {table_name}'.format(table_name = table_name)
-    self._db.execute(sql)
-    
-  def _set_value_i(self, table_name, key, value):
+    hash_to_filename = dict(self._db.select_all('select hash, filename from hash_to_filename'))
+    table_names = [ row[0] for row in self._db.select_all('select name from sqlite_master where type=?', ( 'table', )) ]
+    for table_name in table_names:
+      what, delim, h = table_name.rpartition('_')
+      if not delim or not what or not h.isdigit():
+        continue
+      filename = hash_to_filename.get(h, None)
+      if filename is not None:
+        self.log.log_d(f'_migrate_i: migrating {table_name} for {filename}')
+        sql = f'insert or replace into metadata (what, filename, key, value) select ?, ?, key, value from {table_name}'
+        self._db.execute(sql, ( what, filename ))
+      else:
+        self.log.log_w(f'_migrate_i: dropping table with unknown filename: {table_name}')
+      self._db.execute(f'drop table {table_name}')
+    self._db.execute('drop table hash_to_filename')
+
+  def _replace_values_i(self, what, filename, values):
     'Do the replace_values work without transactions.'
-    self._ensure_table(table_name)
-    sql = 'insert or replace into {table_name} (key, value) values (?, ?)'.format(table_name = table_name)
-    self._db.execute(sql, ( key, value ))
-    
-  @classmethod
-  def _quoted_keys(clazz, kvl):
-    return [ string_util.quote(key) for key in kvl.all_keys() ]
-  
+    self._clear_i(what, filename)
+    self._set_values_i(what, [ ( filename, kv.key, kv.value ) for kv in values ])
+
+  def _clear_i(self, what, filename):
+    self._db.execute('delete from metadata where what=? and filename=?', ( what, filename ))
+
+  def _set_values_i(self, what, rows):
+    'Do the set_value work without transactions.'
+    sql = 'insert or replace into metadata (what, filename, key, value) values (?, ?, ?, ?)'
+    self._db.executemany(sql, [ ( what, filename, key, value ) for filename, key, value in rows ])
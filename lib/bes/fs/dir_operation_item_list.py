@@ -1,5 +1,7 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
 from os import path
 
 from bes.common.algorithm import algorithm
@@ -18,59 +20,92 @@ class dir_operation_item_list(type_checked_list):
   def __init__(self, values = None):
     super(dir_operation_item_list, self).__init__(values = values)
 
-  def move_files(self, timestamp, count, callback = None, touch = False):
+  # Number of threads for cross device copies and content comparisons
+  DEFAULT_NUM_THREADS = 4
+
+  def move_files(self, timestamp, count, callback = None, touch = False, num_threads = None):
+    '''
+    Move the files and return the list of destination files that were moved.
+    Moves within the same device are plain renames done right away.  Moves
+    across devices are copies that run on num_threads threads.  callback is
+    called with (item, i, num) for each item in the main thread.
+    '''
     check.check_string(timestamp, allow_none = True)
     check.check_int(count, allow_none = True)
     check.check_callable(callback, allow_none = True)
+    check.check_int(num_threads, allow_none = True)
 
-    result = []
-    resolved_items = self.resolve_for_move(timestamp, count)
-    num = len(resolved_items)
-    for i, item in enumerate(resolved_items, start = 1):
-      need_move = False
-      if path.exists(item.dst_filename):
-        #assert file_util.files_are_the_same(item.src_filename,
-        #                                    item.dst_filename)
-        print(f'checking {item.src_filename} vs {item.dst_filename}')
-        need_move = file_util.files_are_the_same(item.src_filename,
-                                                 item.dst_filename)
-      else:
-        need_move = True
-      if need_move:
-        file_util.rename(item.src_filename, item.dst_filename)
-        if touch:
-          file_util.touch(item.dst_filename)
-        result.append(item.dst_filename)
-      if callback:
-        callback(item, i, num)
-    return result
-
-  def copy_files(self, timestamp, count, callback = None, touch_files = False):
+    return self._execute(timestamp, count, callback, touch, num_threads, True)
+
+  def copy_files(self, timestamp, count, callback = None, touch_files = False, num_threads = None):
+    '''
+    Copy the files and return the list of destination files that were copied.
+    The copies run on num_threads threads.  callback is called with (item, i, num)
+    for each item in the main thread.
+    '''
     check.check_string(timestamp, allow_none = True)
     check.check_int(count, allow_none = True)
     check.check_callable(callback, allow_none = True)
+    check.check_int(num_threads, allow_none = True)
+
+    return self._execute(timestamp, count, callback, touch_files, num_threads, False)
+
+  def _execute(self, timestamp, count, callback, touch, num_threads, move):
+    num_threads = max(1, num_threads or self.DEFAULT_NUM_THREADS)
+    with ThreadPoolExecutor(max_workers = num_threads) as executor:
+      # An existing destination is only replaced if it has the same content.
+      # Destinations that are different were already renamed.
+      resolved_items, same = self._resolve_for_move(timestamp, count, executor)
+      num = len(resolved_items)
+      for dirname in set([ item.dst_dirname for item in resolved_items ]):
+        file_util.mkdir(dirname)
+
+      done = {}
+      pending = {}
+      devices = {}
+      i = 0
+      for item in resolved_items:
+        if not same.get(item, True):
+          done[item] = False
+        elif move and self._same_device(item, devices):
+          os.replace(item.src_filename, item.dst_filename)
+          self._finish_item(item, touch)
+          done[item] = True
+        else:
+          pending[executor.submit(self._transfer_item, item, touch, move)] = item
+          continue
+        i += 1
+        if callback:
+          callback(item, i, num)
+      for future in as_completed(pending):
+        future.result()
+        item = pending[future]
+        done[item] = True
+        i += 1
+        if callback:
+          callback(item, i, num)
+    return [ item.dst_filename for item in resolved_items if done[item] ]
+
+  @classmethod
+  def _same_device(clazz, item, devices):
+    'Return True if src and dst of item are on the same device.  devices caches dst dir devices.'
+    if not item.dst_dirname in devices:
+      devices[item.dst_dirname] = os.stat(item.dst_dirname).st_dev
+    return os.stat(item.src_filename).st_dev == devices[item.dst_dirname]
+
+  @classmethod
+  def _transfer_item(clazz, item, touch, move):
+    if move:
+      file_util.rename(item.src_filename, item.dst_filename)
+    else:
+      file_util.copy(item.src_filename, item.dst_filename)
+    clazz._finish_item(item, touch)
+
+  @classmethod
+  def _finish_item(clazz, item, touch):
+    if touch:
+      file_util.touch(item.dst_filename)
 
-    result = []
-    resolved_items = self.resolve_for_move(timestamp, count)
-    num = len(resolved_items)
-    for i, item in enumerate(resolved_items, start = 1):
-      need_copy = False
-      if path.exists(item.dst_filename):
-        assert file_util.files_are_the_same(item.src_filename,
-                                            item.dst_filename)
-        need_copy = file_util.files_are_the_same(item.src_filename,
-                                                 item.dst_filename)
-      else:
-        need_copy = True
-      if need_copy:
-        file_util.copy(item.src_filename, item.dst_filename)
-        if touch_files:
-          file_util.touch(item.dst_filename)
-        result.append(item.dst_filename)
-      if callback:
-        callback(item, i, num)
-    return result
-  
   @classmethod
   def _make_resolved_filename(clazz, filename, timestamp, count):
     basename = path.basename(filename)
@@ -81,19 +116,36 @@ class dir_operation_item_list(type_checked_list):
     new_basename = filename_util.add_extension(new_basename_no_ext, ext)
     return path.join(dirname, new_basename)
 
-  def resolve_for_move(self, timestamp, count):
+  def resolve_for_move(self, timestamp, count, num_threads = None):
+    '''
+    Return a new list where destinations that clash with another item or
+    with an existing file with different content are renamed.  The content
+    comparisons run on num_threads threads.
+    '''
     check.check_string(timestamp, allow_none = True)
     check.check_int(count, allow_none = True)
+    check.check_int(num_threads, allow_none = True)
 
+    num_threads = max(1, num_threads or self.DEFAULT_NUM_THREADS)
+    with ThreadPoolExecutor(max_workers = num_threads) as executor:
+      return self._resolve_for_move(timestamp, count, executor)[0]
+
+  def _resolve_for_move(self, timestamp, count, executor):
+    '''
+    Return a tuple of the resolved items and a dict of resolved item to True
+    if its existing destination has the same content as its source.  Each
+    pair is compared once on executor.
+    '''
     timestamp = timestamp or time_util.timestamp()
     count = count or 1
-    
+
+    same = self._compare_existing(self, executor)
     main_map = {}
     for item in self:
       if not item.dst_dirname in main_map:
         main_map[item.dst_dirname] = {}
       dir_map = main_map[item.dst_dirname]
-      if item.dst_basename in dir_map or (item.dst_exists() and not item.src_and_dst_are_the_same()):
+      if item.dst_basename in dir_map or not same.get(item, True):
         new_dst_filename = self._make_resolved_filename(item.dst_filename, timestamp, count)
         count += 1
         new_item = item.clone(mutations = { 'dst_filename': new_dst_filename })
@@ -105,6 +157,15 @@ class dir_operation_item_list(type_checked_list):
       for __, item in dir_map.items():
         result.append(item)
     result.sort(key = lambda item: item.dst_filename)
-    return result
+    # A renamed destination can still exist in the rare case it was used before
+    renamed = [ item for item in result if not item in same ]
+    same.update(self._compare_existing(renamed, executor))
+    return result, same
+
+  @classmethod
+  def _compare_existing(clazz, items, executor):
+    'Return a dict of item to src_and_dst_are_the_same() for the items whose dst exists.'
+    existing = [ item for item in items if item.dst_exists() ]
+    return dict(zip(existing, executor.map(lambda item: item.src_and_dst_are_the_same(), existing)))
                                           
 check.register_class(dir_operation_item_list, include_seq = False)
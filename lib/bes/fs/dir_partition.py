@@ -16,6 +16,7 @@ from .dir_partition_options import dir_partition_options
 from .dir_partition_type import dir_partition_type
 from .file_check import file_check
 from .file_find import file_find
+from .file_mime_type_cache import file_mime_type_cache
 from .file_path import file_path
 from .file_util import file_util
 from .filename_list import filename_list
@@ -57,7 +58,7 @@ class dir_partition(object):
     if options.partition_type == None:
       return items
     elif options.partition_type == dir_partition_type.MEDIA_TYPE:
-      criteria = dir_partition_criteria_media_type()
+      criteria = dir_partition_criteria_media_type(mime_cache = file_mime_type_cache.get(options.mime_cache))
       result = clazz._partition_info_by_criteria(files, dst_dir_abs, criteria, options)
     elif options.partition_type == dir_partition_type.PREFIX:
       criteria = dir_partition_criteria_prefix()
@@ -69,20 +70,22 @@ class dir_partition(object):
     return result
   
   @classmethod
-  def _resolve_files(clazz, files, recursive):
+  def _resolve_files(clazz, files, options):
     resolver_options = file_resolver_options(sort_order = 'depth',
                                              sort_reverse = True,
-                                             recursive = recursive)
+                                             recursive = options.recursive,
+                                             walk_cache = options.walk_cache)
     return file_resolver.resolve_files(files, options = resolver_options)
 
   @classmethod
   def _partition_info_by_criteria(clazz, files, dst_dir_abs, criteria, options):
     if not criteria:
       raise RuntimeError('No partition_criteria given for partition_type "criteria"')
-    resolved_files = clazz._resolve_files(files, options.recursive)
+    resolved_files = clazz._resolve_files(files, options)
     for f in resolved_files:
       clazz._log.log_d(f'resolved_file: {f.root_dir} - {f.filename}')
 
+    criteria.prepare([ f.filename_abs for f in resolved_files ])
     classifications = {}
     for f in resolved_files:
       classification = criteria.classify(f.filename_abs)
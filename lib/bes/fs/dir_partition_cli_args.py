@@ -36,6 +36,10 @@ class dir_partition_cli_args(object):
                    help = 'Partition directories recursively [ None ]')
     p.add_argument('--verbose', action = 'store_true', default = False,
                    help = 'Verbose output [ False ]')
+    p.add_argument('--walk-cache', action = 'store', default = None,
+                   help = 'Cache directory listings in this db to speed up repeated runs [ None ]')
+    p.add_argument('--mime-cache', action = 'store', default = None,
+                   help = 'Cache detected mime types in this db to speed up repeated runs [ None ]')
     
   def _command_dir_partition(self, command, *args, **kargs):
     from .dir_partition_cli_handler import dir_partition_cli_handler
@@ -11,5 +11,9 @@ class dir_partition_criteria_base(with_metaclass(ABCMeta, object)):
   def classify(self, filename):
     'Return a string that classifies filename for dir partition.'
     raise NotImplemented('classify')
+
+  def prepare(self, filenames):
+    'Called with all the filenames before classify() so criteria can do work in batches.'
+    pass
   
 check.register_class(dir_partition_criteria_base, name = 'dir_partition_criteria', include_seq = False)
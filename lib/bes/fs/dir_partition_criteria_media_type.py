@@ -3,11 +3,24 @@
 from .dir_partition_criteria_base import dir_partition_criteria_base
 from .file_attributes_metadata import file_attributes_metadata
 from .file_check import file_check
+from .file_mime import file_mime
 
 class dir_partition_criteria_media_type(dir_partition_criteria_base):
+
+  def __init__(self, mime_cache = None):
+    self._mime_cache = mime_cache
+    self._media_types = {}
+
+  #@abstractmethod
+  def prepare(self, filenames):
+    'Detect the mime types of all the files in batches.'
+    for filename, mime_type in file_mime.mime_types(filenames, cache = self._mime_cache).items():
+      self._media_types[filename] = file_mime.media_type_for_mime_type(mime_type)
   
   def classify(self, filename):
     filename = file_check.check_file(filename)
+    if filename in self._media_types:
+      return self._media_types[filename]
     media_type = file_attributes_metadata.get_media_type(filename, fallback = True, cached = True)
     if media_type == 'unknown':
       return None
@@ -27,6 +27,7 @@ class dir_partition_options(files_cli_options):
       'threshold': dir_partition_defaults.THRESHOLD,
       'dst_dir': dir_partition_defaults.DST_DIR,
       'delete_empty_dirs': dir_partition_defaults.DELETE_EMPTY_DIRS,
+      'mime_cache': None,
     })
   
   @classmethod
@@ -52,5 +53,6 @@ class dir_partition_options(files_cli_options):
     check.check_int(self.threshold, allow_none = True)
     check.check_string(self.dst_dir)
     check.check_bool(self.delete_empty_dirs)
+    check.check_string(self.mime_cache, allow_none = True)
 
 check.register_class(dir_partition_options)
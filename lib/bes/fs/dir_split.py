@@ -1,6 +1,7 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
 from collections import namedtuple
+import os
 import os.path as path
 
 from bes.common.algorithm import algorithm
@@ -12,11 +13,11 @@ from bes.system.log import logger
 from .dir_operation_item import dir_operation_item
 from .dir_operation_item_list import dir_operation_item_list
 from .dir_split_options import dir_split_options
+from .dir_split_plan import dir_split_plan
 from .dir_util import dir_util
-from .file_attributes_metadata import file_attributes_metadata
+from .dir_walk_cache import dir_walk_cache
 from .file_check import file_check
 from .file_find import file_find
-from .file_mime import file_mime
 from .file_path import file_path
 from .file_sort_order import file_sort_order
 from .file_util import file_util
@@ -35,45 +36,51 @@ class dir_split(object):
     check.check_dir_split_options(options, allow_none = True)
 
     options = options or dir_split_options()
-    info = clazz._split_info(src_dir_abs, dst_dir_abs, options)
-    num_items = len(info.items)
+    plan = clazz._split_info(src_dir_abs, dst_dir_abs, options)
+    num_items = len(plan.items)
     if num_items == 0:
       return
     if options.threshold and num_items < options.threshold:
       return
-    info.items.move_files(options.dup_file_timestamp,
+    clazz.apply_plan(plan, dst_dir_abs, options = options)
+
+  @classmethod
+  def apply_plan(clazz, plan, dst_dir, options = None):
+    'Apply a plan made by split_plan().'
+    check.check_dir_split_plan(plan)
+    check.check_string(dst_dir)
+    check.check_dir_split_options(options, allow_none = True)
+
+    options = options or dir_split_options()
+    dst_dir_abs = path.abspath(dst_dir)
+    plan.items.move_files(options.dup_file_timestamp,
                           options.dup_file_count)
     
-    for d in info.existing_split_dirs:
-      if dir_util.is_empty(d):
+    for d in plan.existing_split_dirs:
+      if path.isdir(d) and dir_util.is_empty(d):
         dir_util.remove(d)
 
-    for next_possible_empty_root in info.possible_empty_dirs_roots:
-      file_find.remove_empty_dirs(next_possible_empty_root)
+    for next_possible_empty_root in plan.possible_empty_dirs_roots:
+      if path.isdir(next_possible_empty_root):
+        file_find.remove_empty_dirs(next_possible_empty_root)
 
     if path.exists(dst_dir_abs):
       file_find.remove_empty_dirs(dst_dir_abs)
       
-  _file_info = namedtuple('_file_info', 'filename')
-  _split_items_info = namedtuple('_split_items_info', 'items, existing_split_dirs, possible_empty_dirs_roots')
+  _file_info = namedtuple('_file_info', 'filename, size, mtime')
   @classmethod
   def _split_info(clazz, src_dir, dst_dir, options):
     assert path.isabs(src_dir)
     assert path.isabs(dst_dir)
 
-    old_files = []
-    existing_split_dirs = clazz._existing_split_dirs(dst_dir, options.prefix)
-    for old_dir in existing_split_dirs:
-      old_files.extend(dir_util.list_files(old_dir))
-    clazz._log.log_d('old_files={}'.format(old_files))
-    
     options = options or dir_split_options()
-    items = dir_operation_item_list()
+    walk_cache = dir_walk_cache.get(options.walk_cache)
+    existing_split_dirs = clazz._existing_split_dirs(dst_dir, options.prefix)
     if options.recursive:
-      new_files = file_find.find(src_dir, relative = False, file_type = file_find.FILE)
+      file_info_list = clazz._scan_files(src_dir, True, walk_cache)
 
       possible_empty_dirs_roots = []
-      dirs = algorithm.unique([ path.dirname(f) for f in new_files ])
+      dirs = algorithm.unique([ path.dirname(finfo.filename) for finfo in file_info_list ])
       for d in dirs:
         if d != src_dir:
           d_relative = file_util.remove_head(d, src_dir + path.sep)
@@ -82,14 +89,29 @@ class dir_split(object):
             possible_empty_dirs_roots.append(d_root)
       possible_empty_dirs_roots = algorithm.unique(possible_empty_dirs_roots)
     else:
-      new_files = dir_util.list_files(src_dir)
+      file_info_list = clazz._scan_files(src_dir, False, walk_cache)
       possible_empty_dirs_roots = []
+
+    # Old split dirs already walked as part of src_dir are not listed again.
+    # They still go first so files with the same sort key keep their order.
+    src_dir_head = src_dir + path.sep
+    by_dir = {}
+    if options.recursive:
+      for finfo in file_info_list:
+        by_dir.setdefault(path.dirname(finfo.filename), []).append(finfo)
+    old_file_info_list = []
+    for old_dir in existing_split_dirs:
+      if options.recursive and old_dir.startswith(src_dir_head):
+        old_file_info_list.extend(by_dir.get(old_dir, []))
+      else:
+        old_file_info_list.extend(clazz._scan_files(old_dir, False, walk_cache))
+    file_info_list = algorithm.unique(old_file_info_list + file_info_list)
+    clazz._log.log_d(lambda: 'file_info_list={}'.format([ finfo.filename for finfo in file_info_list ]))
     
-    files = algorithm.unique(old_files + new_files)
-    file_info_list = clazz._make_file_info_list(files)
     sorted_file_info_list = clazz._sort_file_info_list(file_info_list,
                                                        options.sort_order,
                                                        options.sort_reverse)
+    items = dir_operation_item_list()
     chunks = [ chunk for chunk in object_util.chunks(sorted_file_info_list, options.chunk_size) ]
     num_chunks = len(chunks)
     num_digits = len(str(num_chunks))
@@ -98,21 +120,61 @@ class dir_split(object):
       chunk_dst_dir = path.join(dst_dir, dst_basename)
       for finfo in chunk:
         dst_filename = path.join(chunk_dst_dir, path.basename(finfo.filename))
-        #print(f'making item:\nfinfo.filename={finfo.filename}\ndst_filename={dst_filename}\ndst_basename={dst_basename}')
         item = dir_operation_item(finfo.filename, dst_filename)
         items.append(item)
-    return clazz._split_items_info(items, existing_split_dirs, possible_empty_dirs_roots)
+    return dir_split_plan(items, existing_split_dirs, possible_empty_dirs_roots)
 
   @classmethod
-  def split_items(clazz, src_dir, dst_dir, options = None):
-    'Return a list of split items that when renaming each item implements split.'
+  def split_plan(clazz, src_dir, dst_dir, options = None):
+    'Return a dir_split_plan that can be applied now or later with apply_plan().'
     src_dir_abs = file_check.check_dir(src_dir)
     check.check_string(dst_dir)
     dst_dir_abs = path.abspath(dst_dir)
     check.check_dir_split_options(options, allow_none = True)
 
-    info = clazz._split_info(src_dir_abs, dst_dir_abs, options)
-    return info.items
+    return clazz._split_info(src_dir_abs, dst_dir_abs, options)
+
+  @classmethod
+  def split_items(clazz, src_dir, dst_dir, options = None):
+    'Return a list of split items that when renaming each item implements split.'
+    return clazz.split_plan(src_dir, dst_dir, options = options).items
+
+  @classmethod
+  def _scan_files(clazz, root_dir, recursive, walk_cache):
+    '''
+    Return a list of _file_info for the files in root_dir with exactly one stat
+    per file.  Recursive scans skip symlinks like file_find.find() while flat
+    scans follow them like dir_util.list_files().  walk_cache only provides the
+    listings.  Its sizes and mtimes can be stale after a file is edited in place
+    so the sort keys always come from a live stat.
+    '''
+    result = []
+    stack = [ root_dir ]
+    while stack:
+      next_dir = stack.pop()
+      if walk_cache:
+        entries = walk_cache.scandir(next_dir)
+      else:
+        with os.scandir(next_dir) as it:
+          entries = list(it)
+      for entry in entries:
+        if recursive:
+          if entry.is_dir(follow_symlinks = False):
+            stack.append(entry.path)
+            continue
+          if not entry.is_file(follow_symlinks = False):
+            continue
+        elif not entry.is_file():
+          continue
+        try:
+          st = os.stat(entry.path)
+        except FileNotFoundError as ex:
+          # Removed since the cached listing was made
+          continue
+        result.append(clazz._file_info(entry.path, st.st_size, st.st_mtime))
+    if walk_cache:
+      walk_cache.flush()
+    return sorted(result)
   
   @classmethod
   def _existing_split_dirs(clazz, dst_dir, prefix):
@@ -138,33 +200,12 @@ class dir_split(object):
       if order == file_sort_order.FILENAME:
         criteria.append(finfo.filename)
       elif order == file_sort_order.SIZE:
-        criteria.append(file_util.size(finfo.filename))
+        criteria.append(finfo.size)
       elif order == file_sort_order.DATE:
-        criteria.append(file_util.get_modification_date(finfo.filename))
+        criteria.append(finfo.mtime)
       elif order == file_sort_order.DEPTH:
         criteria.append(file_path.depth(finfo.filename))
       else:
         assert False
       return tuple(criteria)
     return sorted(file_info_list, key = _sort_key, reverse = reverse)
-
-  _MEDIA_TYPE_CACHE = {}
-  @classmethod
-  def _file_media_type(clazz, filename):
-    assert path.isabs(filename)
-    if not filename in clazz._MEDIA_TYPE_CACHE:
-      mime_type = file_attributes_metadata.get_mime_type(filename, fallback = True)
-      clazz._MEDIA_TYPE_CACHE[filename] = file_mime.media_type_for_mime_type(mime_type)
-    return clazz._MEDIA_TYPE_CACHE[filename]
-  
-  @classmethod
-  def _file_media_type(clazz, filename):
-    mime_type = file_attributes_metadata.get_mime_type(filename, fallback = True)
-    return file_mime.media_type_for_mime_type(mime_type)
-  
-  @classmethod
-  def _make_file_info_list(clazz, files):
-    result = []
-    for filename in files:
-      result.append(clazz._file_info(filename))
-    return result
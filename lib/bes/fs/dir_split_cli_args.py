@@ -39,6 +39,8 @@ class dir_split_cli_args(object):
                    help = 'Split directories recursively [ None ]')
     p.add_argument('--verbose', action = 'store_true', default = False,
                    help = 'Verbose output [ False ]')
+    p.add_argument('--walk-cache', action = 'store', default = None,
+                   help = 'Cache directory listings in this db to speed up repeated runs [ None ]')
     
   def _command_dir_split(self, command, *args, **kargs):
     from .dir_split_cli_handler import dir_split_cli_handler
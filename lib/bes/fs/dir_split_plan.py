@@ -0,0 +1,44 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from collections import namedtuple
+import json
+
+from bes.common.json_util import json_util
+from bes.system.check import check
+
+from .dir_operation_item import dir_operation_item
+from .dir_operation_item_list import dir_operation_item_list
+
+class dir_split_plan(namedtuple('dir_split_plan', 'items, existing_split_dirs, possible_empty_dirs_roots')):
+  '''
+  The result of planning a dir split.  items are the moves that implement the
+  split.  existing_split_dirs and possible_empty_dirs_roots are cleaned up
+  after the moves.  A plan can be saved as json and applied later with
+  dir_split.apply_plan().
+  '''
+
+  def __new__(clazz, items, existing_split_dirs, possible_empty_dirs_roots):
+    check.check_dir_operation_item_list(items)
+    check.check_string_seq(existing_split_dirs)
+    check.check_string_seq(possible_empty_dirs_roots)
+
+    return clazz.__bases__[0].__new__(clazz, items, existing_split_dirs, possible_empty_dirs_roots)
+
+  def to_json(self):
+    d = {
+      'items': [ [ item.src_filename, item.dst_filename ] for item in self.items ],
+      'existing_split_dirs': list(self.existing_split_dirs),
+      'possible_empty_dirs_roots': list(self.possible_empty_dirs_roots),
+    }
+    return json_util.to_json(d, indent = 2)
+
+  @classmethod
+  def from_json(clazz, text):
+    check.check_string(text)
+
+    o = json.loads(text)
+    check.check_dict(o)
+    items = dir_operation_item_list([ dir_operation_item(src, dst) for src, dst in o['items'] ])
+    return dir_split_plan(items, o['existing_split_dirs'], o['possible_empty_dirs_roots'])
+
+check.register_class(dir_split_plan, include_seq = False)
@@ -0,0 +1,164 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from collections import namedtuple
+import os
+import os.path as path
+import stat
+import time
+
+from ..sqlite.sqlite import sqlite
+from ..system.check import check
+from ..system.log import logger
+
+class dir_walk_cache_entry(namedtuple('dir_walk_cache_entry', 'path, name, mode, size, mtime_ns, inode, target_is_dir')):
+  'A cached directory entry that quacks like os.DirEntry.'
+
+  _stat_result = namedtuple('_stat_result', 'st_mode, st_size, st_mtime, st_mtime_ns, st_ino')
+
+  def is_symlink(self):
+    return stat.S_ISLNK(self.mode)
+
+  def is_dir(self, follow_symlinks = True):
+    if follow_symlinks and self.is_symlink():
+      return self.target_is_dir
+    return stat.S_ISDIR(self.mode)
+
+  def is_file(self, follow_symlinks = True):
+    if follow_symlinks and self.is_symlink():
+      return path.isfile(self.path)
+    return stat.S_ISREG(self.mode)
+
+  def stat(self, follow_symlinks = True):
+    if follow_symlinks and self.is_symlink():
+      return os.stat(self.path)
+    return self._stat_result(self.mode, self.size, self.mtime_ns / 1000000000.0, self.mtime_ns, self.inode)
+
+class dir_walk_cache(object):
+  '''
+  A persistent snapshot of directory listings (path, size, mtime, inode).
+  A cached listing is reused as long as the directory mtime and inode did
+  not change.  Modifying a file in place does not change the directory mtime
+  so the cached size and mtime of entries can be stale.  Only the listing
+  itself is guaranteed to be current.
+  '''
+
+  _log = logger('dir_walk_cache')
+
+  _DIRS_SCHEMA = '''
+create table dirs(
+  path         text primary key not null,
+  mtime_ns     integer not null,
+  inode        integer not null,
+  scan_time_ns integer not null
+);
+'''
+
+  _ENTRIES_SCHEMA = '''
+create table entries(
+  dir           text not null,
+  name          text not null,
+  mode          integer not null,
+  size          integer not null,
+  mtime_ns      integer not null,
+  inode         integer not null,
+  target_is_dir integer not null,
+  primary key (dir, name)
+) without rowid;
+'''
+
+  # A directory modified this close to the time it was scanned could have
+  # changed again within the mtime granularity so its listing is not trusted.
+  _RACY_NS = 2 * 1000000000
+
+  # Number of rescanned directories after which changes are committed
+  _COMMIT_INTERVAL = 500
+
+  def __init__(self, db_filename):
+    check.check_string(db_filename)
+
+    self._db = sqlite(db_filename)
+    self._db.ensure_table('dirs', self._DIRS_SCHEMA)
+    self._db.ensure_table('entries', self._ENTRIES_SCHEMA)
+    self._db.commit()
+    self._num_pending = 0
+    self.hits = 0
+    self.misses = 0
+
+  _instances = {}
+  @classmethod
+  def get(clazz, db_filename):
+    'Return a shared cache for db_filename or None if db_filename is None.'
+    check.check_string(db_filename, allow_none = True)
+    if not db_filename:
+      return None
+    db_filename = path.abspath(db_filename)
+    if not db_filename in clazz._instances:
+      clazz._instances[db_filename] = dir_walk_cache(db_filename)
+    return clazz._instances[db_filename]
+
+  def scandir(self, dirname):
+    'Return a list of dir_walk_cache_entry for dirname using the cached listing when still valid.'
+    check.check_string(dirname)
+
+    st = os.stat(dirname)
+    row = self._db.select_one('select mtime_ns, inode, scan_time_ns from dirs where path=?', ( dirname, ))
+    if row and self._is_valid(st, *row):
+      self.hits += 1
+      rows = self._db.select_all('select name, mode, size, mtime_ns, inode, target_is_dir from entries where dir=?', ( dirname, ))
+      return [ dir_walk_cache_entry(path.join(dirname, name), name, mode, size, mtime_ns, inode, bool(target_is_dir))
+               for name, mode, size, mtime_ns, inode, target_is_dir in rows ]
+    self.misses += 1
+    self._log.log_d(f'scandir: rescanning {dirname}')
+    scan_time_ns = time.time_ns()
+    entries = self._scan(dirname)
+    self._update(dirname, st, scan_time_ns, entries)
+    return entries
+
+  def flush(self):
+    'Commit pending changes.'
+    if self._num_pending:
+      self._db.commit()
+      self._num_pending = 0
+
+  def _is_valid(self, st, mtime_ns, inode, scan_time_ns):
+    if st.st_mtime_ns != mtime_ns or st.st_ino != inode:
+      return False
+    return (scan_time_ns - mtime_ns) >= self._RACY_NS
+
+  @classmethod
+  def _scan(clazz, dirname):
+    result = []
+    with os.scandir(dirname) as it:
+      for entry in it:
+        try:
+          st = entry.stat(follow_symlinks = False)
+        except FileNotFoundError as ex:
+          continue
+        try:
+          target_is_dir = entry.is_dir()
+        except OSError as ex:
+          target_is_dir = False
+        result.append(dir_walk_cache_entry(entry.path, entry.name, st.st_mode, st.st_size,
+                                           st.st_mtime_ns, st.st_ino, target_is_dir))
+    return result
+
+  def _update(self, dirname, st, scan_time_ns, entries):
+    old_dirs = [ row[0] for row in self._db.select_all('select name from entries where dir=? and target_is_dir=1', ( dirname, )) ]
+    new_names = set([ entry.name for entry in entries ])
+    for name in old_dirs:
+      if name not in new_names:
+        self._forget(path.join(dirname, name))
+    self._db.execute('delete from entries where dir=?', ( dirname, ))
+    sql = 'insert into entries (dir, name, mode, size, mtime_ns, inode, target_is_dir) values (?, ?, ?, ?, ?, ?, ?)'
+    self._db.executemany(sql, [ ( dirname, entry.name, entry.mode, entry.size, entry.mtime_ns, entry.inode, int(entry.target_is_dir) ) for entry in entries ])
+    sql = 'insert or replace into dirs (path, mtime_ns, inode, scan_time_ns) values (?, ?, ?, ?)'
+    self._db.execute(sql, ( dirname, st.st_mtime_ns, st.st_ino, scan_time_ns ))
+    self._num_pending += 1
+    if self._num_pending >= self._COMMIT_INTERVAL:
+      self.flush()
+
+  def _forget(self, dirname):
+    'Forget a directory that no longer exists and everything under it.'
+    pattern = dirname.replace('!', '!!').replace('%', '!%').replace('_', '!_') + os.sep + '%'
+    self._db.execute('delete from dirs where path=? or path like ? escape \'!\'', ( dirname, pattern ))
+    self._db.execute('delete from entries where dir=? or dir like ? escape \'!\'', ( dirname, pattern ))
@@ -1,5 +1,7 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import os
+
 from bes.system.host import host
 from .file_attributes_error import file_attributes_error
 
@@ -13,7 +15,13 @@ except ModuleNotFoundError as ex:
 #HAS_XATTR = False
 #print('HAS_XATTR={}'.format(HAS_XATTR))
 
-if HAS_XATTR:
+# On linux the os module talks to the kernel xattr api directly which
+# is much faster than forking the attr executable for each call
+HAS_OS_XATTR = host.SYSTEM == host.LINUX and hasattr(os, 'getxattr')
+
+if HAS_OS_XATTR:
+  from ._detail._file_attributes_os_xattr import _file_attributes_os_xattr as _file_attributes_super_class
+elif HAS_XATTR:
   from ._detail._file_attributes_xattr import _file_attributes_xattr as _file_attributes_super_class
 elif host.SYSTEM == host.MACOS:
   from ._detail._file_attributes_macos_xattr_exe import _file_attributes_macos_xattr_exe as _file_attributes_super_class
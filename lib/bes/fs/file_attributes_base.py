@@ -69,6 +69,16 @@ class file_attributes_base(with_metaclass(ABCMeta, object)):
       result[key] = clazz.get_bytes(filename, key)
     return result
 
+  @classmethod
+  def get_many(clazz, filename, keys):
+    'Return a dict of key to value as bytes or None for each key in keys.'
+    filename = file_check.check_file(filename)
+    check.check_string_seq(keys)
+    result = {}
+    for key in keys:
+      result[key] = clazz.get_bytes(filename, key)
+    return result
+
   @classmethod
   def set_all(clazz, filename, attributes):
     'Set all file attributes.'
@@ -98,10 +108,14 @@ class file_attributes_base(with_metaclass(ABCMeta, object)):
     'Return the attribute value with key for filename as string.'
     filename = file_check.check_file(filename)
     key = clazz._check_key(key)
-    value = clazz.get_string(filename, key)
+    return clazz.decode_date(clazz.get_bytes(filename, key))
+
+  @classmethod
+  def decode_date(clazz, value, encoding = 'utf-8'):
+    'Decode a date attribute value as bytes as stored by set_date().'
     if value == None:
       return None
-    timestamp = float(value)
+    timestamp = float(value.decode(encoding))
     return datetime.fromtimestamp(timestamp)
 
   @classmethod
@@ -41,7 +41,10 @@ class file_attributes_metadata(object):
       return value_maker(filename)
     
     mtime_key = clazz._make_mtime_key(key)
-    attr_mtime = file_attributes.get_date(filename, mtime_key)
+    # read the value and its mtime stamp together to save a round trip
+    # to the attributes backend
+    values = file_attributes.get_many(filename, [ key, mtime_key ])
+    attr_mtime = file_attributes.decode_date(values[mtime_key])
     file_mtime = file_util.get_modification_date(filename)
 
     label = f'get_bytes:{filename}:{key}'
@@ -59,8 +62,8 @@ class file_attributes_metadata(object):
       return value
 
     if attr_mtime == file_mtime:
-      if file_attributes.has_key(filename, key):
-        value = file_attributes.get_bytes(filename, key)
+      value = values[key]
+      if value != None:
         clazz._log.log_d(f'{label}: using cached value "{value}"')
         return value
 
@@ -1,20 +1,24 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import hashlib
+import os
 import os.path as path
-from multiprocessing import Lock
+import threading
 from abc import abstractmethod, ABCMeta
 from collections import namedtuple
-import sys
 
+from bes.system.check import check
 from bes.system.compat import with_metaclass
 from bes.system.host import host
 from bes.text.line_break import line_break
 from bes.system.log import logger
 
+from .file_lock import file_lock
 from .file_util import file_util
 from .temp_file import temp_file
 
 cache_info = namedtuple('cache_info', 'cached_filename, checksum_filename, cached_checksum')
+file_cache_stats = namedtuple('file_cache_stats', 'hits, misses, evictions')
 
 class file_cache_item_base(with_metaclass(ABCMeta, object)):
 
@@ -38,14 +42,25 @@ class file_cache_item_base(with_metaclass(ABCMeta, object)):
   def checksum(self):
     assert False, 'not implemented'
 
+  @classmethod
+  def make_checksum(clazz, filename, cheap_key = False):
+    '''
+    Return a checksum that identifies the content of filename.  With cheap_key
+    only the size, mtime and inode are used which avoids reading the file.
+    '''
+    if cheap_key:
+      st = os.stat(filename)
+      return 'stat:{}:{}:{}'.format(st.st_size, st.st_mtime_ns, st.st_ino)
+    return file_util.checksum('sha256', filename)
+
 class file_cache_item(file_cache_item_base):
 
   _log = logger('file_cache')
   
-  def __init__(self, filename):
+  def __init__(self, filename, cheap_key = False):
     super(file_cache_item, self).__init__()
     self.filename = path.abspath(path.normpath(filename))
-    self._checksum = file_util.checksum('sha256', self.filename)
+    self._checksum = self.make_checksum(self.filename, cheap_key = cheap_key)
     self._log.log_d('file_cache_item:__init__: filename={} checksum={}'.format(self.filename,
                                                                                self._checksum))
     
@@ -65,8 +80,8 @@ class file_cache_item(file_cache_item_base):
     return self.filename
 
 class file_filename_cache_item(file_cache_item):
-  def __init__(self, filename):
-    super(file_filename_cache_item, self).__init__(filename)
+  def __init__(self, filename, cheap_key = False):
+    super(file_filename_cache_item, self).__init__(filename, cheap_key = cheap_key)
 
   def load(self, cached_filename):
     assert path.isfile(cached_filename)
@@ -75,90 +90,198 @@ class file_filename_cache_item(file_cache_item):
     return tmp_copy
 
 class file_content_cache_item(file_cache_item):
-  def __init__(self, filename):
-    super(file_content_cache_item, self).__init__(filename)
+  def __init__(self, filename, cheap_key = False):
+    super(file_content_cache_item, self).__init__(filename, cheap_key = cheap_key)
 
   def load(self, cached_filename):
     return file_util.read(cached_filename)
   
 class file_cache(object):
+  '''
+  A cache of files keyed by item name and validated by item checksum.
+  The cache is path keyed, not content addressed: each source path has one
+  entry, named by the sha256 of the path, and the stored checksum (a content
+  sha256 or with cheap_key the size, mtime and inode) decides if the entry is
+  still valid.  Identical content at different paths is stored once per path.
+  The cache directory can be shared by many processes.  Entries are written
+  to temporary files and renamed into place while holding a per entry file
+  lock.  When max_bytes is given the least recently used entries are evicted
+  until the cache fits in the budget.
+  '''
 
   _log = logger('file_cache')
   
   _CACHE_DIR = path.join(path.expanduser('~'), '.bes', 'fs', 'cached_read')
   _CHECKSUMS_DIR_NAME = 'checksums'
   _FILES_DIR_NAME = 'files'
-  _lock = Lock()
+  _LOCKS_DIR_NAME = 'locks'
+  _EVICT_LOCK_NAME = 'evict.lock'
+
+  # No limit on the cache size by default
+  DEFAULT_MAX_BYTES = None
+
+  _stats_lock = threading.Lock()
+  _hits = 0
+  _misses = 0
+  _evictions = 0
 
   @classmethod
-  def cached_content(clazz, filename, cache_dir = None):
+  def cached_content(clazz, filename, cache_dir = None, cheap_key = False, max_bytes = None):
     'Return the cached content.'
-    item = file_content_cache_item(filename)
-    return clazz.cached_item(item, cache_dir)
+    item = file_content_cache_item(filename, cheap_key = cheap_key)
+    return clazz.cached_item(item, cache_dir = cache_dir, max_bytes = max_bytes)
 
   @classmethod
-  def cached_filename(clazz, filename, cache_dir = None):
+  def cached_filename(clazz, filename, cache_dir = None, cheap_key = False, max_bytes = None):
     'Return a temp file copy of filename.  It will delete when the process exits.'
 
-    item = file_filename_cache_item(filename)
-    clazz._log.log_d('file_cache:cached_filename: filename={} cache_dir={} item={}'.format(filename,
-                                                                                           cache_dir,
-                                                                                           item))
-    result = clazz.cached_item(item, cache_dir = cache_dir)
-    clazz._log.log_d('file_cache:cached_filename: result={}'.format(result))
+    item = file_filename_cache_item(filename, cheap_key = cheap_key)
+    clazz._log.log_d('file_cache:cached_filename: filename={} cache_dir={} item={}', filename, cache_dir, item)
+    result = clazz.cached_item(item, cache_dir = cache_dir, max_bytes = max_bytes)
+    clazz._log.log_d('file_cache:cached_filename: result={}', result)
     return result
   
   @classmethod
-  def cached_item(clazz, item, cache_dir = None):
+  def cached_item(clazz, item, cache_dir = None, max_bytes = None):
+    check.check_int(max_bytes, allow_none = True)
+
     cache_dir = cache_dir or clazz._CACHE_DIR
-    clazz._log.log_d('file_cache:cached_item: item={} cache_dir={}'.format(item, cache_dir))
-    try:
-      clazz._lock.acquire()
-      info = clazz._make_info(item, cache_dir)
-      clazz._log.log_d('file_cache:cached_item: info={} cached_checksum={} checksum={}'.format(info,
-                                                                                               info.cached_checksum,
-                                                                                               item.checksum()))
-      if info.cached_checksum != item.checksum():
-        item.save(info)
+    if max_bytes is None:
+      max_bytes = clazz.DEFAULT_MAX_BYTES
+    clazz._log.log_d('file_cache:cached_item: item={} cache_dir={}', item, cache_dir)
+    info = clazz._make_info(item, cache_dir)
+    with file_lock(clazz._entry_lock_filename(cache_dir, info)):
+      info = info._replace(cached_checksum = clazz._cached_checksum(info.checksum_filename))
+      checksum = item.checksum()
+      clazz._log.log_d('file_cache:cached_item: info={} checksum={}', info, checksum)
+      if info.cached_checksum == checksum and path.isfile(info.cached_filename):
+        clazz._count(hits = 1)
+        clazz._touch(info.checksum_filename)
+      else:
+        clazz._count(misses = 1)
+        clazz._save(item, info)
+        if max_bytes is not None:
+          clazz._evict(cache_dir, max_bytes)
       return item.load(info.cached_filename)
-    finally:
-      clazz._lock.release()
 
   @classmethod
-  def _save(clazz, args, info, saver_func):
+  def stats(clazz):
+    'Return the hit, miss and eviction counts for this process.'
+    with clazz._stats_lock:
+      return file_cache_stats(clazz._hits, clazz._misses, clazz._evictions)
+
+  @classmethod
+  def reset_stats(clazz):
+    with clazz._stats_lock:
+      clazz._hits = 0
+      clazz._misses = 0
+      clazz._evictions = 0
+
+  @classmethod
+  def cache_size(clazz, cache_dir = None):
+    'Return the total size in bytes of the cached files.'
+    cache_dir = cache_dir or clazz._CACHE_DIR
+    return sum([ entry.size for entry in clazz._entries(cache_dir) ])
+
+  @classmethod
+  def _count(clazz, hits = 0, misses = 0, evictions = 0):
+    with clazz._stats_lock:
+      clazz._hits += hits
+      clazz._misses += misses
+      clazz._evictions += evictions
+
+  @classmethod
+  def _save(clazz, item, info):
+    '''
+    Have item save into temporary files and rename them into place.  The
+    checksum is renamed last so a partial entry never looks valid.
+    '''
+    file_util.remove(info.checksum_filename)
+    tmp_suffix = '.tmp.{}.{}'.format(os.getpid(), threading.get_ident())
+    tmp_info = cache_info(info.cached_filename + tmp_suffix,
+                          info.checksum_filename + tmp_suffix,
+                          None)
+    file_util.mkdir(path.dirname(info.cached_filename))
+    file_util.mkdir(path.dirname(info.checksum_filename))
+    try:
+      item.save(tmp_info)
+      os.replace(tmp_info.cached_filename, info.cached_filename)
+      os.replace(tmp_info.checksum_filename, info.checksum_filename)
+    except:
+      file_util.remove([ tmp_info.cached_filename, tmp_info.checksum_filename, info.cached_filename ])
+      raise
+
+  _entry = namedtuple('_entry', 'key, size, last_used')
+  @classmethod
+  def _entries(clazz, cache_dir):
+    cached_checksums_dir = path.join(cache_dir, clazz._CHECKSUMS_DIR_NAME)
+    cached_files_dir = path.join(cache_dir, clazz._FILES_DIR_NAME)
+    if not path.isdir(cached_checksums_dir):
+      return []
+    result = []
+    for key in os.listdir(cached_checksums_dir):
+      if '.tmp.' in key:
+        continue
+      try:
+        last_used = os.stat(path.join(cached_checksums_dir, key)).st_mtime_ns
+        size = os.stat(path.join(cached_files_dir, key)).st_size
+      except FileNotFoundError as ex:
+        continue
+      result.append(clazz._entry(key, size, last_used))
+    return result
+
+  @classmethod
+  def _evict(clazz, cache_dir, max_bytes):
+    'Remove least recently used entries until the cache fits in max_bytes.'
+    with file_lock(path.join(cache_dir, clazz._EVICT_LOCK_NAME)):
+      entries = sorted(clazz._entries(cache_dir), key = lambda entry: entry.last_used)
+      total = sum([ entry.size for entry in entries ])
+      for entry in entries:
+        if total <= max_bytes:
+          break
+        info = clazz._make_info_for_key(entry.key, cache_dir)
+        lock = file_lock(clazz._entry_lock_filename(cache_dir, info))
+        # entries in use by someone else, including the caller, are skipped
+        if not lock.acquire(blocking = False):
+          continue
+        try:
+          file_util.remove([ info.checksum_filename, info.cached_filename ])
+        finally:
+          lock.release()
+        total -= entry.size
+        clazz._count(evictions = 1)
+        clazz._log.log_d('file_cache:_evict: evicted {} size={}', entry.key, entry.size)
+
+  @classmethod
+  def _touch(clazz, filename):
+    'Mark an entry as recently used.'
     try:
-      saver_func(args, info)
-    except IOError:
-      # FIXME: write a unit test for this and figure out what the right exceptions to catch are
-      file_util.remove([ info.cached_filename, info.checksum_filename ])
+      os.utime(filename, None)
+    except OSError as ex:
+      clazz._log.log_d('file_cache:_touch: failed to touch {}: {}', filename, str(ex))
 
   @classmethod
-  def _content_saver_func(clazz, args, info):
-    filename = args[0]
-    file_util.copy(filename, info.cached_filename)
-    file_util.save(info.checksum_filename, info.checksum + line_break.DEFAULT_LINE_BREAK)
+  def _make_key(clazz, name):
+    'Return a key for name that is the same for all processes.'
+    return hashlib.sha256(name.encode('utf-8')).hexdigest()
 
   @classmethod
   def _make_info(clazz, item, cache_dir):
-    name = item.name()
-    fragment_hash = str(hash(name) % ((sys.maxsize + 1) * 2))
+    return clazz._make_info_for_key(clazz._make_key(item.name()), cache_dir)
 
-    clazz._log.log_d('file_cache:_make_info: cache_dir={} _FILES_DIR_NAME={} _CHECKSUMS_DIR_NAME={} fragment_hash={}'.format(cache_dir,
-                                                                                                                             clazz._FILES_DIR_NAME,
-                                                                                                                             clazz._CHECKSUMS_DIR_NAME,
-                                                                                                                             fragment_hash))
-    cached_files_dir = path.join(cache_dir, clazz._FILES_DIR_NAME)
-    cached_checksums_dir = path.join(cache_dir, clazz._CHECKSUMS_DIR_NAME)
-    
-    cached_filename = path.join(cached_files_dir, fragment_hash)
-    checksum_filename = path.join(cached_checksums_dir, fragment_hash)
-    clazz._log.log_d('file_cache:_make_info: cached_filename={} checksum_filename={}'.format(cached_filename,
-                                                                                             checksum_filename))
-    cached_checksum = clazz._cached_checksum(checksum_filename)
-    return cache_info(cached_filename, checksum_filename, cached_checksum)
+  @classmethod
+  def _make_info_for_key(clazz, key, cache_dir):
+    cached_filename = path.join(cache_dir, clazz._FILES_DIR_NAME, key)
+    checksum_filename = path.join(cache_dir, clazz._CHECKSUMS_DIR_NAME, key)
+    return cache_info(cached_filename, checksum_filename, None)
+
+  @classmethod
+  def _entry_lock_filename(clazz, cache_dir, info):
+    return path.join(cache_dir, clazz._LOCKS_DIR_NAME, path.basename(info.cached_filename) + '.lock')
 
   @classmethod
   def _cached_checksum(clazz, checksum_filename):
-    if path.exists(checksum_filename):
-      return file_util.read(checksum_filename).strip()
-    return None
+    try:
+      return file_util.read(checksum_filename, codec = 'utf-8').strip()
+    except FileNotFoundError as ex:
+      return None
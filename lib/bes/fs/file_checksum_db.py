@@ -1,5 +1,8 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+
 from ..system.check import check
 from bes.system.log import logger
 
@@ -23,6 +26,7 @@ class file_checksum_db(object):
   }
 
   DEFAULT_CHECKSUM_DB_FILENAME = '.bes_file_checksum.db'
+  DEFAULT_BATCH_SIZE = 1000
   
   def __init__(self, root_dir, db_filename = None):
     check.check_string(root_dir)
@@ -31,11 +35,31 @@ class file_checksum_db(object):
     
     self._metadata = file_metadata(root_dir, db_filename = db_filename)
     self._count = 0
+    self._pending = None
+    self._batch_size = None
 
   @property
   def count(self):
     return self._count
+
+  @property
+  def db_filename(self):
+    return self._metadata.db_filename
+
+  def close(self):
+    'Close the db.'
+    self._metadata.close()
   
+  def get_values_many(self, filenames):
+    'Return a dict of filename to the key_value_list of checksum values for many filenames.'
+    check.check_string_seq(filenames)
+    return self._metadata.get_values_many('checksums', filenames)
+
+  def set_values_many(self, values):
+    'Set checksum values for many files in one transaction.  values is a dict of filename to a dict of key to value.'
+    check.check_dict(values)
+    self._metadata.set_values_many('checksums', values)
+
   def checksum(self, algorithm, filename, chunk_size = None):
     check.check_string(algorithm)
     check.check_string(filename)
@@ -44,15 +68,127 @@ class file_checksum_db(object):
     checksum_key = self._ALGORITHM_TO_KEY.get(algorithm, None)
     if not checksum_key:
       raise ValueError('invalid algorithm: %s' % (algorithm))
-    attr_mtime = self._metadata.get_value('checksums', filename, self._KEY_BES_MTIME)
-    attr_checksum = self._metadata.get_value('checksums', filename, checksum_key)
+    if self._pending is not None and filename in self._pending:
+      values = self._pending[filename]
+    else:
+      values = self._metadata.get_values('checksums', filename).to_dict()
+    attr_mtime = values.get(self._KEY_BES_MTIME, None)
+    attr_checksum = values.get(checksum_key, None)
     mtime = file_util.mtime(filename)
     self.log.log_d('checksum: mtime={} attr_mtime={} attr_checksum={}'.format(mtime, attr_mtime, attr_checksum))
     if attr_mtime is not None and attr_checksum is not None:
-      if attr_mtime == str(file_util.mtime(filename)):
+      if attr_mtime == str(mtime):
         return attr_checksum
     return self._write_checksum(algorithm, filename, chunk_size)
 
+  def checksum_many(self, algorithm, filenames, num_threads = 1, batch_size = None, use_wal = True):
+    '''
+    Return a dict of filename to checksum for many files.  Cached checksums are
+    read in batches, stale ones are computed with num_threads threads and the
+    new values are committed in batches of batch_size files.
+    '''
+    check.check_string(algorithm)
+    check.check_string_seq(filenames)
+    check.check_int(num_threads)
+    check.check_int(batch_size, allow_none = True)
+    check.check_bool(use_wal)
+    checksum_key = self._ALGORITHM_TO_KEY.get(algorithm, None)
+    if not checksum_key:
+      raise ValueError('invalid algorithm: %s' % (algorithm))
+
+    result = {}
+    stale = []
+    cached_values = self.get_values_many(filenames)
+    for filename in filenames:
+      if self._pending is not None and filename in self._pending:
+        values = self._pending[filename]
+      else:
+        values = cached_values[filename].to_dict()
+      mtime = str(file_util.mtime(filename))
+      attr_checksum = values.get(checksum_key, None)
+      if attr_checksum is not None and values.get(self._KEY_BES_MTIME, None) == mtime:
+        result[filename] = attr_checksum
+      else:
+        stale.append(( filename, mtime ))
+    self.log.log_d('checksum_many: {} files {} stale'.format(len(filenames), len(stale)))
+
+    def _compute(item):
+      filename, mtime = item
+      return filename, mtime, file_util.checksum(algorithm, filename)
+
+    with self.batch(batch_size = batch_size, use_wal = use_wal):
+      with ThreadPoolExecutor(max_workers = max(1, num_threads)) as executor:
+        for filename, mtime, checksum in executor.map(_compute, stale):
+          self._count += 1
+          self._add_values(filename, { self._KEY_BES_MTIME: mtime, checksum_key: checksum })
+          result[filename] = checksum
+    return result
+
+  @contextlib.contextmanager
+  def batch(self, batch_size = None, use_wal = True):
+    '''
+    Context manager that gathers checksum writes and commits them in
+    batches of batch_size files instead of one transaction per file.
+    If use_wal is True the db is switched to WAL journaling which is
+    persistent and lets other readers proceed while a batch is being
+    written.  WAL leaves -wal and -shm files next to the db while it is
+    open so callers that ship the db around can turn it off.  If the body
+    raises the pending writes are still flushed but a failed flush is only
+    logged so the original exception is what the caller sees.
+    '''
+    check.check_int(batch_size, allow_none = True)
+    check.check_bool(use_wal)
+    if self._pending is not None:
+      yield self
+      return
+    self._pending = {}
+    self._batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+    if use_wal:
+      self._metadata.journal_mode = 'wal'
+    try:
+      yield self
+    except:
+      try:
+        self.flush()
+      except Exception as ex:
+        self.log.log_e('batch: Dropping {} pending checksums: {}'.format(len(self._pending), str(ex)))
+      raise
+    else:
+      self.flush()
+    finally:
+      self._pending = None
+      self._batch_size = None
+
+  def flush(self):
+    '''
+    Commit any pending checksum writes.  If the write fails the pending writes
+    are kept so a later flush can retry them and the error is raised.
+    '''
+    if not self._pending:
+      return
+    pending = self._pending
+    self._pending = {}
+    try:
+      self.set_values_many(pending)
+    except Exception as ex:
+      self.log.log_e('flush: Failed to write {} checksums to {}'.format(len(pending),
+                                                                       self._metadata.db_filename))
+      for filename, values in pending.items():
+        values = dict(values)
+        values.update(self._pending.get(filename, {}))
+        self._pending[filename] = values
+      raise
+
+  def _add_values(self, filename, values):
+    if self._pending is None:
+      self.set_values_many({ filename: values })
+      return
+    if not filename in self._pending:
+      self._pending[filename] = {}
+    self._pending[filename].update(values)
+    if len(self._pending) >= self._batch_size:
+      self.flush()
+
   def _write_checksum(self, algorithm, filename, chunk_size):
     mtime = str(file_util.mtime(filename))
     checksum = file_util.checksum(algorithm, filename)
@@ -63,17 +199,8 @@ class file_checksum_db(object):
                                                                                            self._count,
                                                                                            checksum_key))
     try:
-# it seems it would be better to update both of these at once but for some reason
-# this doesnt work.      
-#      values = {
-#        self._KEY_BES_MTIME: mtime,
-#        checksum_key: checksum,
-#      }
-#      self._metadata.replace_values(filename, values)
-      self._metadata.set_value('checksums', filename, self._KEY_BES_MTIME, mtime)
-      self._metadata.set_value('checksums', filename, checksum_key, checksum)
+      self._add_values(filename, { self._KEY_BES_MTIME: mtime, checksum_key: checksum })
     except Exception as ex:
       self.log.log_e('_write_checksum: Failed to write checksum for {} to {}'.format(filename,
                                                                                      self._metadata.db_filename))
     return checksum
-  
@@ -143,7 +143,8 @@ class file_duplicates(object):
     match_function = lambda filename: clazz._match_function(filename, options)
     resolver_options = file_resolver_options(recursive = options.recursive,
                                              match_basename = False,
-                                             match_function = match_function)
+                                             match_function = match_function,
+                                             walk_cache = options.walk_cache)
     return file_resolver.resolve_files(files, options = resolver_options)
 
   @classmethod
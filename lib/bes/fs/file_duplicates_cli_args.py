@@ -31,6 +31,13 @@ class file_duplicates_cli_args(object):
     p.add_argument('--delete-empty-dirs', action = 'store_true',
                    default = file_duplicates_defaults.DELETE_EMPTY_DIRS,
                    help = 'Delete empty directories after partitioning [ False ]')
+    p.add_argument('--num-threads', action = 'store', type = int,
+                   default = file_duplicates_defaults.NUM_THREADS,
+                   help = f'Number of threads to use for checksums [ {file_duplicates_defaults.NUM_THREADS} ]')
+    p.add_argument('--processes', action = 'store_true',
+                   default = file_duplicates_defaults.USE_PROCESSES,
+                   dest = 'use_processes',
+                   help = 'Use processes instead of threads for full checksums [ False ]')
     
   @classmethod
   def __file_duplicates_cli_add_add_common_args(clazz, p):
@@ -42,6 +49,8 @@ class file_duplicates_cli_args(object):
                    help = 'Verbose output [ False ]')
     p.add_argument('--quiet', action = 'store_true', default = False,
                    help = 'Quiet output [ False ]')
+    p.add_argument('--walk-cache', action = 'store', default = None,
+                   help = 'Cache directory listings in this db to speed up repeated runs [ None ]')
     
   def _command_file_duplicates(self, command, *args, **kargs):
     from .file_duplicates_cli_handler import file_duplicates_cli_handler
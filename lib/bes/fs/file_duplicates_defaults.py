@@ -5,3 +5,5 @@ class file_duplicates_defaults:
   DELETE_EMPTY_DIRS = False
   INCLUDE_EMPTY_FILES = False
   SMALL_CHECKSUM_SIZE = 1024 * 1024
+  NUM_THREADS = 4
+  USE_PROCESSES = False
@@ -0,0 +1,160 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+
+from ..system.check import check
+from ..script.blurber import blurber
+from ..system.log import logger
+
+from .file_attributes_metadata import file_attributes_metadata
+
+class file_duplicates_hasher(object):
+  '''
+  A staged checksum engine for finding duplicate files.
+
+  Candidates go through 3 stages and only files that still collide with
+  another file make it to the next stage:
+
+    1. head: checksum of the first num_bytes of the file
+    2. tail: checksum of the last num_bytes of the file (skipped for files
+       that are completely covered by the head checksum)
+    3. full: the sha256 checksum of the whole file (cached in file attributes)
+
+  Reading is done with a pool of threads.  The full checksum stage can
+  optionally use a pool of processes for hashing.
+  '''
+
+  _log = logger('file_duplicates_hasher')
+
+  def __init__(self, num_threads = 1, use_processes = False, blurber = None):
+    check.check_int(num_threads)
+    check.check_bool(use_processes)
+    check.check_blurber(blurber, allow_none = True)
+
+    self._num_threads = max(1, num_threads)
+    self._use_processes = use_processes
+    self._blurber = blurber
+
+  def duplicate_checksum_map(self, size_map, num_bytes):
+    '''
+    Return a dict of checksum to filenames for files that are duplicates.
+    size_map is a dict of filename to size for the candidate files.
+    '''
+    check.check_dict(size_map)
+    check.check_int(num_bytes)
+
+    head_groups = self._group(self.head_checksums(sorted(size_map.keys()), num_bytes),
+                              lambda filename, checksum: ( size_map[filename], checksum ))
+    num_head = self._count(head_groups)
+    self._blurb_verbose(f'found {num_head} files with duplicate head checksums')
+
+    head_keys = {}
+    for key, files in head_groups.items():
+      for filename in files:
+        head_keys[filename] = key
+    candidates = sorted(head_keys.keys())
+    tail_checksums = self.tail_checksums([ f for f in candidates if size_map[f] > num_bytes ], num_bytes)
+    tail_keys = {}
+    for filename in candidates:
+      if size_map[filename] <= num_bytes:
+        tail_keys[filename] = head_keys[filename]
+      elif filename in tail_checksums:
+        tail_keys[filename] = head_keys[filename] + ( tail_checksums[filename], )
+    tail_groups = self._group(tail_keys, lambda filename, key: key)
+    num_tail = self._count(tail_groups)
+    self._blurb_verbose(f'found {num_tail} files with duplicate tail checksums')
+
+    full_groups = self._group(self.checksums(self._flatten(tail_groups)),
+                              lambda filename, checksum: checksum)
+    return full_groups
+
+  def head_checksums(self, files, num_bytes):
+    'Return a dict of filename to the checksum of the first num_bytes of each file.'
+    return self._map_threads(self._head_checksum, files, num_bytes)
+
+  def tail_checksums(self, files, num_bytes):
+    'Return a dict of filename to the checksum of the last num_bytes of each file.'
+    return self._map_threads(self._tail_checksum, files, num_bytes)
+
+  def checksums(self, files):
+    'Return a dict of filename to the full sha256 checksum of each file.'
+    if self._use_processes and self._num_threads > 1 and len(files) > 1:
+      with ProcessPoolExecutor(max_workers = self._num_threads) as executor:
+        return self._collect(files, executor.map(self._checksum, files))
+    return self._map_threads(self._checksum, files)
+
+  def _map_threads(self, func, files, *args):
+    num = len(files)
+    if self._num_threads == 1 or num < 2:
+      values = [ self._progress(func, i, num, filename, *args) for i, filename in enumerate(files, start = 1) ]
+      return self._collect(files, values)
+    with ThreadPoolExecutor(max_workers = self._num_threads) as executor:
+      futures = [ executor.submit(self._progress, func, i, num, filename, *args) for i, filename in enumerate(files, start = 1) ]
+      return self._collect(files, [ future.result() for future in futures ])
+
+  def _progress(self, func, i, num, filename, *args):
+    self._blurb_verbose(f'checking {i} of {num}: {filename}')
+    return func(filename, *args)
+
+  @classmethod
+  def _collect(clazz, files, values):
+    'Return a dict of filename to value skipping files that disappeared.'
+    result = {}
+    for filename, value in zip(files, values):
+      if value != None:
+        result[filename] = value
+    return result
+
+  @classmethod
+  def _group(clazz, values, key_func):
+    'Group a dict of filename to value by key_func and return only groups with more than one file.'
+    groups = {}
+    for filename in sorted(values.keys()):
+      key = key_func(filename, values[filename])
+      if not key in groups:
+        groups[key] = []
+      groups[key].append(filename)
+    return dict([ ( key, files ) for key, files in groups.items() if len(files) > 1 ])
+
+  @classmethod
+  def _flatten(clazz, groups):
+    result = []
+    for files in groups.values():
+      result.extend(files)
+    return sorted(result)
+
+  @classmethod
+  def _count(clazz, groups):
+    return sum([ len(files) for files in groups.values() ])
+
+  def _blurb_verbose(self, message):
+    if self._blurber:
+      self._blurber.blurb_verbose(message)
+
+  @classmethod
+  def _head_checksum(clazz, filename, num_bytes):
+    try:
+      with open(filename, 'rb') as fin:
+        return hashlib.sha256(fin.read(num_bytes)).hexdigest()
+    except FileNotFoundError as ex:
+      return None
+
+  @classmethod
+  def _tail_checksum(clazz, filename, num_bytes):
+    try:
+      with open(filename, 'rb') as fin:
+        fin.seek(0, os.SEEK_END)
+        fin.seek(max(0, fin.tell() - num_bytes), os.SEEK_SET)
+        return hashlib.sha256(fin.read(num_bytes)).hexdigest()
+    except FileNotFoundError as ex:
+      return None
+
+  @classmethod
+  def _checksum(clazz, filename):
+    try:
+      return file_attributes_metadata.get_checksum_sha256(filename, fallback = True, cached = True)
+    except FileNotFoundError as ex:
+      return None
@@ -32,6 +32,8 @@ class file_duplicates_options(files_cli_options, file_ignore_options_mixin):
       'ignore_files': None,
       'preparation': None,
       'delete_empty_dirs': file_duplicates_defaults.DELETE_EMPTY_DIRS,
+      'num_threads': file_duplicates_defaults.NUM_THREADS,
+      'use_processes': file_duplicates_defaults.USE_PROCESSES,
     })
   
   @classmethod
@@ -45,6 +47,8 @@ class file_duplicates_options(files_cli_options, file_ignore_options_mixin):
       'preparation': file_duplicates_setup,
       #'sort_key': callable,
       'delete_empty_dirs': bool,
+      'num_threads': int,
+      'use_processes': bool,
     })
 
   #@abstractmethod
@@ -59,6 +63,8 @@ class file_duplicates_options(files_cli_options, file_ignore_options_mixin):
     check.check_string_seq(self.ignore_files, allow_none = True)
     check.check_file_duplicates_setup(self.preparation, allow_none = True)
     check.check_bool(self.delete_empty_dirs)
+    check.check_int(self.num_threads)
+    check.check_bool(self.use_processes)
 
   @staticmethod
   def sort_key_modification_date(filename):
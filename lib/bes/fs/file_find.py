@@ -1,6 +1,9 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import errno, os.path as path, os, stat
+import errno, os.path as path, os, re, stat
+
+from bes.common.object_util import object_util
+from bes.common.string_util import string_util
 
 from .dir_util import dir_util
 from .file_match import file_match
@@ -21,67 +24,151 @@ class file_find(object):
   def find(clazz, root_dir, relative = True, min_depth = None,
            max_depth = None, file_type = FILE, follow_links = False,
            match_patterns = None, match_type = None, match_basename = True,
-           match_function = None, match_re = None):
-    
+           match_function = None, match_re = None, prune_function = None,
+           walk_cache = None):
+    return sorted(clazz.iter_find(root_dir,
+                                  relative = relative,
+                                  min_depth = min_depth,
+                                  max_depth = max_depth,
+                                  file_type = file_type,
+                                  follow_links = follow_links,
+                                  match_patterns = match_patterns,
+                                  match_type = match_type,
+                                  match_basename = match_basename,
+                                  match_function = match_function,
+                                  match_re = match_re,
+                                  prune_function = prune_function,
+                                  walk_cache = walk_cache))
+
+  @classmethod
+  def iter_find(clazz, root_dir, relative = True, min_depth = None,
+                max_depth = None, file_type = FILE, follow_links = False,
+                match_patterns = None, match_type = None, match_basename = True,
+                match_function = None, match_re = None, prune_function = None,
+                walk_cache = None):
+    '''
+    Like find() but yield results as the tree is walked in no particular order.
+    The file type comes from the cached os.scandir() entry data and the match
+    filters are applied during the walk.  If prune_function is given it is called
+    with the absolute path of each directory and returning True skips its contents.
+    If walk_cache is given (a dir_walk_cache) directory listings come from it.
+    '''
     if max_depth and min_depth and not (max_depth >= min_depth):
       raise RuntimeError('max_depth needs to be >= min_depth.')
 
     if min_depth and min_depth < 1:
       raise RuntimeError('min_depth needs to be >= 1.')
 
-    def _in_range(depth, min_depth, max_depth):
-      if min_depth and max_depth:
-        return depth >= min_depth and depth <= max_depth
-      elif min_depth:
-        return depth >= min_depth
-      elif max_depth:
-        return depth <= max_depth
-      else:
-        return True
-      
-    result = []
-
     root_dir = path.normpath(root_dir)
-    root_dir_count = root_dir.count(os.sep)
-
-    for root, dirs, files in clazz.walk_with_depth(root_dir, max_depth = max_depth, follow_links = follow_links):
-      to_check = []
-      if clazz._want_file_type(file_type, clazz.FILE | clazz.LINK | clazz.DEVICE):
-        to_check += files
-      if clazz._want_file_type(file_type, clazz.DIR):
-        to_check += dirs
+    if not path.isdir(root_dir):
+      raise RuntimeError('not a directory: %s' % (root_dir))
+    head = file_util.ensure_rsep(root_dir) if relative else None
+    matcher = clazz._make_matcher(match_patterns, match_type, match_basename, match_function, match_re)
+
+    try:
+      for f in clazz._walk(root_dir, head, matcher, min_depth, max_depth, file_type,
+                           follow_links, prune_function, walk_cache):
+        yield f
+    finally:
+      if walk_cache:
+        walk_cache.flush()
+
+  @classmethod
+  def _in_range(clazz, depth, min_depth, max_depth):
+    if min_depth and max_depth:
+      return depth >= min_depth and depth <= max_depth
+    elif min_depth:
+      return depth >= min_depth
+    elif max_depth:
+      return depth <= max_depth
+    else:
+      return True
+
+  @classmethod
+  def _walk(clazz, root_dir, head, matcher, min_depth, max_depth, file_type,
+            follow_links, prune_function, walk_cache):
+    # entries of a relative root like "." come back as "./foo" so they need normalizing
+    normalize = root_dir == os.curdir
+    stack = [ ( root_dir, 1 ) ]
+    while stack:
+      next_dir, depth = stack.pop()
+      try:
+        if walk_cache:
+          entries = walk_cache.scandir(next_dir)
+        else:
+          with os.scandir(next_dir) as it:
+            entries = list(it)
+      except OSError as ex:
+        # os.walk() ignores directories it cannot list so do the same
+        continue
+      subdirs = []
+      for entry in entries:
+        if clazz._in_range(depth, min_depth, max_depth) and clazz._entry_matches_file_type(entry, file_type):
+          f = path.normpath(entry.path) if normalize else entry.path
+          if head:
+            f = string_util.remove_head(f, head)
+          if not matcher or matcher(f):
+            yield f
+        if max_depth is not None and depth >= max_depth:
+          continue
+        if clazz._entry_is_walkable_dir(entry, follow_links):
+          if not prune_function or not prune_function(entry.path):
+            subdirs.append(( entry.path, depth + 1 ))
+      stack.extend(reversed(subdirs))
+
+  @classmethod
+  def _entry_is_walkable_dir(clazz, entry, follow_links):
+    try:
+      if not entry.is_dir():
+        return False
+      return follow_links or not entry.is_symlink()
+    except OSError as ex:
+      return False
+
+  @classmethod
+  def _entry_matches_file_type(clazz, entry, file_type):
+    try:
+      if entry.is_symlink():
+        return clazz._want_file_type(file_type, clazz.LINK)
+      if entry.is_dir(follow_symlinks = False):
+        return clazz._want_file_type(file_type, clazz.DIR)
+      if entry.is_file(follow_symlinks = False):
+        return clazz._want_file_type(file_type, clazz.FILE)
+      if not clazz._want_file_type(file_type, clazz.DEVICE):
+        return False
+      st = entry.stat(follow_symlinks = False)
+    except OSError as ex:
+      if ex.errno == errno.EBADF:
+        # Some devices on macos result in bad access when trying to stat so ignore them
+        return False
       else:
-        links = [ d for d in dirs if path.islink(path.normpath(path.join(root, d))) ]
-        to_check += links
-      for name in to_check:
-        f = path.normpath(path.join(root, name))
-        depth = f.count(os.sep) - root_dir_count
-        if _in_range(depth, min_depth, max_depth):
-          if clazz._match_file_type(f, file_type):
-            if relative:
-              result.append(file_util.remove_head(f, root_dir))
-            else:
-              result.append(f)
-              
-    if match_patterns:
-      result = file_match.match_fnmatch(result,
-                                        match_patterns,
-                                        match_type = match_type,
-                                        basename = match_basename)
-      
-    if match_function:
-      result = file_match.match_function(result,
-                                         match_function,
-                                         match_type = match_type,
-                                         basename = match_basename)
-
-    if match_re:
-      result = file_match.match_re(result,
-                                   match_re,
-                                   match_type = match_type,
-                                   basename = match_basename)
-      
-    return sorted(result)
+        raise
+    return stat.S_ISBLK(st.st_mode) or stat.S_ISCHR(st.st_mode)
+
+  @classmethod
+  def _make_matcher(clazz, match_patterns, match_type, match_basename, match_function, match_re):
+    'Return a function that applies the match filters to one filename or None if there are no filters.'
+    if not (match_patterns or match_function or match_re):
+      return None
+    expressions = [ re.compile(expression) for expression in object_util.listify(match_re) ] if match_re else None
+    def _matcher(filename):
+      if match_patterns and not file_match.matches_fnmatch(filename,
+                                                           match_patterns,
+                                                           match_type = match_type,
+                                                           basename = match_basename):
+        return False
+      if match_function and not file_match.matches_function(filename,
+                                                            match_function,
+                                                            match_type = match_type,
+                                                            basename = match_basename):
+        return False
+      if expressions and not file_match.matches_re(filename,
+                                                   expressions,
+                                                   match_type = match_type,
+                                                   basename = match_basename):
+        return False
+      return True
+    return _matcher
 
   #: https://stackoverflow.com/questions/229186/os-walk-without-digging-into-directories-below
   @classmethod
@@ -199,15 +286,40 @@ class file_find(object):
 
   @classmethod
   def remove_empty_dirs(clazz, root_dir, min_depth = None, max_depth = None):
+    '''
+    Remove empty dirs in root_dir including dirs that only contain empty dirs
+    and return the sorted list of removed dirs.  The tree is walked once and
+    dirs are removed bottom up once all their children are gone.  root_dir
+    itself is removed too if it ends up empty.
+    '''
+    root_dir = path.normpath(root_dir)
+    # dirs in pre-order so children always come after their parent
+    dirs = []
+    stack = [ ( root_dir, -1, 0 ) ]
+    while stack:
+      dirname, parent_index, depth = stack.pop()
+      index = len(dirs)
+      try:
+        with os.scandir(dirname) as it:
+          entries = list(it)
+      except OSError as ex:
+        # dirs that cannot be listed are never removed
+        dirs.append([ dirname, parent_index, depth, 1 ])
+        continue
+      dirs.append([ dirname, parent_index, depth, len(entries) ])
+      if max_depth is not None and depth + 1 > max_depth:
+        continue
+      for entry in entries:
+        if entry.is_dir(follow_symlinks = False):
+          stack.append(( entry.path, index, depth + 1 ))
     result = []
-    while True:
-      empties = clazz.find_empty_dirs(root_dir, relative = False, min_depth = min_depth, max_depth = max_depth)
-      if not empties:
-        break
-      for next_empty in empties:
-        dir_util.remove(next_empty)
-        result.append(next_empty)
-    if dir_util.is_empty(root_dir):
-      dir_util.remove(root_dir)
-      result.append(root_dir)
+    for dirname, parent_index, depth, num_entries in reversed(dirs):
+      if num_entries != 0:
+        continue
+      if parent_index >= 0 and not clazz._in_range(depth, min_depth, max_depth):
+        continue
+      os.rmdir(dirname)
+      result.append(dirname)
+      if parent_index >= 0:
+        dirs[parent_index][3] -= 1
     return sorted(result)
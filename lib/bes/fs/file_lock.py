@@ -0,0 +1,121 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os
+import os.path as path
+import threading
+
+from ..system.check import check
+from ..system.host import host
+from ..system.log import logger
+
+if host.is_windows():
+  import msvcrt
+else:
+  import fcntl
+
+class file_lock(object):
+  '''
+  An exclusive advisory lock on a file that works across processes and threads.
+  The lock file is created if needed and never deleted.
+
+    with file_lock('/tmp/foo.lock'):
+      ...
+  '''
+
+  _log = logger('file_lock')
+
+  # Locks held by this process are also guarded by a thread lock since flock
+  # and msvcrt locks are per open file description and not per thread.
+  _thread_locks = {}
+  _thread_locks_lock = threading.Lock()
+
+  def __init__(self, filename):
+    check.check_string(filename)
+
+    self.filename = path.abspath(filename)
+    self._fp = None
+    self._thread_lock = self._get_thread_lock(self.filename)
+
+  def __enter__(self):
+    self.acquire()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.release()
+
+  @property
+  def locked(self):
+    return self._fp is not None
+
+  def acquire(self, blocking = True):
+    'Acquire the lock.  Return False if blocking is False and the lock is held elsewhere.'
+    if not self._thread_lock.acquire(blocking):
+      return False
+    try:
+      dirname = path.dirname(self.filename)
+      if not path.isdir(dirname):
+        os.makedirs(dirname, exist_ok = True)
+      fp = open(self.filename, 'a+b')
+    except:
+      self._thread_lock.release()
+      raise
+    try:
+      if not self._lock_fp(fp, blocking):
+        fp.close()
+        self._thread_lock.release()
+        return False
+    except:
+      fp.close()
+      self._thread_lock.release()
+      raise
+    self._fp = fp
+    return True
+
+  def release(self):
+    'Release the lock.'
+    if self._fp is None:
+      raise RuntimeError('Lock not held: {}'.format(self.filename))
+    try:
+      self._unlock_fp(self._fp)
+    finally:
+      self._fp.close()
+      self._fp = None
+      self._thread_lock.release()
+
+  @classmethod
+  def _get_thread_lock(clazz, filename):
+    with clazz._thread_locks_lock:
+      if not filename in clazz._thread_locks:
+        clazz._thread_locks[filename] = threading.Lock()
+      return clazz._thread_locks[filename]
+
+  if host.is_windows():
+    @classmethod
+    def _lock_fp(clazz, fp, blocking):
+      fp.seek(0)
+      mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+      try:
+        msvcrt.locking(fp.fileno(), mode, 1)
+      except OSError as ex:
+        if not blocking:
+          return False
+        raise
+      return True
+
+    @classmethod
+    def _unlock_fp(clazz, fp):
+      fp.seek(0)
+      msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+  else:
+    @classmethod
+    def _lock_fp(clazz, fp, blocking):
+      flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+      try:
+        fcntl.flock(fp.fileno(), flags)
+      except BlockingIOError as ex:
+        return False
+      return True
+
+    @classmethod
+    def _unlock_fp(clazz, fp):
+      fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
@@ -38,24 +38,22 @@ class file_match(object):
       elif match_type == clazz.ALL:
         return []
 
-    func_map = {
-      clazz.ANY: clazz._match_any,
-      clazz.NONE: clazz._match_none,
-      clazz.ALL: clazz._match_all,
-    }
-
-    func = func_map[match_type]
-
     result = []
     for filename in filenames:
-      if basename:
-        filename_for_match = path.basename(filename)
-      else:
-        filename_for_match = filename
-      if func(match_func, filename_for_match, patterns):
+      if clazz._match_one(filename, patterns, match_func, match_type, basename = basename):
         result.append(filename)
     return sorted(algorithm.unique(result))
 
+  @classmethod
+  def _match_one(clazz, filename, patterns, match_func, match_type, basename = True):
+    'Return True if one filename matches non empty patterns using match_func and match_type.'
+    if basename:
+      filename_for_match = path.basename(filename)
+    else:
+      filename_for_match = filename
+    func = clazz._FUNC_MAP[match_type]
+    return func(match_func, filename_for_match, patterns)
+
   @staticmethod
   def _match_any(match_func, filename, patterns):
     for pattern in patterns:
@@ -77,6 +75,12 @@ class file_match(object):
         return False
     return True
 
+  _FUNC_MAP = {
+    ANY: _match_any.__func__,
+    NONE: _match_none.__func__,
+    ALL: _match_all.__func__,
+  }
+
   @classmethod
   def match_fnmatch(clazz, filenames, patterns, match_type = None, basename = True):
     patterns = object_util.listify(patterns)
@@ -92,6 +96,39 @@ class file_match(object):
       return len(expression.findall(filename)) > 0
     return clazz._match(filenames, expressions, _match_re, match_type, basename = basename)
 
+  @classmethod
+  def matches_fnmatch(clazz, filename, patterns, match_type = None, basename = True):
+    'Return True if one filename matches patterns.'
+    patterns = object_util.listify(patterns)
+    match_type = match_type or clazz.ANY
+    assert clazz.match_type_is_valid(match_type)
+    if not patterns:
+      return match_type == clazz.NONE
+    return clazz._match_one(filename, patterns, fnmatch.fnmatch, match_type, basename = basename)
+
+  @classmethod
+  def matches_re(clazz, filename, expressions, match_type = None, basename = True):
+    'Return True if one filename matches expressions.  expressions can be strings or compiled.'
+    expressions = [ re.compile(expression) for expression in object_util.listify(expressions) ]
+    match_type = match_type or clazz.ANY
+    assert clazz.match_type_is_valid(match_type)
+    if not expressions:
+      return match_type == clazz.NONE
+    return clazz._match_one(filename, expressions, clazz._match_re_one, match_type, basename = basename)
+
+  @staticmethod
+  def _match_re_one(filename, expression):
+    return expression.search(filename) is not None
+
+  @classmethod
+  def matches_function(clazz, filename, function, match_type = None, basename = True):
+    'Return True if one filename matches function.'
+    match_type = match_type or clazz.ANY
+    assert clazz.match_type_is_valid(match_type)
+    if basename:
+      filename = path.basename(filename)
+    return clazz._match_function_one(filename, function, match_type)
+
   @classmethod
   def match_function(clazz, filenames, function, match_type = None, basename = True):
     match_type = match_type or clazz.ANY
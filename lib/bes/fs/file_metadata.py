@@ -26,6 +26,19 @@ class file_metadata(object):
   @property
   def db_filename(self):
     return self._db_filename
+
+  def close(self):
+    'Close the db.'
+    self._db.close()
+
+  @property
+  def journal_mode(self):
+    return self._db.journal_mode
+
+  @journal_mode.setter
+  def journal_mode(self, journal_mode):
+    check.check_string(journal_mode)
+    self._db.journal_mode = journal_mode
     
   def get_values(self, what, filename):
     check.check_string(what)
@@ -33,6 +46,20 @@ class file_metadata(object):
     filename = file_util.lstrip_sep(filename)
     return self._db.get_values(what, filename)
 
+  def get_values_many(self, what, filenames):
+    'Return a dict of filename to key_value_list for many filenames.'
+    check.check_string(what)
+    check.check_string_seq(filenames)
+    stripped = dict([ ( filename, file_util.lstrip_sep(filename) ) for filename in filenames ])
+    values = self._db.get_values_many(what, list(stripped.values()))
+    return dict([ ( filename, values[stripped_filename] ) for filename, stripped_filename in stripped.items() ])
+
+  def has_values(self, what, filename):
+    check.check_string(what)
+    check.check_string(filename)
+    filename = file_util.lstrip_sep(filename)
+    return self._db.has_values(what, filename)
+
   def replace_values(self, what, filename, values):
     check.check_string(what)
     check.check_string(filename)
@@ -45,6 +72,13 @@ class file_metadata(object):
     filename = file_util.lstrip_sep(filename)
     self._db.set_value(what, filename, key, value)
 
+  def set_values_many(self, what, values):
+    'Set values for many files in one transaction.  values is a dict of filename to a dict of key to value.'
+    check.check_string(what)
+    check.check_dict(values)
+    values = dict([ ( file_util.lstrip_sep(filename), file_values ) for filename, file_values in values.items() ])
+    self._db.set_values_many(what, values)
+
   def get_value(self, what, filename, key):
     check.check_string(what)
     check.check_string(filename)
@@ -56,7 +90,3 @@ class file_metadata(object):
     check.check_string(filename)
     filename = file_util.lstrip_sep(filename)
     self._db.clear(what, filename)
-
-  def _table_name(self, what, filename):
-    filename = file_util.lstrip_sep(filename)
-    return self._db._table_name(what, filename)
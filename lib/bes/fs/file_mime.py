@@ -26,6 +26,16 @@ class file_mime(object):
   def mime_type(clazz, filename):
     return file_mime_type_detector.detect_mime_type(filename)
     
+  @classmethod
+  def mime_types(clazz, filenames, cache = None):
+    '''
+    Return a dict of filename to mime type for many files.  cache is an
+    optional file_mime_type_cache that keeps the results across runs.
+    '''
+    if cache:
+      return cache.mime_types(filenames)
+    return file_mime_type_detector.detect_mime_types(filenames)
+
   @classmethod
   def is_text(clazz, filename):
     return clazz.mime_type_is_text(filename) or text_detect.file_is_text(filename)
@@ -0,0 +1,80 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os
+import os.path as path
+
+from ..sqlite.sqlite import sqlite
+from ..system.check import check
+from ..system.log import logger
+
+from .file_mime_type_detector import file_mime_type_detector
+
+class file_mime_type_cache(object):
+  '''
+  A persistent cache of mime types keyed by the device, inode, size and mtime
+  of files.  Renaming or moving a file within a device keeps its entry valid
+  while any change to the content invalidates it.
+  '''
+
+  _log = logger('file_mime_type_cache')
+
+  _SCHEMA = '''
+create table mime_types(
+  device    integer not null,
+  inode     integer not null,
+  size      integer not null,
+  mtime_ns  integer not null,
+  mime_type text,
+  primary key (device, inode, size, mtime_ns)
+) without rowid;
+'''
+
+  def __init__(self, db_filename):
+    check.check_string(db_filename)
+
+    self._db = sqlite(db_filename)
+    self._db.ensure_table('mime_types', self._SCHEMA)
+    self._db.commit()
+    self.hits = 0
+    self.misses = 0
+
+  _instances = {}
+  @classmethod
+  def get(clazz, db_filename):
+    'Return a shared cache for db_filename or None if db_filename is None.'
+    check.check_string(db_filename, allow_none = True)
+    if not db_filename:
+      return None
+    db_filename = path.abspath(db_filename)
+    if not db_filename in clazz._instances:
+      clazz._instances[db_filename] = file_mime_type_cache(db_filename)
+    return clazz._instances[db_filename]
+
+  def mime_types(self, filenames):
+    'Return a dict of filename to mime type using cached values when the files did not change.'
+    check.check_string_seq(filenames)
+
+    result = {}
+    missing = {}
+    for filename in filenames:
+      key = self._make_key(filename)
+      row = self._db.select_one('select mime_type from mime_types where device=? and inode=? and size=? and mtime_ns=?', key)
+      if row:
+        result[filename] = row[0]
+      else:
+        missing[filename] = key
+    self.hits += len(result)
+    self.misses += len(missing)
+    self._log.log_d('mime_types: {} hits {} misses', len(result), len(missing))
+    if missing:
+      detected = file_mime_type_detector.detect_mime_types(list(missing.keys()))
+      sql = 'insert or replace into mime_types (device, inode, size, mtime_ns, mime_type) values (?, ?, ?, ?, ?)'
+      self._db.executemany(sql, [ key + ( detected[filename], ) for filename, key in missing.items() ])
+      self._db.commit()
+      result.update(detected)
+    return result
+
+  @classmethod
+  def _make_key(clazz, filename):
+    st = os.stat(filename)
+    return ( st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns )
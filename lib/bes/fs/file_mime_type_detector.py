@@ -43,3 +43,26 @@ class file_mime_type_detector(_file_mime_type_detector_base):
       if clazz._FILE_EXE_SUPPORTED:
         mime_type = _file_mime_type_detector_file_exe.detect_mime_type(filename)
     return mime_type
+
+  @classmethod
+  def detect_mime_types(clazz, filenames):
+    '''
+    Detect the mime type for many files and return a dict of filename to mime type.
+    Each detector is given all the files the previous detectors could not figure out.
+    '''
+    for filename in filenames:
+      file_check.check_file(filename)
+
+    result = dict([ ( filename, None ) for filename in filenames ])
+    remaining = list(result.keys())
+    for next_detector in clazz._POSSIBLE_DETECTORS:
+      if not remaining:
+        break
+      mime_types = next_detector.detect_mime_types(remaining)
+      result.update([ item for item in mime_types.items() if item[1] ])
+      remaining = [ filename for filename in remaining if not result[filename] ]
+    if clazz._FILE_EXE_SUPPORTED:
+      octet_streams = [ filename for filename, mime_type in result.items() if mime_type in ( 'application/octet-stream', ) ]
+      if octet_streams:
+        result.update(_file_mime_type_detector_file_exe.detect_mime_types(octet_streams))
+    return result
@@ -11,6 +11,7 @@ from bes.common.object_util import object_util
 from bes.system.log import logger
 
 from .dir_util import dir_util
+from .dir_walk_cache import dir_walk_cache
 from .file_check import file_check
 from .file_find import file_find
 from .file_match import file_match
@@ -38,6 +39,29 @@ class file_resolver(object):
     options = options or file_resolver_options()
     return clazz._do_resolve_files(files, options, file_find.FILE)
 
+  @classmethod
+  def iter_resolve_files(clazz, files, options = None):
+    '''
+    Like resolve_files() but yield items as they are found in no particular
+    order so callers can start working before the walk finishes.  Sorting
+    needs all the files so sort_order is not supported.
+    '''
+    check.check_string_seq(files)
+    check.check_file_resolver_options(options, allow_none = True)
+
+    options = options or file_resolver_options()
+    if options.sort_order:
+      raise ValueError(f'sort_order not supported by iter_resolve_files: {options.sort_order}')
+    abs_files = [ path.abspath(f) for f in files ]
+    index = 0
+    for next_found_item in clazz._iter_find_files(abs_files, options, file_find.FILE, False):
+      if options.limit and index >= options.limit:
+        return
+      if not options.should_ignore_file(next_found_item.filename_abs):
+        filename_rel = path.relpath(next_found_item.filename_abs, start = next_found_item.root_dir)
+        yield file_resolver_item(next_found_item.root_dir, filename_rel, next_found_item.filename_abs, index, index)
+        index = index + 1
+
   @classmethod
   def resolve_dirs(clazz, dirs, options = None):
     'Resolve a directories only.'
@@ -58,9 +82,10 @@ class file_resolver(object):
 
     abs_files = [ path.abspath(f) for f in files ]
     found_items = clazz._find_files(abs_files, options, file_type)
-    num_items = len(found_items)
-    for i, item in enumerate(found_items, start = 1):
-      clazz._log.log_d(f'_do_resolve_files: item {i} of {num_items}: {item.root_dir} {item.filename_abs} {item.from_dir}')
+    if clazz._log.is_debug:
+      num_items = len(found_items)
+      for i, item in enumerate(found_items, start = 1):
+        clazz._log.log_d(f'_do_resolve_files: item {i} of {num_items}: {item.root_dir} {item.filename_abs} {item.from_dir}')
     
     result = file_resolver_item_list()
     index = 0
@@ -81,27 +106,29 @@ class file_resolver(object):
   @classmethod
   def _find_files(clazz, files, options, file_type):
     'Resolve a mixed list of files and directories into a list of files.'
+    return list(clazz._iter_find_files(files, options, file_type, True))
+
+  @classmethod
+  def _iter_find_files(clazz, files, options, file_type, sort):
+    'Resolve a mixed list of files and directories into files as they are found.'
 
     files = object_util.listify(files)
-    items = []
+    normalized_files = []
     for i, f in enumerate(files, start = 1):
       if not path.isabs(f):
         raise ValueError(f'filename should be an absolute path: {f}')
-      clazz._log.log_d(f'_find_files: files: {i}: {f}')
-    for next_file in files:
-      clazz._log.log_d(f'_find_files: next_file={next_file}')
-      filename_abs = file_path.normalize(next_file)
+      clazz._log.log_d('_find_files: files: {}: {}', i, f)
+      filename_abs = file_path.normalize(f)
       if not path.exists(filename_abs):
         raise IOError('File or directory not found: "{}"'.format(filename_abs))
+      normalized_files.append(( f, filename_abs ))
+    for next_file, filename_abs in normalized_files:
+      clazz._log.log_d('_find_files: next_file={}', next_file)
       if path.isfile(filename_abs):
-        item = clazz._resolved_item(filename_abs, path.dirname(filename_abs), False)
-        items.append(item)
+        yield clazz._resolved_item(filename_abs, path.dirname(filename_abs), False)
       elif path.isdir(filename_abs):
-        next_entries = clazz._find_files_in_dir(filename_abs, options, 0, file_type)
-        for next_entry in next_entries:
-          item = clazz._resolved_item(next_entry, next_file, True)
-          items.append(item)
-    return items
+        for next_entry in clazz._find_files_in_dir(filename_abs, options, 0, file_type, sort = sort):
+          yield clazz._resolved_item(next_entry, next_file, True)
   
   @classmethod
   def _sort_result(clazz, result, order, reverse):
@@ -134,21 +161,22 @@ class file_resolver(object):
     return reindexed_result
   
   @classmethod
-  def _find_files_in_dir(clazz, root_dir, options, starting_index, file_type):
-    result = []
+  def _find_files_in_dir(clazz, root_dir, options, starting_index, file_type, sort = True):
     if options.recursive:
       max_depth = None
     else:
       max_depth = 1
-    found_files = file_find.find(root_dir,
-                                 relative = False,
-                                 file_type = file_type,
-                                 match_patterns = options.match_patterns,
-                                 match_type = options.match_type,
-                                 match_basename = options.match_basename,
-                                 match_function = options.match_function,
-                                 match_re = options.match_re,
-                                 max_depth = max_depth)
+    find_func = file_find.find if sort else file_find.iter_find
+    found_files = find_func(root_dir,
+                            relative = False,
+                            file_type = file_type,
+                            match_patterns = options.match_patterns,
+                            match_type = options.match_type,
+                            match_basename = options.match_basename,
+                            match_function = options.match_function,
+                            match_re = options.match_re,
+                            max_depth = max_depth,
+                            walk_cache = dir_walk_cache.get(options.walk_cache))
     return found_files
 
   @classmethod
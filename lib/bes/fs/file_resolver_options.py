@@ -27,6 +27,7 @@ class file_resolver_options(cli_options, file_ignore_options_mixin):
       'match_function': None,
       'match_re': None,
       'ignore_files': None,
+      'walk_cache': None,
     }
 
   @classmethod
@@ -50,6 +51,7 @@ class file_resolver_options(cli_options, file_ignore_options_mixin):
       #'match_function': None,
       #'match_re': list,
       'ignore_files': list,
+      'walk_cache': str,
     }
 
   @classmethod
@@ -85,5 +87,6 @@ class file_resolver_options(cli_options, file_ignore_options_mixin):
     check.check_callable(self.match_function, allow_none = True)
     check.check_string_seq(self.match_re, allow_none = True)
     check.check_string_seq(self.ignore_files, allow_none = True)
+    check.check_string(self.walk_cache, allow_none = True)
     
 check.register_class(file_resolver_options)
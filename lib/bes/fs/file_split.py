@@ -1,13 +1,18 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
 from collections import namedtuple
-import os.path as path
+from concurrent.futures import ThreadPoolExecutor
+import errno
+import hashlib
 import math
+import os
+import os.path as path
 
 from bes.archive.archiver import archiver
 from ..system.check import check
 from bes.common.time_util import time_util
 from bes.system.check import check
+from bes.system.host import host
 from bes.system.log import logger
 
 from .dir_util import dir_util
@@ -35,46 +40,75 @@ class file_split(object):
     check.check_string_seq(files)
     check.check_file_split_options(options, allow_none = True)
 
+    options = options or file_split_options()
     info = clazz.find_and_unsplit_info(files, options = options)
-    for item in info.items:
-      item_target = item.target
-      options.blurber.blurb_verbose(f'Unsplitting {item_target} - {len(item.files)} parts.')
-      tmp = temp_file.make_temp_file(prefix = path.basename(item_target), dir = path.dirname(item_target))
-      clazz.unsplit_files(tmp, item.files)
-      if options.unzip:
-        if archiver.is_valid(tmp):
-          members = archiver.members(tmp)
-          num_members = len(members)
-          if num_members != 1:
-            options.blurber.blurb(f'{item_target} archive should have exactly 1 member instead of {num_members}')
-          else:
-            archive_filename = members[0]
-            archive_tmp_dir = temp_file.make_temp_dir(prefix = path.basename(archive_filename),
-                                                      dir = path.dirname(item_target),
-                                                      delete = False)
-            archiver.extract_all(tmp, archive_tmp_dir)
-            archive_tmp_file = path.join(archive_tmp_dir, archive_filename)
-            assert path.exists(archive_tmp_file)
-            file_util.rename(archive_tmp_file, tmp)
-            file_util.remove(archive_tmp_dir)
-            item_target = path.join(path.dirname(item_target), archive_filename)
-            
-      target = None
-      if path.exists(item_target):
-        if file_util.files_are_the_same(tmp, item_target):
-          options.blurber.blurb(f'{item_target} already exists and is the same')
-          file_util.remove(tmp)
+    num_threads = max(1, options.num_threads)
+    if num_threads == 1 or len(info.items) < 2:
+      for item in info.items:
+        clazz._unsplit_item(item, options)
+      return
+    # Groups are independent so they can be unsplit concurrently
+    with ThreadPoolExecutor(max_workers = num_threads) as executor:
+      for future in [ executor.submit(clazz._unsplit_item, item, options) for item in info.items ]:
+        future.result()
+
+  @classmethod
+  def _unsplit_item(clazz, item, options):
+    item_target = item.target
+    options.blurber.blurb_verbose(f'Unsplitting {item_target} - {len(item.files)} parts.')
+    tmp = temp_file.make_temp_file(prefix = path.basename(item_target), dir = path.dirname(item_target))
+    # Only hash while writing when there is an existing target of the same
+    # size to compare against.  Otherwise the parts are concatenated without
+    # going through user space.
+    hash_algorithm = None
+    if not options.unzip and path.isfile(item_target):
+      if file_util.size(item_target) == sum([ file_util.size(f) for f in item.files ]):
+        hash_algorithm = clazz._HASH_ALGORITHM
+    tmp_checksum = clazz.unsplit_files(tmp, item.files, hash_algorithm = hash_algorithm)
+    if options.unzip:
+      if archiver.is_valid(tmp):
+        members = archiver.members(tmp)
+        num_members = len(members)
+        if num_members != 1:
+          options.blurber.blurb(f'{item_target} archive should have exactly 1 member instead of {num_members}')
         else:
-          ts = time_util.timestamp(delimiter = '',
-                                   milliseconds = False,
-                                   when = options.existing_file_timestamp)
-          target = clazz._make_timestamp_filename(item_target, ts)
-          options.blurber.blurb(f'{item_target} already exists but is different.  Renaming to {target}')
+          archive_filename = members[0]
+          archive_tmp_dir = temp_file.make_temp_dir(prefix = path.basename(archive_filename),
+                                                    dir = path.dirname(item_target),
+                                                    delete = False)
+          archiver.extract_all(tmp, archive_tmp_dir)
+          archive_tmp_file = path.join(archive_tmp_dir, archive_filename)
+          assert path.exists(archive_tmp_file)
+          file_util.rename(archive_tmp_file, tmp)
+          file_util.remove(archive_tmp_dir)
+          item_target = path.join(path.dirname(item_target), archive_filename)
+          
+    target = None
+    if path.exists(item_target):
+      if clazz._same_as_existing(tmp, tmp_checksum, item_target):
+        options.blurber.blurb(f'{item_target} already exists and is the same')
+        file_util.remove(tmp)
       else:
-        target = item_target
-      if target:
-        file_util.rename(tmp, target)
-      file_util.remove(item.files)
+        ts = time_util.timestamp(delimiter = '',
+                                 milliseconds = False,
+                                 when = options.existing_file_timestamp)
+        target = clazz._make_timestamp_filename(item_target, ts)
+        options.blurber.blurb(f'{item_target} already exists but is different.  Renaming to {target}')
+    else:
+      target = item_target
+    if target:
+      file_util.rename(tmp, target)
+    file_util.remove(item.files)
+
+  _HASH_ALGORITHM = 'sha256'
+  @classmethod
+  def _same_as_existing(clazz, tmp, tmp_checksum, existing):
+    'Return True if tmp has the same content as existing using the checksum computed while unsplitting if any.'
+    if file_util.size(tmp) != file_util.size(existing):
+      return False
+    if tmp_checksum is None:
+      return file_util.files_are_the_same(tmp, existing)
+    return tmp_checksum == file_util.checksum(clazz._HASH_ALGORITHM, existing)
 
   @classmethod
   def _make_timestamp_filename(clazz, filename, ts):
@@ -212,13 +246,76 @@ class file_split(object):
     return filename_util.add_extension(split_filename, extension)
   
   @classmethod
-  def unsplit_files(clazz, target_filename, files, buffer_size = 1024 * 1204):
+  def unsplit_files(clazz, target_filename, files, buffer_size = 1024 * 1204, hash_algorithm = None):
+    '''
+    Concatenate files into target_filename.  Without hash_algorithm the data is
+    copied in the kernel when the platform supports it.  With hash_algorithm the
+    data is hashed while being written and the hex digest is returned.
+    '''
+    check.check_string(target_filename)
+    check.check_string_seq(files)
+    check.check_string(hash_algorithm, allow_none = True)
+
+    hasher = hashlib.new(hash_algorithm) if hash_algorithm else None
     with open(target_filename, 'wb') as fout:
       for next_filename in files:
         with open(next_filename, 'rb') as fin:
-          while True:
-            data = fin.read(buffer_size)
-            if not data:
-              break
-            fout.write(data)
-  
+          if hasher:
+            clazz._copy_and_hash(fin, fout, buffer_size, hasher)
+          else:
+            clazz._copy_fast(fin, fout, buffer_size)
+    return hasher.hexdigest() if hasher else None
+
+  @classmethod
+  def _copy_and_hash(clazz, fin, fout, buffer_size, hasher):
+    while True:
+      data = fin.read(buffer_size)
+      if not data:
+        break
+      hasher.update(data)
+      fout.write(data)
+
+  @classmethod
+  def _copy_fast(clazz, fin, fout, buffer_size):
+    '''
+    Append fin to fout without going through user space using copy_file_range()
+    or sendfile() and fall back to plain reads and writes when neither works.
+    '''
+    fout.flush()
+    in_fd = fin.fileno()
+    out_fd = fout.fileno()
+    size = os.fstat(in_fd).st_size
+    copied = 0
+    for func in clazz._fast_copy_functions():
+      try:
+        while copied < size:
+          n = func(in_fd, out_fd, copied, size - copied)
+          if n == 0:
+            break
+          copied += n
+      except OSError as ex:
+        # not supported for these files.  only possible before anything was copied
+        if copied != 0 or ex.errno not in clazz._FAST_COPY_UNSUPPORTED_ERRNOS:
+          raise
+        continue
+      if copied == size:
+        return
+    fin.seek(copied)
+    fout.seek(0, os.SEEK_END)
+    while True:
+      data = fin.read(buffer_size)
+      if not data:
+        break
+      fout.write(data)
+
+  _FAST_COPY_UNSUPPORTED_ERRNOS = ( errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP )
+
+  @classmethod
+  def _fast_copy_functions(clazz):
+    result = []
+    if hasattr(os, 'copy_file_range'):
+      result.append(lambda in_fd, out_fd, offset, count: os.copy_file_range(in_fd, out_fd, count, offset))
+    if host.is_linux() and hasattr(os, 'sendfile'):
+      # linux sendfile can write to regular files and advances the output offset
+      result.append(lambda in_fd, out_fd, offset, count: os.sendfile(out_fd, in_fd, offset, count))
+    return result
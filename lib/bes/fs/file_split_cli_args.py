@@ -14,6 +14,7 @@ class file_split_cli_args(object):
     
   @classmethod
   def __file_split_cli_add_add_common_args(clazz, p):
+    from .file_split_defaults import file_split_defaults
     p.add_argument('--dry-run', action = 'store_true', default = False,
                    help = 'Dont do anything just print what would happen [ None ]')
     p.add_argument('-r', '--recursive', action = 'store_true', default = False,
@@ -32,6 +33,9 @@ class file_split_cli_args(object):
                    help = 'If the unsplit file is an archive, then unzip it [ False ]')
     p.add_argument('--ignore-incomplete', action = 'store_true', default = False,
                    help = 'Ignore incomplete sets instead of raising errors [ False ]')
+    p.add_argument('--num-threads', action = 'store', type = int,
+                   default = file_split_defaults.NUM_THREADS,
+                   help = f'Number of split groups to unsplit at the same time [ {file_split_defaults.NUM_THREADS} ]')
     
   def _command_file_split(self, command, *args, **kargs):
     from .file_split_cli_handler import file_split_cli_handler
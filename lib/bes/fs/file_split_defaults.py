@@ -0,0 +1,5 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+class file_split_defaults:
+
+  NUM_THREADS = 4
@@ -7,6 +7,7 @@ from bes.cli.cli_options import cli_options
 from ..system.check import check
 from bes.script.blurber import blurber
 
+from .file_split_defaults import file_split_defaults
 from .files_cli_options import files_cli_options
 
 class file_split_options(files_cli_options):
@@ -28,6 +29,7 @@ class file_split_options(files_cli_options):
       'ignore_extensions': None,
       'unzip': False,
       'ignore_incomplete': False,
+      'num_threads': file_split_defaults.NUM_THREADS,
     })
   
   @classmethod
@@ -41,6 +43,7 @@ class file_split_options(files_cli_options):
 #      'ignore_extensions': set,
 #      'existing_file_timestamp': datetime,
       'ignore_incomplete': bool,
+      'num_threads': int,
     })
 
   #@abstractmethod
@@ -56,5 +59,6 @@ class file_split_options(files_cli_options):
     check.check_string_seq(self.ignore_extensions, allow_none = True)
     check.check_bool(self.unzip)
     check.check_bool(self.ignore_incomplete)
+    check.check_int(self.num_threads)
 
 check.register_class(file_split_options)
@@ -1,57 +1,157 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import os
 from os import path
 
+from bes.system.check import check
 from bes.system.log import log
-from .file_find import file_find
 from .file_util import file_util
 
+class file_sync_plan(namedtuple('file_sync_plan', 'copy, update_mode, remove, unchanged')):
+  '''
+  What a sync does.  copy are files whose content is copied, update_mode are
+  files with only a different mode, remove are destination files that went away
+  and unchanged is the number of files left alone.  All paths are relative.
+  '''
+
+  @property
+  def empty(self):
+    return not (self.copy or self.update_mode or self.remove)
+
+  def to_string(self):
+    lines = []
+    lines.extend([ 'copy {}'.format(f) for f in self.copy ])
+    lines.extend([ 'mode {}'.format(f) for f in self.update_mode ])
+    lines.extend([ 'remove {}'.format(f) for f in self.remove ])
+    return os.linesep.join(lines)
+
+  def __str__(self):
+    return self.to_string()
+
 class file_sync(object):
 
+  DEFAULT_NUM_THREADS = 4
+
+  _entry = namedtuple('_entry', 'size, mtime_ns, mode')
+
   @classmethod
-  def sync(clazz, src_dir, dst_dir, exclude = None):
-    exclude = set(exclude or [])
-    src_files = set(file_find.find(src_dir, relative = True, file_type = file_find.FILE))
-    src_files = src_files - exclude
-    src_dirs = set(file_find.find(src_dir, relative = True, file_type = file_find.DIR))
+  def sync(clazz, src_dir, dst_dir, exclude = None, num_threads = None, dry_run = False):
+    '''
+    Sync the files in src_dir to dst_dir and return the file_sync_plan.
+    Files with the same size and mtime are assumed to be the same.  Files with
+    the same size but a different mtime are compared by checksum and left
+    alone, including their mtime, if the content did not change.  Copied files
+    get the mtime of the source so the next sync can skip them cheaply.
+    '''
+    check.check_string(src_dir)
+    check.check_string(dst_dir)
+    check.check_int(num_threads, allow_none = True)
+    check.check_bool(dry_run)
+
+    num_threads = max(1, num_threads or clazz.DEFAULT_NUM_THREADS)
+    plan = clazz.plan(src_dir, dst_dir, exclude = exclude, num_threads = num_threads)
+    clazz.log_d('sync: {} copy {} mode {} remove {} unchanged', len(plan.copy), len(plan.update_mode),
+                len(plan.remove), plan.unchanged)
+    if dry_run:
+      return plan
+    for filename in plan.remove:
+      file_util.remove(path.join(dst_dir, filename))
+    def _copy(filename):
+      clazz._copy_file(path.join(src_dir, filename), path.join(dst_dir, filename))
+    def _copy_mode(filename):
+      file_util.copy_mode(path.join(src_dir, filename), path.join(dst_dir, filename))
+    clazz._map(_copy, plan.copy, num_threads)
+    clazz._map(_copy_mode, plan.update_mode, num_threads)
+    return plan
 
-    dst_files = set(file_find.find(dst_dir, relative = True, file_type = file_find.FILE))
-    dst_dirs = set(file_find.find(dst_dir, relative = True, file_type = file_find.DIR))
+  @classmethod
+  def plan(clazz, src_dir, dst_dir, exclude = None, num_threads = None):
+    'Return the file_sync_plan for syncing src_dir to dst_dir without changing anything.'
+    check.check_string(src_dir)
+    check.check_string(dst_dir)
+    check.check_int(num_threads, allow_none = True)
+
+    num_threads = max(1, num_threads or clazz.DEFAULT_NUM_THREADS)
+    exclude = set(exclude or [])
+    src_files, src_dirs = clazz._scan(src_dir)
+    for filename in exclude:
+      src_files.pop(filename, None)
+    dst_files, dst_dirs = clazz._scan(dst_dir)
 
-    files_became_dirs = src_files & dst_dirs
+    files_became_dirs = set(src_files) & dst_dirs
     if files_became_dirs:
-      raise RuntimeError('some files became dirs: %s' % (' '.join(files_became_dirs)))
-    
-    dirs_became_files = dst_files & src_dirs
+      raise RuntimeError('some files became dirs: %s' % (' '.join(sorted(files_became_dirs))))
+
+    dirs_became_files = set(dst_files) & src_dirs
     if dirs_became_files:
-      raise RuntimeError('some dirs became files: %s' % (' '.join(dirs_became_files)))
-
-    # Delete files that went away
-    clazz.log_d('SRC: %s' % (src_dir))
-    for x in src_files:
-      clazz.log_d('  %s' % (x))
-    clazz.log_d('DST: %s' % (dst_dir))
-    for x in dst_files:
-      clazz.log_d('  %s' % (x))
-    for dst_file in dst_files:
-      if not dst_file in src_files:
-        file_util.remove(path.join(dst_dir, dst_file))
-        
-    # Either copy new files or check a checksum and update them.
-    # The reason for the checksum is we want to leave the mtime alone of the content didnt change
-    for src_file in src_files:
-      src_file_path = path.join(src_dir, src_file)
-      dst_file_path = path.join(dst_dir, src_file)
-      should_copy = False
-      if path.isfile(dst_file_path):
-        should_copy = file_util.checksum('sha1', src_file_path) != file_util.checksum('sha1', dst_file_path)
-        should_copy_mode = file_util.mode(src_file_path) != file_util.mode(dst_file_path)
+      raise RuntimeError('some dirs became files: %s' % (' '.join(sorted(dirs_became_files))))
+
+    remove = sorted([ filename for filename in dst_files if filename not in src_files ])
+    copy = []
+    update_mode = []
+    need_checksum = []
+    unchanged = 0
+    for filename, src_entry in sorted(src_files.items()):
+      dst_entry = dst_files.get(filename, None)
+      if dst_entry is None or dst_entry.size != src_entry.size:
+        copy.append(filename)
+      elif dst_entry.mtime_ns != src_entry.mtime_ns:
+        need_checksum.append(filename)
+      elif dst_entry.mode != src_entry.mode:
+        update_mode.append(filename)
+      else:
+        unchanged += 1
+
+    # Only files with the same size but a different mtime need to be read.
+    # We want to leave the mtime alone if the content did not change.
+    def _same_content(filename):
+      src_checksum = file_util.checksum('sha1', path.join(src_dir, filename))
+      dst_checksum = file_util.checksum('sha1', path.join(dst_dir, filename))
+      return src_checksum == dst_checksum
+    for filename, same_content in zip(need_checksum, clazz._map(_same_content, need_checksum, num_threads)):
+      if not same_content:
+        copy.append(filename)
+      elif dst_files[filename].mode != src_files[filename].mode:
+        update_mode.append(filename)
       else:
-        should_copy = True
-        should_copy_mode = True
-      if should_copy:
-        file_util.copy(src_file_path, dst_file_path)
-      if should_copy_mode:
-        file_util.copy_mode(src_file_path, dst_file_path)
-    
+        unchanged += 1
+    return file_sync_plan(sorted(copy), sorted(update_mode), remove, unchanged)
+
+  @classmethod
+  def _scan(clazz, root_dir):
+    '''
+    Walk root_dir once and return a dict of relative filename to _entry for
+    regular files and a set of relative dirs.  Symlinks are ignored.
+    '''
+    files = {}
+    dirs = set()
+    stack = [ ( root_dir, None ) ]
+    while stack:
+      dirname, head = stack.pop()
+      with os.scandir(dirname) as it:
+        for entry in it:
+          relative = path.join(head, entry.name) if head else entry.name
+          if entry.is_dir(follow_symlinks = False):
+            dirs.add(relative)
+            stack.append(( entry.path, relative ))
+          elif entry.is_file(follow_symlinks = False):
+            st = entry.stat(follow_symlinks = False)
+            files[relative] = clazz._entry(st.st_size, st.st_mtime_ns, st.st_mode & 0o777)
+    return files, dirs
+
+  @classmethod
+  def _copy_file(clazz, src, dst):
+    file_util.copy(src, dst)
+    st = os.stat(src)
+    os.utime(dst, ns = ( st.st_atime_ns, st.st_mtime_ns ))
+
+  @classmethod
+  def _map(clazz, func, items, num_threads):
+    if num_threads == 1 or len(items) < 2:
+      return [ func(item) for item in items ]
+    with ThreadPoolExecutor(max_workers = num_threads) as executor:
+      return list(executor.map(func, items))
+
 log.add_logging(file_sync, 'file_sync')
@@ -103,6 +103,8 @@ class files_cli_args(object):
                    help = 'Timestamp for resolving duplicate files [ None ]')
     p.add_argument('--dup-file-count', action = 'store', default = None, type = int,
                    help = 'Count to begin at for resolving duplicate files [ 1 ]')
+    p.add_argument('--walk-cache', action = 'store', default = None,
+                   help = 'Cache directory listings in this db to speed up repeated runs [ None ]')
     
   def _command_files(self, command, *args, **kargs):
     from .files_cli_handler import files_cli_handler
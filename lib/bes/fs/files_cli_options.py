@@ -27,6 +27,7 @@ class files_cli_options(cli_options, file_ignore_options_mixin):
       'ignore_files': None,
       'dup_file_timestamp': time_util.timestamp(),
       'dup_file_count': 1,
+      'walk_cache': None,
     }
   
   @classmethod
@@ -46,6 +47,7 @@ class files_cli_options(cli_options, file_ignore_options_mixin):
       'verbose': bool,
       'ignore_files': list,
       'dup_file_count': int,
+      'walk_cache': str,
     }
 
   @classmethod
@@ -79,10 +81,12 @@ class files_cli_options(cli_options, file_ignore_options_mixin):
     check.check_string_seq(self.ignore_files, allow_none = True)
     check.check_string(self.dup_file_timestamp, allow_none = True)
     check.check_int(self.dup_file_count, allow_none = True)
+    check.check_string(self.walk_cache, allow_none = True)
 
   @cached_property
   def file_resolver_options(self):
     return file_resolver_options(recursive = self.recursive,
-                                 ignore_files = self.ignore_files)
+                                 ignore_files = self.ignore_files,
+                                 walk_cache = self.walk_cache)
     
 check.register_class(files_cli_options)
@@ -764,24 +764,61 @@ class git(git_lfs):
       branches = clazz._list_both_branches(root, limit = limit)
     return git_branch_list(branches)
 
-  @classmethod
-  def _branch_list_determine_authors(clazz, root, branches):
+  # %00 separated fields for git for-each-ref.  symref is used to skip origin/HEAD
+  _BRANCH_REF_FORMAT = '%00'.join([
+    '%(HEAD)',
+    '%(refname)',
+    '%(objectname:short)',
+    '%(upstream:track)',
+    '%(authoremail)',
+    '%(contents:subject)',
+    '%(symref)',
+  ])
+  _LOCAL_BRANCH_REF_PREFIX = 'refs/heads/'
+  _REMOTE_BRANCH_REF_PREFIX = 'refs/remotes/'
+
+  @classmethod
+  def _for_each_branch_ref(clazz, root, ref_prefixes):
+    'Return a git_branch_list with names, commits and authors for all branches under ref_prefixes in one git call.'
+    args = [ 'for-each-ref', '--format={}'.format(clazz._BRANCH_REF_FORMAT) ] + list(ref_prefixes)
+    rv = git_exe.call_git(root, args)
     result = git_branch_list()
-    for branch in branches:
-      result.append(branch.clone({ 'author': git.author(root, branch.commit, brief = True) }))
+    for line in rv.stdout.splitlines():
+      branch = clazz._parse_branch_ref(line)
+      if branch:
+        result.append(branch)
     return result
 
+  @classmethod
+  def _parse_branch_ref(clazz, line):
+    'Parse one line of _BRANCH_REF_FORMAT output.  Return None for lines that are not branches.'
+    parts = line.split('\0')
+    if len(parts) != 7:
+      return None
+    head, refname, commit, track, author_email, subject, symref = parts
+    if symref:
+      return None
+    if refname.startswith(clazz._LOCAL_BRANCH_REF_PREFIX):
+      where = 'local'
+      name = string_util.remove_head(refname, clazz._LOCAL_BRANCH_REF_PREFIX)
+    elif refname.startswith(clazz._REMOTE_BRANCH_REF_PREFIX):
+      where = 'remote'
+      name = string_util.remove_head(refname, clazz._REMOTE_BRANCH_REF_PREFIX)
+      name = string_util.remove_head(name, 'origin/')
+    else:
+      return None
+    ahead, behind = git_branch.parse_branch_status(track)
+    # git branch --verbose collapses white space in the subject
+    comment = ' '.join(subject.split())
+    author = clazz._brief_author(author_email.strip('<>'))
+    return git_branch(name, where, head == '*', ahead, behind, commit, author, comment)
+
   @classmethod
   def list_remote_branches(clazz, root, limit = None):
     check.check_string(root)
     check.check_int(limit, allow_none = True)
-    
-    rv = git_exe.call_git(root, [ 'branch', '--verbose', '--list', '--no-color', '--remote' ])
-    lines = git_exe.parse_lines(rv.stdout)
-    lines = [ line for line in lines if not ' -> ' in line ]
-    lines = [ string_util.remove_head(line, 'origin/') for line in lines ]
-    branches = git_branch_list([ git_branch.parse_branch(line, 'remote') for line in lines ])
-    branches = clazz._branch_list_determine_authors(root, branches)
+
+    branches = clazz._for_each_branch_ref(root, [ clazz._REMOTE_BRANCH_REF_PREFIX ])
     if limit != None:
       branches = branches[0:limit]
     return branches
@@ -791,10 +828,7 @@ class git(git_lfs):
     check.check_string(root)
     check.check_int(limit, allow_none = True)
 
-    rv = git_exe.call_git(root, [ 'branch', '--verbose', '--list', '--no-color' ])
-    lines = git_exe.parse_lines(rv.stdout)
-    branches = git_branch_list([ git_branch.parse_branch(line, 'local') for line in lines ])
-    branches = clazz._branch_list_determine_authors(root, branches)
+    branches = clazz._for_each_branch_ref(root, [ clazz._LOCAL_BRANCH_REF_PREFIX ])
     if limit != None:
       branches = branches[0:limit]
     return branches
@@ -809,14 +843,17 @@ class git(git_lfs):
   
   @classmethod
   def _list_both_branches(clazz, root, limit):
-    local_branches = clazz.list_local_branches(root)
-    remote_branches = clazz.list_remote_branches(root)
+    all_branches = clazz._for_each_branch_ref(root, [ clazz._LOCAL_BRANCH_REF_PREFIX,
+                                                      clazz._REMOTE_BRANCH_REF_PREFIX ])
     branch_map = {}
 
-    for branch in clazz.list_remote_branches(root):
-      branch_map[branch.name] = [ branch ]
+    for branch in all_branches:
+      if branch.where == 'remote':
+        branch_map[branch.name] = [ branch ]
 
-    for branch in clazz.list_local_branches(root):
+    for branch in all_branches:
+      if branch.where != 'local':
+        continue
       existing_branch = branch_map.get(branch.name, None)
       if existing_branch:
         assert len(existing_branch) == 1
@@ -831,7 +868,6 @@ class git(git_lfs):
     for _, branches in branch_map.items():
       result.extend(branches)
     result.sort()
-    result = clazz._branch_list_determine_authors(root, result)
     if limit != None:
       result = result[0:limit]
     return result
@@ -870,12 +906,18 @@ class git(git_lfs):
     rv = git_exe.call_git(root, [ 'show', '--no-patch', '--pretty=%ae', commit ])
     author = rv.stdout.strip()
     if brief:
-      i = author.find('@')
+      author = clazz._brief_author(author)
+    return author
+
+  @classmethod
+  def _brief_author(clazz, author):
+    'Return the part of an author email before the @ and the first dot.'
+    i = author.find('@')
+    if i > 0:
+      author = author[0:i]
+      i = author.find('.')
       if i > 0:
         author = author[0:i]
-        i = author.find('.')
-        if i > 0:
-          author = author[0:i]
     return author
 
   @classmethod
@@ -3,17 +3,25 @@
 import os.path as path
 from ..system.check import check
 from bes.common.string_util import string_util
+from bes.fs.file_lock import file_lock
 from bes.fs.file_util import file_util
 from bes.fs.temp_file import temp_file
 
-from .git import git
 from .git_address_util import git_address_util
+from .git_mirror_cache import git_mirror_cache
 
 class git_archive_cache(object):
-  'A git download by revision cache.'
+  '''
+  A git download by revision cache.  Tarballs are made with git archive from
+  a local mirror of each address so many revisions of the same repo share
+  one clone and only need a fetch when a revision is new.
+  '''
+
+  def __init__(self, root_dir, mirror_cache = None):
+    check.check_git_mirror_cache(mirror_cache, allow_none = True)
 
-  def __init__(self, root_dir):
     self.root_dir = root_dir
+    self.mirror_cache = mirror_cache or git_mirror_cache(path.join(root_dir, '.mirrors'))
     
   def has_tarball(self, address, revision):
     'Return True if the tarball with address and revision is in the cache.'
@@ -24,20 +32,41 @@ class git_archive_cache(object):
 
   def get_tarball(self, address, revision):
     'Return the local filesystem path to the tarball with address and revision.'
+    return self._get_tarball(address, revision, True)
+
+  def _get_tarball(self, address, revision, fetch):
     local_address_path = self.path_for_address(address)
     tarball_filename = '%s.tar.gz' % (revision)
     tarball_path = path.join(local_address_path, tarball_filename)
     if path.exists(tarball_path):
       return tarball_path
-    tmp_dir = temp_file.make_temp_dir()
-    if path.isdir(address):
-      name = path.basename(address)
-    else:
-      name = git_address_util.name(address)
-    tmp_full_path = path.join(tmp_dir, tarball_filename)
-    git.archive(address, revision, name, tmp_full_path)
-    file_util.rename(tmp_full_path, tarball_path)
+    with file_lock(tarball_path + '.lock'):
+      # Someone else might have made it while we waited for the lock
+      if path.exists(tarball_path):
+        return tarball_path
+      tmp_dir = temp_file.make_temp_dir()
+      tmp_full_path = path.join(tmp_dir, tarball_filename)
+      self.mirror_cache.archive(address, revision, self._base_name(address), tmp_full_path, fetch = fetch)
+      file_util.rename(tmp_full_path, tarball_path)
     return tarball_path
+
+  def get_tarballs(self, address, revisions):
+    '''
+    Return a list of local filesystem paths to the tarballs with address and
+    revisions.  The mirror is brought up to date at most once for all of them.
+    '''
+    check.check_string_seq(revisions)
+
+    missing = [ revision for revision in revisions if not self.has_tarball(address, revision) ]
+    if missing:
+      self.mirror_cache.update(address, revisions = missing)
+    return [ self._get_tarball(address, revision, False) for revision in revisions ]
+
+  @classmethod
+  def _base_name(clazz, address):
+    if path.isdir(address):
+      return path.basename(address)
+    return git_address_util.name(address)
     
   def path_for_address(self, address):
     'Return path for local tarball.'
@@ -8,22 +8,58 @@ from bes.fs.temp_file import temp_file
 
 from .git import git
 from .git_address_util import git_address_util
+from .git_exe import git_exe
+from .git_mirror_cache import git_mirror_cache
 from .git_repo import git_repo
 from .git_clone_options import git_clone_options
 
 class git_clone_manager(object):
-  'Manage a collection of repos under one root dir with conveniences.'
+  '''
+  Manage a collection of repos under one root dir with conveniences.
+
+  Repos are cloned from and pulled from a local mirror of each address that
+  is fetched once per update.  Pushes still go to the address.
+  '''
+
+  def __init__(self, root_dir, mirror_cache = None):
+    check.check_git_mirror_cache(mirror_cache, allow_none = True)
 
-  def __init__(self, root_dir):
     self.root_dir = path.expanduser(root_dir)
-    
+    self.mirror_cache = mirror_cache or git_mirror_cache(path.join(self.root_dir, '.mirrors'))
+
   def update(self, address, options = None):
     'Update the repo.'
+    check.check_git_clone_options(options, allow_none = True)
+
+    options = options or git_clone_options()
     repo_path = self.path_for_address(address)
     repo = git_repo(repo_path, address = address)
-    repo.clone_or_pull(options = options)
+    if not self._can_use_mirror(options):
+      repo.clone_or_pull(options = options)
+      return repo
+    if options.no_network and self.mirror_cache.has_mirror(address):
+      mirror_dir = self.mirror_cache.mirror_path(address)
+    else:
+      mirror_dir = self.mirror_cache.update(address, num_tries = options.num_tries)
+    if git.is_repo(repo_path):
+      self._use_mirror(repo_path, mirror_dir, address)
+      git.pull(repo_path, options = options)
+    else:
+      git.clone(mirror_dir, repo_path, options = options)
+      self._use_mirror(repo_path, mirror_dir, address)
     return repo
-    
+
+  @classmethod
+  def _can_use_mirror(clazz, options):
+    # Shallow clones need a real transport and lfs objects are not mirrored
+    return not options.depth and not options.lfs
+
+  @classmethod
+  def _use_mirror(clazz, repo_path, mirror_dir, address):
+    'Fetch from the mirror and push to address.'
+    git.remote_set_url(repo_path, mirror_dir)
+    git_exe.call_git(repo_path, [ 'remote', 'set-url', '--push', 'origin', git_address_util.resolve(address) ])
+
   def path_for_address(self, address):
     'Return path for local tarball.'
     return path.join(self.root_dir, git_address_util.sanitize_for_local_path(address))
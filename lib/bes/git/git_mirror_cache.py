@@ -0,0 +1,226 @@
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os
+import os.path as path
+import time
+
+from ..system.check import check
+from bes.fs.file_lock import file_lock
+from bes.fs.file_util import file_util
+from bes.fs.temp_file import temp_file
+from bes.system.log import logger
+
+from .git_address_util import git_address_util
+from .git_exe import git_exe
+
+class git_mirror_cache(object):
+  '''
+  A cache of bare mirrors of git repos, one per address, under one root dir.
+  Mirrors are fetched incrementally and only when a wanted revision is
+  missing or is a branch.  Archives and worktrees are then made locally from
+  the mirror.  Each mirror is guarded by a file lock so processes and
+  threads can share the cache.  When max_size is given the least recently
+  used mirrors are evicted to keep the cache under max_size bytes.
+  '''
+
+  _log = logger('git_mirror_cache')
+
+  def __init__(self, root_dir, max_size = None):
+    check.check_string(root_dir)
+    check.check_int(max_size, allow_none = True)
+
+    self.root_dir = path.abspath(path.expanduser(root_dir))
+    self.max_size = max_size
+    # Number of clones and fetches that went to the network
+    self.num_fetches = 0
+
+  def mirror_path(self, address):
+    'Return the path of the bare mirror for address.'
+    address = git_address_util.resolve(address)
+    return path.join(self.root_dir, git_address_util.sanitize_for_local_path(address) + '.git')
+
+  def has_mirror(self, address):
+    'Return True if a mirror for address is in the cache.'
+    return self._is_mirror(self.mirror_path(address))
+
+  def update(self, address, revisions = None, num_tries = None):
+    '''
+    Make sure the mirror for address exists and return its path.  With
+    revisions the network is only used when one of them is missing or is a
+    branch.  Without revisions the mirror is always fetched.
+    '''
+    check.check_string(address)
+    check.check_string_seq(revisions, allow_none = True)
+
+    with self._lock(address):
+      mirror_dir = self._update_locked(address, revisions, num_tries)
+    self._evict_if_needed(keep = mirror_dir)
+    return mirror_dir
+
+  def archive(self, address, revision, base_name, output_filename, fetch = True):
+    '''
+    Write a tgz of revision to output_filename with git archive from the mirror.
+    If fetch is False the mirror is used as is when it exists.
+    '''
+    check.check_string(address)
+    check.check_string(revision)
+    check.check_string(base_name)
+    check.check_string(output_filename)
+    check.check_bool(fetch)
+
+    output_filename = path.abspath(output_filename)
+    file_util.mkdir(path.dirname(output_filename))
+    with self._lock(address):
+      mirror_dir = self._update_locked(address, [ revision ], None, fetch = fetch)
+      args = [
+        'archive',
+        '--format=tgz',
+        '--prefix={}-{}/'.format(base_name, revision),
+        '-o',
+        output_filename,
+        revision,
+      ]
+      git_exe.call_git(mirror_dir, args)
+    self._evict_if_needed(keep = mirror_dir)
+
+  def add_worktree(self, address, revision, dest_dir):
+    '''
+    Check out revision into dest_dir as a detached worktree of the mirror.
+    The worktree shares the objects of the mirror so it goes away when the
+    mirror is evicted.
+    '''
+    check.check_string(address)
+    check.check_string(revision)
+    check.check_string(dest_dir)
+
+    dest_dir = path.abspath(dest_dir)
+    with self._lock(address):
+      mirror_dir = self._update_locked(address, [ revision ], None)
+      git_exe.call_git(mirror_dir, [ 'worktree', 'prune' ])
+      git_exe.call_git(mirror_dir, [ 'worktree', 'add', '--detach', dest_dir, revision ])
+    return dest_dir
+
+  def evict(self, max_size):
+    '''
+    Remove the least recently used mirrors until the cache is no bigger than
+    max_size bytes.  Mirrors locked by someone else are left alone.  Return
+    the list of evicted mirror paths.
+    '''
+    check.check_int(max_size)
+    return self._evict(max_size, None)
+
+  def size(self):
+    'Return the total size in bytes of the mirrors in the cache.'
+    return sum([ self._dir_size(mirror_dir) for mirror_dir in self._mirrors() ])
+
+  def _update_locked(self, address, revisions, num_tries, fetch = True):
+    mirror_dir = self.mirror_path(address)
+    if not self._is_mirror(mirror_dir):
+      self._clone(address, mirror_dir, num_tries)
+    elif fetch and not ( revisions and self._has_revisions(mirror_dir, revisions) ):
+      self._fetch(mirror_dir, num_tries)
+    # The mtime of the stamp file is the last time the mirror was used
+    file_util.save(self._stamp_path(mirror_dir), content = '{}\n'.format(time.time()))
+    return mirror_dir
+
+  def _clone(self, address, mirror_dir, num_tries):
+    address = git_address_util.resolve(address)
+    self._log.log_d('_clone: {} to {}', address, mirror_dir)
+    file_util.mkdir(self.root_dir)
+    # Clone next to the final location so a partial clone is never seen
+    tmp_dir = temp_file.make_temp_dir(prefix = path.basename(mirror_dir) + '.', suffix = '.tmp',
+                                      dir = self.root_dir, delete = False)
+    try:
+      git_exe.call_git(self.root_dir, [ 'clone', '--mirror', address, tmp_dir ], num_tries = num_tries)
+      file_util.remove(mirror_dir)
+      os.rename(tmp_dir, mirror_dir)
+    except:
+      file_util.remove(tmp_dir)
+      raise
+    self.num_fetches += 1
+
+  def _fetch(self, mirror_dir, num_tries):
+    self._log.log_d('_fetch: {}', mirror_dir)
+    git_exe.call_git(mirror_dir, [ 'fetch', '--prune', 'origin' ], num_tries = num_tries)
+    self.num_fetches += 1
+
+  @classmethod
+  def _has_revisions(clazz, mirror_dir, revisions):
+    'Return True if all revisions are commits or tags in the mirror.  Branches move so they never count.'
+    for revision in revisions:
+      if clazz._is_branch(mirror_dir, revision):
+        return False
+      rv = git_exe.call_git(mirror_dir, [ 'rev-parse', '--verify', '--quiet', '{}^{{commit}}'.format(revision) ],
+                            raise_error = False)
+      if rv.exit_code != 0:
+        return False
+    return True
+
+  @classmethod
+  def _is_branch(clazz, mirror_dir, revision):
+    ref = revision if revision.startswith('refs/') else 'refs/heads/{}'.format(revision)
+    rv = git_exe.call_git(mirror_dir, [ 'show-ref', '--verify', '--quiet', ref ], raise_error = False)
+    return rv.exit_code == 0 and ref.startswith('refs/heads/')
+
+  @classmethod
+  def _is_mirror(clazz, mirror_dir):
+    return path.isfile(path.join(mirror_dir, 'HEAD')) and path.isdir(path.join(mirror_dir, 'objects'))
+
+  def _lock(self, address):
+    return file_lock(self.mirror_path(address) + '.lock')
+
+  @classmethod
+  def _stamp_path(clazz, mirror_dir):
+    return mirror_dir + '.used'
+
+  def _mirrors(self):
+    if not path.isdir(self.root_dir):
+      return []
+    result = []
+    for name in sorted(os.listdir(self.root_dir)):
+      mirror_dir = path.join(self.root_dir, name)
+      if name.endswith('.git') and self._is_mirror(mirror_dir):
+        result.append(mirror_dir)
+    return result
+
+  def _evict_if_needed(self, keep):
+    if self.max_size is not None:
+      self._evict(self.max_size, keep)
+
+  def _evict(self, max_size, keep):
+    def _last_used(mirror_dir):
+      stamp = self._stamp_path(mirror_dir)
+      return path.getmtime(stamp) if path.exists(stamp) else 0
+    mirrors = sorted(self._mirrors(), key = _last_used)
+    sizes = dict([ ( mirror_dir, self._dir_size(mirror_dir) ) for mirror_dir in mirrors ])
+    total = sum(sizes.values())
+    evicted = []
+    for mirror_dir in mirrors:
+      if total <= max_size:
+        break
+      if mirror_dir == keep:
+        continue
+      lock = file_lock(mirror_dir + '.lock')
+      if not lock.acquire(blocking = False):
+        self._log.log_d('_evict: {} is busy', mirror_dir)
+        continue
+      try:
+        file_util.remove([ mirror_dir, self._stamp_path(mirror_dir) ])
+      finally:
+        lock.release()
+      total -= sizes[mirror_dir]
+      evicted.append(mirror_dir)
+      self._log.log_d('_evict: removed {} ({} bytes)', mirror_dir, sizes[mirror_dir])
+    return evicted
+
+  @classmethod
+  def _dir_size(clazz, d):
+    result = 0
+    for root, dirs, files in os.walk(d):
+      for f in files:
+        p = path.join(root, f)
+        if not path.islink(p):
+          result += os.stat(p).st_size
+    return result
+
+check.register_class(git_mirror_cache, include_seq = False)
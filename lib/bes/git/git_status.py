@@ -105,6 +105,43 @@ class git_status_list(type_checked_list):
     lines = text_line_parser.parse_lines(text, strip_comments = False, strip_text = True, remove_empties = True)
     return git_status_list([ git_status.parse_line(line) for line in lines  ])
 
+  # Number of space separated fields before the path for each porcelain v2 entry type
+  _PORCELAIN_V2_NUM_FIELDS = {
+    '1': 8,
+    '2': 9,
+    'u': 10,
+    '?': 1,
+  }
+  
+  @classmethod  
+  def parse_porcelain_v2(clazz, text):
+    '''
+    Parse the output of git status --porcelain=v2 into the same items parse()
+    makes from --porcelain.  Header and ignored lines are skipped.
+    '''
+    check.check_string(text)
+
+    result = git_status_list()
+    for line in text.splitlines():
+      if not line:
+        continue
+      kind = line[0]
+      num_fields = clazz._PORCELAIN_V2_NUM_FIELDS.get(kind, None)
+      if num_fields is None:
+        continue
+      parts = line.split(' ', num_fields)
+      if kind == '?':
+        result.append(git_status(git_status_action.UNTRACKED, parts[1], None))
+        continue
+      # Unchanged sides are "." in v2 and " " in v1
+      action = git_status_action.parse(parts[1].replace('.', ' ').strip())
+      if kind == '2':
+        new_filename, _, old_filename = parts[-1].partition('\t')
+        result.append(git_status(action, old_filename, new_filename))
+      else:
+        result.append(git_status(action, parts[-1], None))
+    return result
+
   def become_absolute(self, root_dir):
     'Change all the item paths to be absolute starting at root_dir'
     check.check_string(root_dir)
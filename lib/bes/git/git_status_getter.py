@@ -1,21 +1,31 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import multiprocessing
+import asyncio
 import os.path as path
-import time
 from collections import namedtuple
 
-from bes.thread.thread_pool import thread_pool
 from bes.system.log import logger
 from ..system.check import check
 
+from .git_branch_status import git_branch_status
+from .git_commit_info import git_commit_info
 from .git_error import git_error
+from .git_exe import git_exe
 from .git_repo import git_repo
+from .git_repo_status import git_repo_status
 from .git_repo_status_options import git_repo_status_options
+from .git_status import git_status_list
 from .git_util import git_util
 
 class git_status_getter(object):
-  'Some higher level git utilities.'
+  '''
+  Get the status of many repos at once.  The git commands for all the repos
+  run as asyncio subprocesses with at most options.num_jobs running at any
+  time and results are yielded as soon as each repo is done.  Each repo needs
+  only 2 git calls that run concurrently: status --porcelain=v2 --branch for
+  the changes, branch, ahead/behind and head commit and show for the last
+  commit info.
+  '''
 
   _log = logger('git')
 
@@ -25,45 +35,113 @@ class git_status_getter(object):
   _get_status_item = namedtuple('_get_status_item', 'repo, status')
   @classmethod
   def get_status(clazz, repos, options = None):
+    '''
+    Yield a _get_status_item for each repo in the order they finish.  status is
+    None if git kept failing for a repo after options.num_tries tries.
+    '''
     check.check_git_repo_seq(repos)
     check.check_git_repo_status_options(options, allow_none = True)
 
     options = options or git_repo_status_options()
-    
-    pool = thread_pool(options.num_jobs)
-    queue = multiprocessing.Queue()
 
     repo_map = {}
     for next_repo in repos:
       if next_repo.root in repo_map:
         raise git_error('Duplicate repo: {}'.format(next_repo.root))
       repo_map[next_repo.root] = next_repo
-    
-    def _task(task_repo_root_, task_options_):
-      clazz._log.log_d('here {}'.format(task_repo_root_))
-      task_repo_ = git_repo(task_repo_root_)
-      status = None
-      for i in range(0, task_options_.num_tries):
-        if i > 0:
-          time.sleep(task_options_.retry_sleep_time)
+
+    loop = asyncio.new_event_loop()
+    results = clazz._async_get_status(repos, options)
+    try:
+      while True:
         try:
-          status = task_repo_.repo_status(options = task_options_)
-        except git_error as ex:
-          pass
-      queue.put( ( task_repo_root_, status ) )
-    
-    for next_repo in repos:
-      pool.add_task(_task, next_repo.root, options)
+          next_repo, next_status = loop.run_until_complete(results.__anext__())
+        except StopAsyncIteration:
+          break
+        yield clazz._get_status_item(next_repo, next_status)
+    finally:
+      loop.run_until_complete(results.aclose())
+      loop.close()
+
+  @classmethod
+  async def _async_get_status(clazz, repos, options):
+    semaphore = asyncio.Semaphore(max(1, options.num_jobs))
+    git_exe_path = git_exe.find_git_exe()
+    if not git_exe_path:
+      raise git_error('git exe not found')
+    tasks = [ asyncio.ensure_future(clazz._async_repo_status(git_exe_path, repo, options, semaphore)) for repo in repos ]
+    try:
+      for next_task in asyncio.as_completed(tasks):
+        yield await next_task
+    finally:
+      # Only left over when the caller stopped early
+      for task in tasks:
+        task.cancel()
+      await asyncio.gather(*tasks, return_exceptions = True)
+
+  @classmethod
+  async def _async_repo_status(clazz, git_exe_path, repo, options, semaphore):
+    for i in range(0, options.num_tries):
+      if i > 0:
+        await asyncio.sleep(options.retry_sleep_time)
+      try:
+        return repo, await clazz._async_repo_status_one_try(git_exe_path, repo, options, semaphore)
+      except git_error as ex:
+        clazz._log.log_d('_async_repo_status: try {} of {} failed for {}: {}', i + 1, options.num_tries, repo.root, str(ex))
+    return repo, None
+
+  @classmethod
+  async def _async_repo_status_one_try(clazz, git_exe_path, repo, options, semaphore):
+    untracked = '--untracked-files=normal' if options.show_untracked else '--untracked-files=no'
+    status_args = [ 'status', '--porcelain=v2', '--branch', untracked ]
+    show_args = [ 'show', '--quiet', 'HEAD' ]
+    status_output, show_output = await asyncio.gather(clazz._async_call_git(git_exe_path, repo.root, status_args, semaphore),
+                                                      clazz._async_call_git(git_exe_path, repo.root, show_args, semaphore))
+    headers = clazz._parse_branch_headers(status_output)
+    if headers.get('branch.oid', '(initial)') == '(initial)':
+      raise git_error('No commits: {}'.format(repo.root))
+    change_status = git_status_list.parse_porcelain_v2(status_output)
+    branch_status = clazz._parse_branch_ab(headers.get('branch.ab', None))
+    active_branch = headers.get('branch.head', '(detached)')
+    last_commit = git_commit_info.parse_log_output(show_output)
+    return git_repo_status(change_status, branch_status, active_branch, last_commit)
+
+  @classmethod
+  async def _async_call_git(clazz, git_exe_path, root, args, semaphore):
+    async with semaphore:
+      clazz._log.log_d('_async_call_git: root={} args={}', root, ' '.join(args))
+      process = await asyncio.create_subprocess_exec(git_exe_path, *args,
+                                                     cwd = root,
+                                                     stdin = asyncio.subprocess.DEVNULL,
+                                                     stdout = asyncio.subprocess.PIPE,
+                                                     stderr = asyncio.subprocess.PIPE)
+      try:
+        stdout, stderr = await process.communicate()
+      except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+      raise git_error('git {} failed in {}: {}'.format(' '.join(args), root, stderr.decode('utf-8', 'replace').strip()))
+    return stdout.decode('utf-8', 'replace')
 
+  @classmethod
+  def _parse_branch_headers(clazz, text):
+    'Return a dict of the "# branch.xxx value" header lines of git status --porcelain=v2 --branch.'
     result = {}
-    for i in range(0, len(repos)):
-      next_repo_root, next_status = queue.get()
-      assert next_repo_root in repo_map
-      next_repo = repo_map[next_repo_root]
-      item = clazz._get_status_item(next_repo, next_status)
-      yield item
-
-    pool.wait_completion()
+    for line in text.splitlines():
+      if line.startswith('# '):
+        key, _, value = line[2:].partition(' ')
+        result[key] = value
+    return result
+
+  @classmethod
+  def _parse_branch_ab(clazz, value):
+    'Parse "+ahead -behind" or None when there is no upstream.'
+    if not value:
+      return git_branch_status(0, 0)
+    ahead, behind = value.split()
+    return git_branch_status(int(ahead), abs(int(behind)))
 
   @classmethod
   def _find_git_dirs(clazz, dirs):
@@ -72,6 +72,11 @@ class sqlite(object):
       print('Failed executemany SQL: %s' % (sql))
       raise
       
+  def close(self):
+    'Close the connection.'
+    self._cursor.close()
+    self._connection.close()
+
   def begin(self):
     self.log_i('%s: begin()' % (self._filename_log_label))
     self._cursor.execute('begin transaction')
@@ -181,6 +186,18 @@ class sqlite(object):
     self._cursor.execute(f'PRAGMA user_version = {user_version}')
     self.commit()
 
+  @property
+  def journal_mode(self):
+    self._cursor.execute('PRAGMA journal_mode')
+    return self._cursor.fetchone()[0]
+
+  @journal_mode.setter
+  def journal_mode(self, journal_mode):
+    check.check_string(journal_mode)
+
+    self._cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+    self._cursor.fetchone()
+
   def dump(self, filename):
     check.check_string(filename)
     
@@ -1,6 +1,8 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
 import inspect
+import itertools
+import os
 import os.path as path
 import types
 from datetime import datetime
@@ -17,6 +19,32 @@ class check(object):
   INTEGER_OR_STRING_TYPES = INTEGER_TYPES + STRING_TYPES
   NUMBER_TYPES = compat.INTEGER_TYPES + ( float, )
 
+  # How the entries of sequences are checked
+  SEQ_FULL = 'full'      # check every entry
+  SEQ_SAMPLE = 'sample'  # check a handful of entries spread across the sequence
+  SEQ_NONE = 'none'      # only check that the sequence is iterable
+  SEQ_MODES = ( SEQ_FULL, SEQ_SAMPLE, SEQ_NONE )
+
+  _seq_mode = SEQ_FULL
+
+  # Number of entries checked in SEQ_SAMPLE mode
+  _SAMPLE_SIZE = 8
+
+  @classmethod
+  def set_seq_mode(clazz, mode):
+    '''
+    Set the process wide mode for checking sequence entries.  Can also be set
+    with the BES_CHECK_SEQ environment variable.
+    '''
+    if mode not in clazz.SEQ_MODES:
+      raise ValueError(f'Invalid seq mode "{mode}".  Should be one of: {" ".join(clazz.SEQ_MODES)}')
+    clazz._seq_mode = mode
+
+  @classmethod
+  def get_seq_mode(clazz):
+    'Return the process wide mode for checking sequence entries.'
+    return clazz._seq_mode
+
   @classmethod
   def is_string(clazz, o):
     return isinstance(o, clazz.STRING_TYPES)
@@ -103,7 +131,7 @@ class check(object):
 
   @classmethod
   def check_string_seq(clazz, o, allow_none = False, allow_item_none = False):
-    if o != None and clazz.is_string(o):
+    if o is not None and clazz.is_string(o):
       _, filename, line_number, _, _, _ = inspect.stack()[1]
       name = clazz._previous_frame_object_name(o, 1)
       typeo = type(o).__name__
@@ -149,7 +177,7 @@ class check(object):
       return o
     o = clazz._check(o, tuple, 2, allow_none = allow_none)
     if value_type:
-      for value in o:
+      for value in clazz._seq_entries(o):
         clazz._check(value, value_type, 2)
     return o
 
@@ -159,7 +187,7 @@ class check(object):
       return o
     o = clazz._check(o, dict, 2, allow_none = allow_none)
     if key_type or value_type:
-      for key, value in o.items():
+      for key, value in clazz._seq_entries(o.items()):
         if key_type:
           clazz._check(key, key_type, 2)
         if value_type:
@@ -236,13 +264,32 @@ class check(object):
     if allow_none and o is None:
       return o
     try:
-      it = enumerate(o)
+      iter(o)
     except:
       raise TypeError('t should be iterable instead of \"%s\"' % (str(t)))
-    for index, entry in it:
+    for entry in clazz._seq_entries(o):
       clazz._check(entry, t, depth + 1, type_blurb = type_blurb, allow_none = allow_item_none)
     return o
 
+  @classmethod
+  def _seq_entries(clazz, o):
+    'Return the entries of o that need checking according to the seq mode.'
+    mode = clazz._seq_mode
+    if mode == clazz.SEQ_FULL:
+      return o
+    if mode == clazz.SEQ_NONE:
+      return ()
+    if isinstance(o, ( list, tuple )):
+      n = len(o)
+      if n <= clazz._SAMPLE_SIZE:
+        return o
+      step = n // clazz._SAMPLE_SIZE
+      return itertools.chain(o[0 : n - 1 : step], ( o[-1], ))
+    if hasattr(o, '__len__'):
+      return itertools.islice(o, clazz._SAMPLE_SIZE)
+    # cannot sample an iterator without consuming it so check it all
+    return o
+
   @classmethod
   def _make_type_blurb(clazz, t):
     if isinstance(t, type):
@@ -264,15 +311,13 @@ class check(object):
       self.cast_func = cast_func
       setattr(clazz, method_name, self)
 
-    def __call__(self, *args, **kwargs):
-      assert len(args) == 1
-      obj = args[0]
-      allow_none = kwargs.get('allow_none', False)
+    def __call__(self, obj, allow_none = False, type_blurb = None, **kwargs):
+      if isinstance(obj, self.object_type):
+        return obj
       if allow_none and obj is None:
         return None
-      if not isinstance(obj, self.object_type) and self.cast_func:
+      if self.cast_func:
         obj = self.cast_func(obj)
-      type_blurb = kwargs.get('type_blurb', None)
       return check._check(obj, self.object_type, 2, type_blurb = type_blurb, allow_none = allow_none)
     
   class _is_type_helper(object):
@@ -292,11 +337,7 @@ class check(object):
       self.object_type = object_type
       setattr(clazz, method_name, self)
 
-    def __call__(self, *args, **kwargs):
-      assert len(args) == 1
-      obj = args[0]
-      allow_none = kwargs.get('allow_none', False)
-      allow_item_none = kwargs.get('allow_item_none', False)
+    def __call__(self, obj, allow_none = False, allow_item_none = False, **kwargs):
       return check._check_seq(obj, self.object_type, 2, type_blurb = None, allow_none = allow_none, allow_item_none = allow_item_none)
     
   class _is_seq_helper(object):
@@ -382,3 +423,8 @@ class check(object):
     for i in range(0, depth + 1):
       frame = frame.f_back
     return frame
+
+_seq_mode = os.environ.get('BES_CHECK_SEQ', None)
+if _seq_mode:
+  check.set_seq_mode(_seq_mode)
+del _seq_mode
@@ -60,22 +60,41 @@ class log(object):
   _filters = []
 
   @classmethod
-  def log(clazz, tag, level, message, multi_line = False):
-    'log'
+  def is_enabled(clazz, tag, level):
+    '''
+    Return True if messages for tag at level would be logged.
+    This does not lock so it is cheap enough to use in hot loops.
+    '''
+    tag_level = clazz._tag_levels.get(tag, None)
+    if tag_level is None:
+      # first time this tag is seen, resolve and cache its level
+      tag_level = clazz.get_tag_level(tag)
+    return level <= tag_level
+
+  @classmethod
+  def log(clazz, tag, level, message, *args, multi_line = False):
+    '''
+    Log message for tag at level.  Formatting is deferred until the level is
+    known to be enabled.  If message is callable it is called to get the text
+    and if args are given the text is formatted with str.format(*args).
+    '''
+    if not clazz.is_enabled(tag, level):
+      return
     clazz._log_lock.acquire()
     try:
-      clazz._do_log_i(tag, level, message, multi_line)
+      clazz._do_log_i(tag, level, message, args, multi_line)
     except Exception as ex:
       clazz._log_writer.write('Unexpected logging error: %s\n' % (str(ex)))
       clazz._log_writer.flush()
     clazz._log_lock.release()
 
   @classmethod
-  def _do_log_i(clazz, tag, level, message, multi_line):
+  def _do_log_i(clazz, tag, level, message, args, multi_line):
     'Do the logging work.'
     tag_level = clazz._get_tag_level(tag)
     if level > tag_level:
       return
+    message = clazz._format_message(message, args)
     timestamp = datetime.now()
     if multi_line:
       lines = message.split(os.linesep)
@@ -86,31 +105,40 @@ class log(object):
       m = clazz._filter_string_i(m, clazz._filters)
       clazz._log_writer.write(m + os.linesep)
     clazz._log_writer.flush()
+
+  @classmethod
+  def _format_message(clazz, message, args):
+    'Return the final text for a lazy message.'
+    if callable(message):
+      message = message()
+    if args:
+      message = message.format(*args)
+    return message
       
   @classmethod
-  def log_c(clazz, tag, message, multi_line = False):
+  def log_c(clazz, tag, message, *args, multi_line = False):
     'Log and CRITICAL message.'
-    clazz.log(tag, clazz.CRITICAL, message, multi_line = multi_line)
+    clazz.log(tag, clazz.CRITICAL, message, *args, multi_line = multi_line)
 
   @classmethod
-  def log_e(clazz, tag, message, multi_line = False):
+  def log_e(clazz, tag, message, *args, multi_line = False):
     'Log and ERROR message.'
-    clazz.log(tag, clazz.ERROR, message, multi_line = multi_line)
+    clazz.log(tag, clazz.ERROR, message, *args, multi_line = multi_line)
 
   @classmethod
-  def log_w(clazz, tag, message, multi_line = False):
+  def log_w(clazz, tag, message, *args, multi_line = False):
     'Log and WARNING message.'
-    clazz.log(tag, clazz.WARNING, message, multi_line = multi_line)
+    clazz.log(tag, clazz.WARNING, message, *args, multi_line = multi_line)
 
   @classmethod
-  def log_i(clazz, tag, message, multi_line = False):
+  def log_i(clazz, tag, message, *args, multi_line = False):
     'Log and INFO message.'
-    clazz.log(tag, clazz.INFO, message, multi_line = multi_line)
+    clazz.log(tag, clazz.INFO, message, *args, multi_line = multi_line)
 
   @classmethod
-  def log_d(clazz, tag, message, multi_line = False):
+  def log_d(clazz, tag, message, *args, multi_line = False):
     'Log and DEBUG message.'
-    clazz.log(tag, clazz.DEBUG, message, multi_line = multi_line)
+    clazz.log(tag, clazz.DEBUG, message, *args, multi_line = multi_line)
 
   @classmethod
   def _make_message_i(clazz, tag, level, message, timestamp):
@@ -177,10 +205,19 @@ class log(object):
     'Return the level for a tag.'
     level = clazz._tag_levels.get(tag, None)
     if not level:
-      clazz._tag_levels[tag] = clazz._level
-      return clazz._level
+      level = clazz._pattern_level(tag) or clazz._level
+      clazz._tag_levels[tag] = level
     return level
 
+  @classmethod
+  def _pattern_level(clazz, tag):
+    'Return the level of the last configured pattern matching tag or None.'
+    result = None
+    for pattern, level in clazz._log_config_patterns.items():
+      if fnmatch.fnmatch(tag, pattern):
+        result = level
+    return result
+
   @classmethod
   def set_tag_level(clazz, tag, level):
     'Set the level for the given tag.'
@@ -326,28 +363,28 @@ class log(object):
     clazz._log_lock.release()
 
   @staticmethod
-  def _transplant_log(obj, level, message, multi_line = False):
-    log.log(obj.bes_log_tag__, level, message, multi_line = multi_line)
+  def _transplant_log(obj, level, message, *args, multi_line = False):
+    log.log(obj.bes_log_tag__, level, message, *args, multi_line = multi_line)
 
   @staticmethod
-  def _transplant_log_c(obj, message, multi_line = False):
-    log.log_c(obj.bes_log_tag__, message, multi_line = multi_line)
+  def _transplant_log_c(obj, message, *args, multi_line = False):
+    log.log_c(obj.bes_log_tag__, message, *args, multi_line = multi_line)
 
   @staticmethod
-  def _transplant_log_e(obj, message, multi_line = False):
-    log.log_e(obj.bes_log_tag__, message, multi_line = multi_line)
+  def _transplant_log_e(obj, message, *args, multi_line = False):
+    log.log_e(obj.bes_log_tag__, message, *args, multi_line = multi_line)
 
   @staticmethod
-  def _transplant_log_w(obj, message, multi_line = False):
-    log.log_w(obj.bes_log_tag__, message, multi_line = multi_line)
+  def _transplant_log_w(obj, message, *args, multi_line = False):
+    log.log_w(obj.bes_log_tag__, message, *args, multi_line = multi_line)
 
   @staticmethod
-  def _transplant_log_i(obj, message, multi_line = False):
-    log.log_i(obj.bes_log_tag__, message, multi_line = multi_line)
+  def _transplant_log_i(obj, message, *args, multi_line = False):
+    log.log_i(obj.bes_log_tag__, message, *args, multi_line = multi_line)
 
   @staticmethod
-  def _transplant_log_d(obj, message, multi_line = False):
-    log.log_d(obj.bes_log_tag__, message, multi_line = multi_line)
+  def _transplant_log_d(obj, message, *args, multi_line = False):
+    log.log_d(obj.bes_log_tag__, message, *args, multi_line = multi_line)
 
   @staticmethod
   def _transplant_log_traceback(obj):
@@ -462,23 +499,32 @@ class logger(object):
   def tag(self):
     return self._tag
     
-  def log(self, level, message, multi_line = False):
-    log.log(self._tag, level, message, multi_line = multi_line)
+  def is_enabled(self, level):
+    'Return True if messages at level would be logged.'
+    return log.is_enabled(self._tag, level)
 
-  def log_c(self, message, multi_line = False):
-    log.log_c(self._tag, message, multi_line = multi_line)
+  @property
+  def is_debug(self):
+    'True if debug messages would be logged.'
+    return log.is_enabled(self._tag, log.DEBUG)
+
+  def log(self, level, message, *args, multi_line = False):
+    log.log(self._tag, level, message, *args, multi_line = multi_line)
 
-  def log_e(self, message, multi_line = False):
-    log.log_e(self._tag, message, multi_line = multi_line)
+  def log_c(self, message, *args, multi_line = False):
+    log.log_c(self._tag, message, *args, multi_line = multi_line)
 
-  def log_w(self, message, multi_line = False):
-    log.log_w(self._tag, message, multi_line = multi_line)
+  def log_e(self, message, *args, multi_line = False):
+    log.log_e(self._tag, message, *args, multi_line = multi_line)
 
-  def log_i(self, message, multi_line = False):
-    log.log_i(self._tag, message, multi_line = multi_line)
+  def log_w(self, message, *args, multi_line = False):
+    log.log_w(self._tag, message, *args, multi_line = multi_line)
 
-  def log_d(self, message, multi_line = False):
-    log.log_d(self._tag, message, multi_line = multi_line)
+  def log_i(self, message, *args, multi_line = False):
+    log.log_i(self._tag, message, *args, multi_line = multi_line)
+
+  def log_d(self, message, *args, multi_line = False):
+    log.log_d(self._tag, message, *args, multi_line = multi_line)
 
   def log_traceback(self):
     'Log a traceback as an error.'
@@ -503,9 +549,12 @@ class logger(object):
   def log_method(self, level, depth = 1):
     '''
     Log a instance or clazz method including name and all arguments
-    Please note this method is *slow*.  Around 50ms on a fast modern
-    macbook pro.  So don't use it in performance sensitive code.
+    Please note this method is *slow* when level is enabled.  Around 50ms on
+    a fast modern macbook pro.  When level is disabled it returns right away
+    without inspecting any frames.
     '''
+    if not log.is_enabled(self._tag, level):
+      return
     current_frame = inspect.currentframe()
     caller_frame = current_frame
     for _ in range(0, depth):
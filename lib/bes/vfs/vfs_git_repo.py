@@ -1,7 +1,10 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import os
 from os import path
 from collections import namedtuple
+import contextlib
+import time
 
 from ..system.check import check
 from bes.common.node import node
@@ -25,21 +28,35 @@ from .vfs_file_info_options import vfs_file_info_options
 from .vfs_local import vfs_local
 
 class vfs_git_repo(vfs_base):
-  'Masquerade a git repo as a filesystem.  All operations are committed automatically.'
+  '''
+  Masquerade a git repo as a filesystem.  All operations are committed automatically.
+
+  Reads reuse the local clone for pull_ttl seconds after the last pull.
+  Writes always pull first unless they happen inside a batch() in which
+  case they are committed and pushed together when the batch ends.
+  '''
 
   log = logger('vfs_git_repo')
+
+  # By default every operation pulls
+  DEFAULT_PULL_TTL = 0.0
   
-  def __init__(self, config_source, address, config_dir, use_lfs):
+  def __init__(self, config_source, address, config_dir, use_lfs, pull_ttl = None):
     check.check_string(config_source)
     check.check_string(address)
     check.check_string(config_dir)
+    check.check_number(pull_ttl, allow_none = True)
 
     self._config_source = config_source
     self._address = address
     self._config_dir = config_dir
     self._use_lfs = use_lfs
+    self._pull_ttl = self.DEFAULT_PULL_TTL if pull_ttl is None else pull_ttl
     clone_manager_dir = path.join(self._config_dir, 'clone')
     self._clone_manager = git_clone_manager(clone_manager_dir)
+    self._last_proxy = None
+    self._last_pull_time = None
+    self._batch = None
 
   def __str__(self):
     return 'vfs_git_repo(address={})'.format(self._address)
@@ -52,13 +69,26 @@ class vfs_git_repo(vfs_base):
       factory_field('address', False, check.is_string),
       factory_field('config_dir', False, check.is_string),
       factory_field('use_lfs', False, factory_field.is_bool),
+      factory_field('pull_ttl', True, clazz._is_number),
     ]
+
+  @classmethod
+  def _is_number(clazz, x):
+    try:
+      float(x)
+      return True
+    except (TypeError, ValueError) as ex:
+      return False
   
   @classmethod
   #@abstractmethod
   def create(clazz, config_source, **values):
     'Create an fs instance.'
-    return vfs_git_repo(config_source, values['git_address'], values['git_config_dir'], values['git_use_lfs'])
+    pull_ttl = values.get('git_pull_ttl', None)
+    if pull_ttl is not None:
+      pull_ttl = float(pull_ttl)
+    return vfs_git_repo(config_source, values['git_address'], values['git_config_dir'], values['git_use_lfs'],
+                        pull_ttl = pull_ttl)
     
   @classmethod
   #@abstractmethod
@@ -75,19 +105,13 @@ class vfs_git_repo(vfs_base):
 
     options = options or vfs_file_info_options()
     
-    self.log.log_d('list_dir(remote_dir={}, recursive={} options={}'.format(remote_dir, recursive, options))
-    proxy = self._make_proxy()
-    rv = proxy.fs.list_dir(remote_dir, recursive, options)
-    self._post_operation(proxy)
-    return rv
+    self.log.log_d('list_dir(remote_dir={}, recursive={} options={}', remote_dir, recursive, options)
+    return self._read_operation(lambda fs: fs.list_dir(remote_dir, recursive, options))
   
   #@abstractmethod
   def has_file(self, remote_filename):
     'Return True if filename exists in the filesystem and is a FILE.'
-    proxy = self._make_proxy()
-    rv = proxy.fs.has_file(remote_filename)
-    self._post_operation(proxy)
-    return rv
+    return self._read_operation(lambda fs: fs.has_file(remote_filename))
   
   #@abstractmethod
   def file_info(self, remote_filename, options):
@@ -97,69 +121,137 @@ class vfs_git_repo(vfs_base):
 
     options = options or vfs_file_info_options()
 
-    proxy = self._make_proxy()
-    rv = proxy.fs.file_info(remote_filename, options)
-    self._post_operation(proxy)
-    return rv
+    return self._read_operation(lambda fs: fs.file_info(remote_filename, options))
   
   #@abstractmethod
   def remove_file(self, filename):
     'Remove filename.'
-    proxy = self._make_proxy()
+    proxy = self._make_write_proxy()
     proxy.repo.remove(filename)
-    comment = 'remove {}'.format(filename)
-    proxy.repo.commit(comment, filename)
-    proxy.repo.push()
-    self._post_operation(proxy)
+    self._commit(proxy, 'remove {}'.format(filename), filename)
   
   #@abstractmethod
   def upload_file(self, local_filename, remote_filename):
     'Upload local_filename to remote_filename.'
-    proxy = self._make_proxy()
+    proxy = self._make_write_proxy()
     proxy.fs.upload_file(local_filename, remote_filename)
     proxy.repo.add(remote_filename)
     if self._use_lfs:
       if not file_mime.content_is_text(local_filename):
         pattern = '*.{}'.format(file_util.extension(remote_filename))
         proxy.repo.lfs_track(remote_filename)
-    comment = 'add {}'.format(remote_filename)
-    proxy.repo.commit(comment, remote_filename)
-    print('good')
-    #proxy.repo.push()
-    self._post_operation(proxy)
+    self._commit(proxy, 'add {}'.format(remote_filename), remote_filename)
 
   #@abstractmethod
   def download_to_file(self, remote_filename, local_filename):
     'Download filename to local_filename.'
-    proxy = self._make_proxy()
-    rv = proxy.fs.download_to_file(remote_filename, local_filename)
-    self._post_operation(proxy)
-    return rv
+    return self._read_operation(lambda fs: fs.download_to_file(remote_filename, local_filename))
     
   #@abstractmethod
   def download_to_bytes(self, remote_filename):
     'Download filename to bytes.'
-    proxy = self._make_proxy()
-    rv = proxy.fs.download_to_bytes(remote_filename)
-    self._post_operation(proxy)
-    return rv
+    return self._read_operation(lambda fs: fs.download_to_bytes(remote_filename))
     
   #@abstractmethod
   def set_file_attributes(self, remote_filename, attributes):
     'Set file attirbutes.'
-    proxy = self._make_proxy()
+    proxy = self._make_write_proxy()
     proxy.fs.set_file_attributes(remote_filename, attributes)
-    self._post_operation(proxy)
+    if self._batch is None:
+      self._post_operation(proxy)
+
+  @contextlib.contextmanager
+  def batch(self):
+    '''
+    Context manager that gathers uploads and removals and commits and
+    pushes them together in one commit when the batch ends.  The clone is
+    pulled once at the start of the batch.  If the batch raises nothing is
+    committed or pushed and the clone is reset.
+    '''
+    if self._batch is not None:
+      yield self
+      return
+    proxy = self._make_proxy(max_age = 0.0)
+    self._batch = []
+    try:
+      yield self
+    except:
+      self._batch = None
+      proxy.repo.reset_and_clean(immaculate = True)
+      raise
+    else:
+      changes = self._batch
+      self._batch = None
+      if changes:
+        comments = [ comment for comment, _ in changes ]
+        filenames = [ filename for _, filename in changes ]
+        if len(comments) == 1:
+          message = comments[0]
+        else:
+          message = 'update {} files\n\n{}'.format(len(comments), '\n'.join(comments))
+        proxy.repo.commit(message, filenames)
+      self._post_operation(proxy)
     
   class _proxy(namedtuple('_proxy', 'repo, fs')):
 
     def __new__(clazz, repo, fs):
       return clazz.__bases__[0].__new__(clazz, repo, fs)
     
-  def _make_proxy(self):
+  def _make_proxy(self, max_age = None):
+    '''
+    Return a proxy for the local clone.  The clone is only pulled if it was
+    last pulled more than max_age seconds ago.  Inside a batch the clone
+    is never pulled.
+    '''
+    if max_age is None:
+      max_age = self._pull_ttl
+    if self._last_proxy and path.isdir(self._last_proxy.repo.root):
+      if self._batch is not None:
+        return self._last_proxy
+      if max_age > 0.0 and (time.monotonic() - self._last_pull_time) < max_age:
+        self.log.log_d(lambda: '_make_proxy: reusing clone pulled {:.1f}s ago'.format(time.monotonic() - self._last_pull_time))
+        return self._last_proxy
     repo = self._clone_manager.update(self._address)
+    self._last_pull_time = time.monotonic()
     fs = vfs_local('<proxy>', repo.root)
-    return self._proxy(repo, fs)
+    self._last_proxy = self._proxy(repo, fs)
+    return self._last_proxy
+
+  def _make_write_proxy(self):
+    'Writes need an up to date clone so they can be pushed.'
+    return self._make_proxy(max_age = 0.0)
+
+  def _read_operation(self, func):
+    'Call func(fs) and only commit the .bes_vfs droppings if func changed them.'
+    proxy = self._make_proxy()
+    before = self._dot_bes_vfs_state(proxy)
+    rv = func(proxy.fs)
+    if self._batch is None and self._dot_bes_vfs_state(proxy) != before:
+      self._post_operation(proxy)
+    return rv
+
+  @classmethod
+  def _dot_bes_vfs_state(clazz, proxy):
+    'Return the size and mtime of every file in the .bes_vfs dir.'
+    dot_bes_vfs_dir = path.join(proxy.repo.root, '.bes_vfs')
+    if not path.isdir(dot_bes_vfs_dir):
+      return None
+    result = {}
+    for filename in file_find.iter_find(dot_bes_vfs_dir, relative = False):
+      try:
+        st = os.stat(filename)
+        result[filename] = ( st.st_size, st.st_mtime_ns )
+      except FileNotFoundError as ex:
+        pass
+    return result
+
+  def _commit(self, proxy, comment, filename):
+    'Commit filename or add it to the current batch.'
+    if self._batch is not None:
+      self._batch.append(( comment, filename ))
+      return
+    proxy.repo.commit(comment, filename)
+    self._post_operation(proxy)
     
   #@abstractmethod
   def _post_operation(self, proxy):
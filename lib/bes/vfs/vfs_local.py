@@ -1,7 +1,9 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
 import os, subprocess
+from collections import namedtuple
 from os import path
+import threading
 
 from ..system.check import check
 from bes.common.node import node
@@ -117,10 +119,28 @@ class vfs_local(vfs_base):
           self.log.log_d('list_dir: skipping {}'.format(next_file_or_dir))
     if num_added == 0:
       return vfs_file_info_list()
-    fs_tree = self._convert_node_to_fs_tree(result, 0, options)
+    prefetched = self._prefetch([ local_filename for local_filename, is_file in self._node_files(result) if is_file ])
+    fs_tree = self._convert_node_to_fs_tree(result, 0, options, prefetched)
     return fs_tree.children
 
-  def _convert_node_to_fs_tree(self, n, depth, options):
+  @classmethod
+  def _node_files(clazz, n):
+    'Yield ( local_filename, is_file ) for every node in the tree.'
+    stack = [ n ]
+    while stack:
+      next_node = stack.pop()
+      yield getattr(next_node, '_local_filename'), getattr(next_node, '_is_file', False)
+      stack.extend(next_node.children)
+
+  _prefetched_values = namedtuple('_prefetched_values', 'checksums, attributes')
+  def _prefetch(self, local_filenames):
+    'Fetch the checksums and attributes for many files in batches.'
+    # no WAL since the db lives in the tree and gets committed by vfs_git_repo
+    checksums = self._checksum_db().checksum_many('sha256', local_filenames, use_wal = False)
+    attributes = self._metadata_db().get_values_many('attributes', local_filenames)
+    return self._prefetched_values(checksums, attributes)
+
+  def _convert_node_to_fs_tree(self, n, depth, options, prefetched):
     if not hasattr(n, '_is_file'):
       msg = 'node missing attributes:\n----------------------\n{}\n----------------------\n'.format(n)
       raise RuntimeError(msg)
@@ -131,8 +151,8 @@ class vfs_local(vfs_base):
     if is_file:
       children = vfs_file_info_list()
     else:
-      children = vfs_file_info_list([ self._convert_node_to_fs_tree(child, depth + 2, options) for child in n.children ])
-    entry = self._make_entry(remote_filename, local_filename, children, options)
+      children = vfs_file_info_list([ self._convert_node_to_fs_tree(child, depth + 2, options, prefetched) for child in n.children ])
+    entry = self._make_entry(remote_filename, local_filename, children, options, prefetched = prefetched)
     return entry
 
   def _should_include_file(clazz, filename):
@@ -218,8 +238,7 @@ class vfs_local(vfs_base):
       raise vfs_error('filename exists and is a dir: {}'.format(remote_filename))
     if path.exists(local_filename) and not path.isfile(local_filename):
       raise vfs_error('filename exists and is not a file: {}'.format(remote_filename))
-    db = file_metadata(self._metadata_db_filename)    
-    db.replace_values('attributes', local_filename, key_value_list.from_dict(attributes))
+    self._metadata_db().replace_values('attributes', local_filename, key_value_list.from_dict(attributes))
   
   def _make_local_file_path(self, remote_filename):
     'Make a local path for remote_filename.'
@@ -238,12 +257,15 @@ class vfs_local(vfs_base):
     else:
       return vfs_file_info.FILE
 
-  def _make_entry(self, remote_filename, local_filename, children, options):
+  def _make_entry(self, remote_filename, local_filename, children, options, prefetched = None):
     ftype = self._file_type(local_filename)
     if ftype == vfs_file_info.FILE:
-      chk = checksum_set(checksum(checksum.SHA256, self._get_checksum(local_filename)))
-      db = file_metadata(self._metadata_db_filename)    
-      attributes = db.get_values('attributes', local_filename).to_dict()
+      if prefetched and local_filename in prefetched.checksums:
+        chk = checksum_set(checksum(checksum.SHA256, prefetched.checksums[local_filename]))
+        attributes = prefetched.attributes[local_filename].to_dict()
+      else:
+        chk = checksum_set(checksum(checksum.SHA256, self._get_checksum(local_filename)))
+        attributes = self._metadata_db().get_values('attributes', local_filename).to_dict()
       size = file_util.size(local_filename)
     else:
       chk = None
@@ -262,9 +284,46 @@ class vfs_local(vfs_base):
                          children)
     
   def _get_checksum(self, local_filename):
-    db = file_checksum_db(self._checksum_db_filename)
-    checksum = db.checksum('sha256', local_filename)
-    return checksum
+    return self._checksum_db().checksum('sha256', local_filename)
+
+  def _metadata_db(self):
+    return self._pooled_handle(file_metadata, self._metadata_db_filename)
+
+  def _checksum_db(self):
+    return self._pooled_handle(file_checksum_db, self._checksum_db_filename)
+
+  # sqlite connections cannot be shared across threads so the pool is per thread
+  _pool = threading.local()
+  @classmethod
+  def _pooled_handle(clazz, handle_class, root_dir):
+    '''
+    Return a long lived handle_class(root_dir) shared by all vfs_local
+    instances for the same root in the current thread.
+    '''
+    handles = getattr(clazz._pool, 'handles', None)
+    if handles is None:
+      handles = {}
+      clazz._pool.handles = handles
+    key = ( handle_class, root_dir )
+    handle = handles.get(key, None)
+    # the db could have been removed from under us along with the root
+    if handle is None or not path.exists(handle.db_filename):
+      handle = handle_class(root_dir)
+      handles[key] = handle
+    return handle
+
+  @classmethod
+  def clear_pool(clazz):
+    '''
+    Close and forget the pooled handles of the current thread.  Handles of
+    other threads can only be closed by those threads.
+    '''
+    handles = getattr(clazz._pool, 'handles', None)
+    if not handles:
+      return
+    clazz._pool.handles = None
+    for handle in handles.values():
+      handle.close()
 
   #@abstractmethod
   def mkdir(self, remote_dir):
@@ -1,5 +1,6 @@
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import hashlib
 import os, os.path as path
 
 from bes.testing.unit_test import unit_test
@@ -285,7 +286,69 @@ def make_test_case(archive_class, xarchive_type):
       actual_files = file_find.find(tmp_dir, relative = True)
       file_util.remove(tmp_dir)
       return actual_files
-  
+
+    def test_extract_with_include_strip_head_and_threads(self):
+      items = temp_archive.make_temp_item_list([
+        ( self.native_filename('foo/apple.txt'), 'apple.txt\n' ),
+        ( self.native_filename('foo/sub/durian.txt'), 'durian.txt\n' ),
+        ( self.native_filename('foo/kiwi.txt'), 'kiwi.txt\n' ),
+        ( self.native_filename('metadata/db.json'), '{}\n' ),
+      ])
+      tmp_archive = self.make_temp_archive_for_reading(items)
+      for num_threads in [ 1, 4 ]:
+        tmp_dir = self.make_temp_dir()
+        stats = tmp_archive.extract(tmp_dir, strip_head = 'foo', include = [ '*.txt' ], num_threads = num_threads)
+        self.assertEqual( [
+          self.native_filename('apple.txt'),
+          self.native_filename('kiwi.txt'),
+          self.native_filename('sub/durian.txt'),
+        ], file_find.find(tmp_dir, relative = True) )
+        self.assertEqual( 'durian.txt\n', file_util.read(path.join(tmp_dir, 'sub/durian.txt'), codec = 'utf-8') )
+        self.assertEqual( 3, stats.num_files )
+        self.assertEqual( 30, stats.num_bytes )
+
+    def test_extract_all_outside_dest_dir(self):
+      items = temp_archive.make_temp_item_list([
+        ( self.native_filename('foo/apple.txt'), 'apple.txt\n' ),
+        ( self.native_filename('../evil.txt'), 'evil.txt\n' ),
+      ])
+      tmp_archive = self.make_temp_archive_for_reading(items)
+      tmp_dir = self.make_temp_dir()
+      with self.assertRaises(RuntimeError):
+        tmp_archive.extract_all(path.join(tmp_dir, 'dest'))
+      self.assertFalse( path.exists(path.join(tmp_dir, 'evil.txt')) )
+
+    def call_as_non_root(self, func, *filenames):
+      '''
+      Call func as the nobody user when running as root so permission bugs root
+      gets away with still show up.  filenames are handed to nobody first.
+      '''
+      if not ( hasattr(os, 'geteuid') and os.geteuid() == 0 ):
+        func()
+        return
+      import pwd, traceback
+      try:
+        nobody = pwd.getpwnam('nobody')
+      except KeyError as ex:
+        self.raise_skip('no nobody user')
+      for filename in filenames:
+        os.chown(filename, nobody.pw_uid, nobody.pw_gid)
+      pid = os.fork()
+      if pid == 0:
+        exit_code = 0
+        try:
+          os.setgroups([])
+          os.setgid(nobody.pw_gid)
+          os.setuid(nobody.pw_uid)
+          func()
+        except BaseException as ex:
+          traceback.print_exc()
+          exit_code = 1
+        finally:
+          os._exit(exit_code)
+      _, status = os.waitpid(pid, 0)
+      self.assertEqual( 0, os.waitstatus_to_exitcode(status) )
+
     def test_extract_member_to_string(self):
       items = temp_archive.make_temp_item_list([
         ( self.native_filename('foo/apple.txt'), 'apple.txt\n' ),
@@ -308,7 +371,35 @@ def make_test_case(archive_class, xarchive_type):
       tmp_file = self.make_temp_file()
       tmp_archive.extract_member_to_file('foo/apple.txt', tmp_file)
       self.assertEqual( b'apple.txt\n', file_util.read(tmp_file) )
-      
+
+    def test_member_checksums(self):
+      items = temp_archive.make_temp_item_list([
+        ( self.native_filename('foo/apple.txt'), 'apple.txt\n' ),
+        ( self.native_filename('foo/durian.txt'), 'durian.txt\n' ),
+        ( self.native_filename('foo/kiwi.txt'), 'kiwi.txt\n' ),
+      ])
+      tmp_archive = self.make_temp_archive_for_reading(items)
+      self.assertEqual( {
+        'foo/apple.txt': self._sha256(b'apple.txt\n'),
+        'foo/kiwi.txt': self._sha256(b'kiwi.txt\n'),
+      }, tmp_archive.member_checksums([ 'foo/apple.txt', 'foo/kiwi.txt' ]) )
+      self.assertEqual( self._sha256(b'durian.txt\n'), tmp_archive.member_checksum('foo/durian.txt') )
+      with self.assertRaises(IOError) as ctx:
+        tmp_archive.member_checksums([ 'foo/apple.txt', 'nothere.txt' ])
+
+    def test_open_member(self):
+      items = temp_archive.make_temp_item_list([
+        ( self.native_filename('foo/apple.txt'), 'apple.txt\n' ),
+        ( self.native_filename('foo/kiwi.txt'), 'kiwi.txt\n' ),
+      ])
+      tmp_archive = self.make_temp_archive_for_reading(items)
+      with tmp_archive.open_member('foo/kiwi.txt') as fin:
+        self.assertEqual( b'kiwi.txt\n', fin.read() )
+
+    @classmethod
+    def _sha256(clazz, content):
+      return hashlib.sha256(content).hexdigest()
+
     def _test_extract_with_members(self, items, members,
                                    base_dir = None,
                                    strip_common_ancestor = False,
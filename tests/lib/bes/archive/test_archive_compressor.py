@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import bz2
+import gzip
+import lzma
+import os
+import tarfile
+
+from bes.testing.unit_test import unit_test
+from bes.testing.unit_test_function_skip import unit_test_function_skip
+from bes.archive.archive_compressor import archive_compressor
+from bes.archive.archiver import archiver
+from bes.fs.testing.temp_content import temp_content
+from bes.system.which import which
+
+class test_archive_compressor(unit_test):
+
+  _DATA = os.urandom(100000) + b'kiwi' * 100000
+
+  def test_gz(self):
+    self.assertEqual( self._DATA, gzip.decompress(self._compress(archive_compressor.GZ)) )
+
+  def test_bz2(self):
+    self.assertEqual( self._DATA, bz2.decompress(self._compress(archive_compressor.BZ2)) )
+
+  def test_xz(self):
+    self.assertEqual( self._DATA, lzma.decompress(self._compress(archive_compressor.XZ)) )
+
+  def test_empty(self):
+    self.assertEqual( b'', gzip.decompress(self._compress(archive_compressor.GZ, data = b'')) )
+
+  @unit_test_function_skip.skip_if(not which.which('xz'), 'xz not found')
+  def test_xz_external(self):
+    self.assertEqual( self._DATA, lzma.decompress(self._compress(archive_compressor.XZ, use_external = True)) )
+
+  def test_create_tar_gz_with_threads(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+        'file files/foo.txt "this is foo.txt" 644',
+        'file files/bar.txt "this is bar.txt" 644',
+    ], delete = not self.DEBUG)
+    tmp_archive = self.make_temp_file(suffix = '.tar.gz')
+    archiver.create(tmp_archive, tmp_dir, compression_level = 1, num_threads = 4)
+    self.assertEqual( 'tgz', archiver.format_name(tmp_archive) )
+    with tarfile.open(tmp_archive, mode = 'r:gz') as archive:
+      self.assertEqual( b'this is bar.txt', archive.extractfile('files/bar.txt').read() )
+      self.assertEqual( b'this is foo.txt', archive.extractfile('files/foo.txt').read() )
+
+  def _compress(self, compression, data = None, use_external = False):
+    data = self._DATA if data is None else data
+    tmp_file = self.make_temp_file()
+    with open(tmp_file, 'wb') as fout:
+      with archive_compressor.open(fout, compression, level = 1, num_threads = 4,
+                                   block_size = 64 * 1024, use_external = use_external) as compressor:
+        # write in odd sized pieces to cross block boundaries
+        for i in range(0, len(data), 10000):
+          compressor.write(data[i:i + 10000])
+    with open(tmp_file, 'rb') as fin:
+      return fin.read()
+
+if __name__ == '__main__':
+  unit_test.main()
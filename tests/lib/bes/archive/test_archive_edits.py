@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+from bes.testing.unit_test import unit_test
+from bes.archive.archive_edits import archive_edits
+
+class test_archive_edits(unit_test):
+
+  def test_should_skip(self):
+    e = archive_edits()
+    e.remove('foo/sub')
+    e.add_content('bar/new.txt', 'new')
+    self.assertTrue( e.should_skip('foo/sub') )
+    self.assertTrue( e.should_skip('foo/sub/') )
+    self.assertTrue( e.should_skip('foo/sub/kiwi.txt') )
+    self.assertTrue( e.should_skip('./foo/sub/kiwi.txt') )
+    self.assertTrue( e.should_skip('bar/new.txt') )
+    self.assertFalse( e.should_skip('foo/subway.txt') )
+    self.assertFalse( e.should_skip('foo/kiwi.txt') )
+
+  def test_remove_after_add(self):
+    e = archive_edits()
+    e.add_content('foo/a.txt', 'a')
+    e.add_content('foo/b.txt', 'b')
+    e.add_content('bar/c.txt', 'c')
+    e.remove('foo')
+    self.assertEqual( [ 'bar/c.txt' ], [ item.arcname for item in e.added ] )
+    self.assertTrue( e.has_removes )
+
+  def test_add_replaces(self):
+    e = archive_edits()
+    e.add_content('foo/a.txt', 'a')
+    e.add_file('foo/a.txt', '/tmp/a.txt')
+    self.assertEqual( [ ( 'foo/a.txt', None, '/tmp/a.txt', None ) ], e.added )
+    self.assertFalse( e.has_removes )
+    self.assertTrue( e.replaces_any([ 'foo/a.txt', 'foo/b.txt' ]) )
+    self.assertFalse( e.replaces_any([ 'foo/b.txt' ]) )
+
+if __name__ == '__main__':
+  unit_test.main()
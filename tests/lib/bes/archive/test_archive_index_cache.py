@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os
+from os import path
+
+from bes.testing.unit_test import unit_test
+from bes.fs.file_util import file_util
+from bes.archive.archive_extension import archive_extension
+from bes.archive.archive_index_cache import archive_index_cache
+from bes.archive.archive_tar import archive_tar
+from bes.archive.archive_zip import archive_zip
+from bes.archive.temp_archive import temp_archive
+
+class test_archive_index_cache(unit_test):
+
+  def test_get(self):
+    tmp_zip = self._make_archive(archive_extension.ZIP)
+    cache = archive_index_cache([ archive_tar, archive_zip ])
+    index = cache.get(tmp_zip)
+    self.assertEqual( archive_zip, index.archive_class )
+    self.assertEqual( 'zip', index.format_name )
+    self.assertEqual( [ 'foo/apple.txt', 'foo/kiwi.txt' ], index.members )
+    self.assertEqual( [ 10, 9 ], [ info.size for info in index.infos ] )
+    self.assertTrue( index.has_member('foo/kiwi.txt') )
+    self.assertFalse( index.has_member('foo/lemon.txt') )
+    self.assertTrue( cache.get(tmp_zip) is index )
+    self.assertEqual( ( 1, 1 ), ( cache.hits, cache.misses ) )
+
+  def test_get_not_an_archive(self):
+    tmp_file = self.make_temp_file(content = 'not an archive\n')
+    cache = archive_index_cache([ archive_tar, archive_zip ])
+    self.assertEqual( None, cache.get(tmp_file) )
+    self.assertEqual( None, cache.get(tmp_file) )
+    self.assertEqual( ( 1, 1 ), ( cache.hits, cache.misses ) )
+
+  def test_get_changed(self):
+    tmp_tgz = self._make_archive(archive_extension.TGZ)
+    cache = archive_index_cache([ archive_tar, archive_zip ])
+    self.assertEqual( [ 'foo/apple.txt', 'foo/kiwi.txt' ], cache.get(tmp_tgz).members )
+    other = temp_archive.make_temp_archive(temp_archive.make_temp_item_list([
+      ( 'foo/lemon.txt', 'lemon.txt\n' ),
+    ]), archive_extension.TGZ)
+    file_util.copy(other, tmp_tgz)
+    st = os.stat(tmp_tgz)
+    os.utime(tmp_tgz, ns = ( st.st_atime_ns, st.st_mtime_ns + 1000000000 ))
+    self.assertEqual( [ 'foo/lemon.txt' ], cache.get(tmp_tgz).members )
+
+  def test_sidecar(self):
+    tmp_tar = self._make_archive(archive_extension.TAR)
+    cache = archive_index_cache([ archive_tar, archive_zip ], sidecar = True)
+    cache.get(tmp_tar)
+    sidecar_filename = archive_index_cache.sidecar_filename(path.abspath(tmp_tar))
+    self.assertTrue( path.isfile(sidecar_filename) )
+
+    other_cache = archive_index_cache([ archive_tar, archive_zip ], sidecar = True)
+    index = other_cache.get(tmp_tar)
+    self.assertTrue( index.loaded )
+    self.assertEqual( archive_tar, index.archive_class )
+    self.assertEqual( [ 'foo/apple.txt', 'foo/kiwi.txt' ], index.members )
+    self.assertEqual( [ info.offset for info in archive_tar(tmp_tar).member_infos() ],
+                      [ info.offset for info in index.infos ] )
+
+  def test_max_entries(self):
+    cache = archive_index_cache([ archive_tar, archive_zip ], max_entries = 2)
+    archives = [ self._make_archive(archive_extension.ZIP) for i in range(0, 3) ]
+    for archive in archives:
+      cache.get(archive)
+    cache.get(archives[0])
+    self.assertEqual( ( 0, 4 ), ( cache.hits, cache.misses ) )
+
+  def _make_archive(self, extension):
+    return temp_archive.make_temp_archive(temp_archive.make_temp_item_list([
+      ( 'foo/apple.txt', 'apple.txt\n' ),
+      ( 'foo/kiwi.txt', 'kiwi.txt\n' ),
+    ]), extension, delete = not self.DEBUG)
+
+if __name__ == '__main__':
+  unit_test.main()
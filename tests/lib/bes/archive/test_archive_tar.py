@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import io, os, os.path as path, tarfile
+
 from bes.testing.unit_test import unit_test
+from bes.fs.file_util import file_util
 from bes.archive.archive_extension import archive_extension
 from bes.archive.temp_archive import temp_archive
 from bes.archive.archive_tar import archive_tar
@@ -32,5 +35,32 @@ class test_archive_tar(make_test_case(archive_tar, archive_extension.TAR)):
   
       self.assertFalse( archive_tar.file_is_valid(self.make_temp_file(content = 'junk\n')) )
 
+    def test_extract_read_only_dir(self):
+      for extension, num_threads in [ ( 'tgz', 4 ), ( 'tar', 1 ), ( 'tar', 4 ) ]:
+        tmp_tar = self._make_temp_tar_with_read_only_dir(extension)
+        tmp_dir = self.make_temp_dir()
+        self.call_as_non_root(lambda: archive_tar(tmp_tar).extract_all(tmp_dir, num_threads = num_threads),
+                              tmp_tar, tmp_dir)
+        ro_dir = path.join(tmp_dir, 'ro')
+        self.assertEqual( 0o40555, os.stat(ro_dir).st_mode )
+        self.assertEqual( 1000000000, os.stat(ro_dir).st_mtime )
+        self.assertEqual( 'a.txt\n', file_util.read(path.join(ro_dir, 'a.txt'), codec = 'utf-8') )
+        os.chmod(ro_dir, 0o755)
+
+    def _make_temp_tar_with_read_only_dir(self, extension):
+      tmp_tar = self.make_temp_file(suffix = '.' + extension)
+      with tarfile.open(tmp_tar, mode = 'w:gz' if extension == 'tgz' else 'w') as archive:
+        dir_info = tarfile.TarInfo('ro')
+        dir_info.type = tarfile.DIRTYPE
+        dir_info.mode = 0o555
+        dir_info.mtime = 1000000000
+        archive.addfile(dir_info)
+        content = 'a.txt\n'.encode('utf-8')
+        file_info = tarfile.TarInfo('ro/a.txt')
+        file_info.size = len(content)
+        file_info.mode = 0o644
+        archive.addfile(file_info, io.BytesIO(content))
+      return tmp_tar
+
 if __name__ == '__main__':
   unit_test.main()
@@ -41,7 +41,33 @@ class test_archive_util(unit_test):
       'foo-1.2.3/fruits/apple.txt': '7269b27861e2a5ba6947b6279bb5e66b23439d83a65a3c0cf529f5834ed2e7fb',
       'foo-1.2.3/fruits/kiwi.txt': 'a7be44d9dda7e951298316b34ce84a1b2da8b5e0bead26118145bda4fbca9329',
     }, archive_util.member_checksums(a, [ 'foo-1.2.3/fruits/apple.txt', 'foo-1.2.3/fruits/kiwi.txt' ]) )
-    
+
+  def test_member_checksums_tgz(self):
+    a = temp_archive.make_temp_archive(temp_archive.make_temp_item_list([
+      ( self.native_filename('foo-1.2.3/fruits/apple.txt'), 'apple.txt' ),
+      ( self.native_filename('foo-1.2.3/fruits/durian.txt'), 'durian.txt' ),
+      ( self.native_filename('foo-1.2.3/fruits/kiwi.txt'), 'kiwi.txt' ),
+    ]), 'tgz', delete = not self.DEBUG)
+    self.assertEqual( {
+      'foo-1.2.3/fruits/apple.txt': '7269b27861e2a5ba6947b6279bb5e66b23439d83a65a3c0cf529f5834ed2e7fb',
+      'foo-1.2.3/fruits/kiwi.txt': 'a7be44d9dda7e951298316b34ce84a1b2da8b5e0bead26118145bda4fbca9329',
+    }, archive_util.member_checksums(a, [ 'foo-1.2.3/fruits/apple.txt', 'foo-1.2.3/fruits/kiwi.txt' ]) )
+    with self.assertRaises(IOError) as ctx:
+      archive_util.member_checksums(a, [ 'foo-1.2.3/fruits/nothere.txt' ])
+
+  def test_duplicate_members_with_conflicts_tgz(self):
+    a1 = temp_archive.make_temp_archive(temp_archive.make_temp_item_list([
+      ( self.native_filename('foo-1.2.3/fruits/apple.txt'), 'apple.txt' ),
+      ( self.native_filename('foo-1.2.3/fruits/kiwi.txt'), 'kiwi.txt' ),
+    ]), 'tgz', delete = not self.DEBUG, prefix = 'a1-')
+    a2 = temp_archive.make_temp_archive(temp_archive.make_temp_item_list([
+      ( self.native_filename('foo-1.2.3/fruits/apple.txt'), 'apple2.txt' ),
+      ( self.native_filename('foo-1.2.3/fruits/kiwi.txt'), 'kiwi.txt' ),
+    ]), 'tgz', delete = not self.DEBUG, prefix = 'a2-')
+    self.assertEqual( {
+      'foo-1.2.3/fruits/apple.txt': { a1, a2 },
+    }, archive_util.duplicate_members([ a1, a2 ], only_content_conficts = True) )
+
   def test_duplicate_members(self):
     a1 = temp_archive.make_temp_archive(temp_archive.make_temp_item_list([
       ( self.native_filename('foo-1.2.3/fruits/apple.txt'), 'apple.txt' ),
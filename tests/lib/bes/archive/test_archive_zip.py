@@ -1,7 +1,10 @@
 #!/usr/bin/env python
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import os, os.path as path, stat, zipfile
+
 from bes.testing.unit_test import unit_test
+from bes.fs.file_util import file_util
 from bes.archive.archive_extension import archive_extension
 from bes.archive.temp_archive import temp_archive
 from bes.archive.archive_zip import archive_zip
@@ -32,5 +35,26 @@ class test_archive_zip(make_test_case(archive_zip, archive_extension.ZIP)):
   
       self.assertFalse( archive_zip.file_is_valid(self.make_temp_file(content = 'junk\n')) )
 
+    def test_extract_read_only_dir(self):
+      tmp_zip = self.make_temp_file(suffix = '.zip')
+      with zipfile.ZipFile(tmp_zip, mode = 'w') as archive:
+        dir_info = zipfile.ZipInfo('ro/')
+        dir_info.create_system = 3
+        dir_info.external_attr = ( ( stat.S_IFDIR | 0o555 ) << 16 ) | 0x10
+        archive.writestr(dir_info, '')
+        file_info = zipfile.ZipInfo('ro/a.txt')
+        file_info.create_system = 3
+        file_info.external_attr = ( stat.S_IFREG | 0o644 ) << 16
+        archive.writestr(file_info, 'a.txt\n')
+      self.assertEqual( [ 'ro/', 'ro/a.txt' ], archive_zip(tmp_zip).members )
+      for num_threads in [ 1, 4 ]:
+        tmp_dir = self.make_temp_dir()
+        self.call_as_non_root(lambda: archive_zip(tmp_zip).extract_all(tmp_dir, num_threads = num_threads),
+                              tmp_zip, tmp_dir)
+        ro_dir = path.join(tmp_dir, 'ro')
+        self.assertEqual( 0o40555, os.stat(ro_dir).st_mode )
+        self.assertEqual( 'a.txt\n', file_util.read(path.join(ro_dir, 'a.txt'), codec = 'utf-8') )
+        os.chmod(ro_dir, 0o755)
+
 if __name__ == '__main__':
   unit_test.main()
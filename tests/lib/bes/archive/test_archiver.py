@@ -34,6 +34,13 @@ class test_archiver(unit_test):
       'archives/zip/tmp_zip.zip',
     ]), archiver.find_archives(tmp_dir) )
 
+  def test_extract_member_to_string_cached(self):
+    tmp_cache_dir = self.make_temp_dir()
+    tmp_zip = temp_archive.make_temp_archive([ temp_archive.item('foo.txt', content = 'foo.txt\n') ], archive_extension.ZIP)
+    for cheap_key in [ False, True ]:
+      self.assertEqual( b'foo.txt\n', archiver.extract_member_to_string_cached(tmp_zip, 'foo.txt', cache_dir = tmp_cache_dir, cheap_key = cheap_key) )
+      self.assertEqual( b'foo.txt\n', archiver.extract_member_to_string_cached(tmp_zip, 'foo.txt', cache_dir = tmp_cache_dir, cheap_key = cheap_key) )
+
   def test_create_tar_gz(self):
     tmp_dir = temp_content.write_items_to_temp_dir([
         'file a/b/c/foo.txt "foo content" 755',
@@ -166,6 +173,70 @@ class test_archiver(unit_test):
     ], archiver.members(tmp_archive) )
     self.assertEqual( 'this is new_file.txt', archiver.extract_member_to_string(tmp_archive, 'new/new_file.txt', codec = 'utf8') )
 
+  def test_transform_tgz(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+        'file files/foo.txt "this is foo.txt" 644',
+        'file files/bar.txt "this is bar.txt" 644',
+        'file files/sub/baz.txt "this is baz.txt" 644',
+    ], delete = not self.DEBUG)
+    tmp_archive = self.make_temp_file(suffix = '.tgz')
+    archiver.create(tmp_archive, tmp_dir)
+    replacement = self.make_temp_file(content = 'this is the new bar.txt')
+
+    operations = [
+      archiver.operation_add_file('new/new_file.txt', 'this is new_file.txt', 0o0755),
+      archiver.operation_remove_files([ 'files/sub' ]),
+      archiver.operation_replace_file('files/bar.txt', replacement),
+    ]
+    archiver.transform(tmp_archive, operations)
+    self.assertEqual( 'tgz', archiver.format_name(tmp_archive) )
+    self.assertEqual( [
+      'files/bar.txt',
+      'files/foo.txt',
+      'new/new_file.txt',
+    ], archiver.members(tmp_archive) )
+    self.assertEqual( 'this is the new bar.txt', archiver.extract_member_to_string(tmp_archive, 'files/bar.txt', codec = 'utf8') )
+    self.assertEqual( 'this is foo.txt', archiver.extract_member_to_string(tmp_archive, 'files/foo.txt', codec = 'utf8') )
+    self.assertEqual( 'this is new_file.txt', archiver.extract_member_to_string(tmp_archive, 'new/new_file.txt', codec = 'utf8') )
+
+  def test_transform_add_only(self):
+    for extension in [ 'zip', 'tar' ]:
+      tmp_dir = temp_content.write_items_to_temp_dir([
+          'file files/foo.txt "this is foo.txt" 644',
+      ], delete = not self.DEBUG)
+      tmp_archive = self.make_temp_file(suffix = '.' + extension)
+      archiver.create(tmp_archive, tmp_dir)
+      archiver.transform(tmp_archive, [ archiver.operation_add_file('files/bar.txt', 'this is bar.txt', 0o0644) ])
+      self.assertEqual( [
+        'files/bar.txt',
+        'files/foo.txt',
+      ], archiver.members(tmp_archive) )
+      self.assertEqual( 'this is bar.txt', archiver.extract_member_to_string(tmp_archive, 'files/bar.txt', codec = 'utf8') )
+      self.assertEqual( 'this is foo.txt', archiver.extract_member_to_string(tmp_archive, 'files/foo.txt', codec = 'utf8') )
+
+  def test_transform_add_existing_zip(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+        'file files/foo.txt "this is foo.txt" 644',
+    ], delete = not self.DEBUG)
+    tmp_archive = self.make_temp_file(suffix = '.zip')
+    archiver.create(tmp_archive, tmp_dir)
+    archiver.transform(tmp_archive, [ archiver.operation_add_file('files/foo.txt', 'this is the new foo.txt', 0o0644) ])
+    self.assertEqual( [ 'files/foo.txt' ], archiver.members(tmp_archive) )
+    self.assertEqual( 'this is the new foo.txt', archiver.extract_member_to_string(tmp_archive, 'files/foo.txt', codec = 'utf8') )
+
+  def test_members_after_create(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+        'file files/foo.txt "this is foo.txt" 644',
+    ], delete = not self.DEBUG)
+    tmp_archive = self.make_temp_file(suffix = '.zip')
+    archiver.create(tmp_archive, tmp_dir)
+    self.assertEqual( [ 'files/foo.txt' ], archiver.members(tmp_archive) )
+    self.assertEqual( [ ( 'files/foo.txt', 15 ) ], [ ( i.member, i.size ) for i in archiver.member_infos(tmp_archive) ] )
+    file_util.save(path.join(tmp_dir, 'files/bar.txt'), content = 'this is bar.txt')
+    archiver.create(tmp_archive, tmp_dir)
+    self.assertEqual( [ 'files/bar.txt', 'files/foo.txt' ], archiver.members(tmp_archive) )
+    self.assertTrue( archiver.has_member(tmp_archive, 'files/bar.txt') )
+
   def test_create_with_exclude(self):
     tmp_dir = temp_content.write_items_to_temp_dir([
         'file a/b/c/foo.txt "foo content" 755',
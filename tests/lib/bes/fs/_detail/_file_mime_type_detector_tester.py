@@ -19,6 +19,12 @@ def make_test_case(impl):
     def test_png(self):
       self.assertEqual( 'image/png', impl.detect_mime_type(self.png_file) )
   
+    def test_detect_mime_types(self):
+      tmp = self.make_temp_file(content = 'this is text\n', suffix = '.txt')
+      filenames = [ tmp, self.png_file ]
+      expected = dict([ ( f, impl.detect_mime_type(f) ) for f in filenames ])
+      self.assertEqual( expected, impl.detect_mime_types(filenames) )
+
     @unit_test_function_skip.skip_if_not_unix(warning = True)
     def xtest_wrong_png_extension(self):
       self.assertEqual( 'image/png', impl.detect_mime_type(self.png_file_wrong_extension) )
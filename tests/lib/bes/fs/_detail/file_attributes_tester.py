@@ -80,6 +80,12 @@ def make_test_case(impl):
       impl.set_all(tmp, d)
       self.assertEqual( d, impl.get_all(tmp) )
 
+    def test_get_many(self):
+      tmp = self._make_temp_file('this is foo\n')
+      impl.set_bytes(tmp, 'foo', b'hi')
+      impl.set_bytes(tmp, 'bar', b'666')
+      self.assertEqual( { 'foo': b'hi', 'baz': None }, impl.get_many(tmp, [ 'foo', 'baz' ]) )
+
     def test_set_bool_get_bool(self):
       tmp = self._make_temp_file('this is foo\n')
       impl.set_bool(tmp, 'foo', True)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os
+
+from bes.testing.unit_test import unit_test
+from bes.docker.docker import docker
+from bes.testing.unit_test_class_skip import unit_test_class_skip
+from bes.testing.unit_test_function_skip import unit_test_function_skip
+from bes.system.host import host
+
+from file_attributes_tester import make_test_case
+
+# root can write attributes on read only files
+_IS_ROOT = hasattr(os, 'geteuid') and os.geteuid() == 0
+
+if host.is_linux():
+  from bes.fs._detail._file_attributes_os_xattr import _file_attributes_os_xattr
+  class test__file_attributes_os_xattr(make_test_case(_file_attributes_os_xattr)):
+
+    @classmethod
+    def setUpClass(clazz):
+      unit_test_class_skip.raise_skip_if_not_linux()
+      docker.raise_skip_if_running_under_docker()
+
+    @unit_test_function_skip.skip_if(_IS_ROOT, 'running as root')
+    def test_set_no_write_permission_unix(self):
+      super(test__file_attributes_os_xattr, self).test_set_no_write_permission_unix()
+
+    @unit_test_function_skip.skip_if(_IS_ROOT, 'running as root')
+    def test_remove_no_write_permission_unix(self):
+      super(test__file_attributes_os_xattr, self).test_remove_no_write_permission_unix()
+
+    @unit_test_function_skip.skip_if(_IS_ROOT, 'running as root')
+    def test_clear_no_write_permission_unix(self):
+      super(test__file_attributes_os_xattr, self).test_clear_no_write_permission_unix()
+
+if __name__ == '__main__':
+  unit_test.main()
+
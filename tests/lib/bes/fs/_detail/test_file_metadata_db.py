@@ -7,6 +7,7 @@ from bes.fs._detail.file_metadata_db import file_metadata_db
 from bes.fs.file_metadata import file_metadata
 from bes.fs.file_util import file_util
 from bes.key_value.key_value_list import key_value_list
+from bes.sqlite.sqlite import sqlite
 
 class test_file_metadata(unit_test):
 
@@ -15,7 +16,7 @@ class test_file_metadata(unit_test):
     db = file_metadata(tmp_dir)
     tmp_file = self.make_temp_file(dir = tmp_dir, suffix = '.txt', content = 'this is foo\n')
     self.assertEqual( [], db.get_values('something', tmp_file) )
-    self.assertEqual( False, db._db._db.has_table(db._table_name('something', tmp_file)) )
+    self.assertEqual( False, db.has_values('something', tmp_file) )
     
   def test_replace_values_from_empty(self):
     tmp_dir = self.make_temp_dir()
@@ -64,7 +65,7 @@ class test_file_metadata(unit_test):
     db = file_metadata(tmp_dir)
     tmp_file = self.make_temp_file(dir = tmp_dir, suffix = '.txt', content = 'this is foo\n')
     self.assertEqual( None, db.get_value('something', tmp_file, 'foo') )
-    self.assertEqual( False, db._db._db.has_table(db._table_name('something', tmp_file)) )
+    self.assertEqual( False, db.has_values('something', tmp_file) )
     
   def test_get_value(self):
     tmp_dir = self.make_temp_dir()
@@ -90,12 +91,58 @@ class test_file_metadata(unit_test):
     db.set_value('something', tmp_file, 'bar', '67')
     self.assertEqual( 'hi', db.get_value('something', tmp_file, 'foo') )
     self.assertEqual( '67', db.get_value('something', tmp_file, 'bar') )
-    print('  tmp_file: {}'.format(tmp_file))
-    print('table_name: {}'.format(db._table_name('something', tmp_file)))
-    self.assertEqual( True, db._db._db.has_table(db._table_name('something', tmp_file)) )
+    self.assertEqual( True, db.has_values('something', tmp_file) )
     db.clear('something', tmp_file)
     self.assertEqual( [], db.get_values('something', tmp_file) )
-    self.assertEqual( False, db._db._db.has_table(db._table_name('something', tmp_file)) )
+    self.assertEqual( False, db.has_values('something', tmp_file) )
+    
+  def test_get_values_many(self):
+    tmp_dir = self.make_temp_dir()
+    db = file_metadata(tmp_dir)
+    tmp_file1 = self.make_temp_file(dir = tmp_dir, suffix = '.txt', content = 'this is foo\n')
+    tmp_file2 = self.make_temp_file(dir = tmp_dir, suffix = '.txt', content = 'this is bar\n')
+    tmp_file3 = self.make_temp_file(dir = tmp_dir, suffix = '.txt', content = 'this is baz\n')
+    db.set_value('something', tmp_file1, 'foo', 'hi')
+    db.set_value('something', tmp_file2, 'bar', '42')
+    db.set_value('else', tmp_file3, 'baz', '666')
+    self.assertEqual( {
+      tmp_file1: [ ( 'foo', 'hi' ) ],
+      tmp_file2: [ ( 'bar', '42' ) ],
+      tmp_file3: [],
+    }, db.get_values_many('something', [ tmp_file1, tmp_file2, tmp_file3 ]) )
+
+  def test_set_values_many(self):
+    tmp_dir = self.make_temp_dir()
+    db = file_metadata(tmp_dir)
+    tmp_file1 = self.make_temp_file(dir = tmp_dir, suffix = '.txt', content = 'this is foo\n')
+    tmp_file2 = self.make_temp_file(dir = tmp_dir, suffix = '.txt', content = 'this is bar\n')
+    db.set_value('something', tmp_file1, 'keep', 'me')
+    db.set_values_many('something', {
+      tmp_file1: { 'foo': 'hi', 'bar': '42' },
+      tmp_file2: { 'foo': 'bye' },
+    })
+    self.assertEqual( [ ( 'bar', '42' ), ( 'foo', 'hi' ), ( 'keep', 'me' ) ], db.get_values('something', tmp_file1) )
+    self.assertEqual( [ ( 'foo', 'bye' ) ], db.get_values('something', tmp_file2) )
+
+  def test_migrate_table_per_file_layout(self):
+    tmp_dir = self.make_temp_dir()
+    db_filename = path.join(tmp_dir, file_metadata.DEFAULT_DB_FILENAME)
+    old_db = sqlite(db_filename)
+    old_db.execute('create table hash_to_filename(hash text primary key not null, filename text)')
+    for filename, values in [ ( 'foo.txt', [ ( 'a', '1' ), ( 'b', '2' ) ] ), ( 'bar.txt', [ ( 'c', '3' ) ] ) ]:
+      h = str(abs(hash(filename)))
+      old_db.execute('insert into hash_to_filename (hash, filename) values (?, ?)', ( h, filename ))
+      old_db.execute('create table something_{}(key text primary key not null, value text)'.format(h))
+      for key, value in values:
+        old_db.execute('insert into something_{} (key, value) values (?, ?)'.format(h), ( key, value ))
+    old_db.commit()
+    del old_db
+    
+    db = file_metadata(tmp_dir)
+    self.assertEqual( [ ( 'a', '1' ), ( 'b', '2' ) ], db.get_values('something', 'foo.txt') )
+    self.assertEqual( [ ( 'c', '3' ) ], db.get_values('something', 'bar.txt') )
+    self.assertEqual( False, db._db._db.has_table('hash_to_filename') )
+    self.assertEqual( 1, db._db._db.user_version )
     
 if __name__ == '__main__':
   unit_test.main()
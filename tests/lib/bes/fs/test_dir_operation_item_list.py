@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import os.path as path
+
 from bes.fs.dir_operation_item import dir_operation_item
 from bes.fs.dir_operation_item_list import dir_operation_item_list
+from bes.fs.file_find import file_find
+from bes.fs.file_util import file_util
+from bes.fs.testing.temp_content import temp_content
 from bes.testing.unit_test import unit_test
 
 class test_dir_operation_item_list(unit_test):
@@ -10,6 +15,71 @@ class test_dir_operation_item_list(unit_test):
   def test__make_resolved_filename(self):
     f = dir_operation_item_list._make_resolved_filename
     self.assertEqual( '/a/b/foo-12345-666.txt', f('/a/b/foo.txt', '12345', 666) )
+
+  def _make_items(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+      'file src/kiwi.txt "kiwi"',
+      'file src/lemon.txt "lemon"',
+      'file src/melon.txt "melon"',
+      'file dst/b/lemon.txt "lemon"',
+      'file dst/c/melon.txt "not melon"',
+    ], delete = not self.DEBUG)
+    items = dir_operation_item_list([
+      dir_operation_item(path.join(tmp_dir, 'src/kiwi.txt'), path.join(tmp_dir, 'dst/a/kiwi.txt')),
+      dir_operation_item(path.join(tmp_dir, 'src/lemon.txt'), path.join(tmp_dir, 'dst/b/lemon.txt')),
+      dir_operation_item(path.join(tmp_dir, 'src/melon.txt'), path.join(tmp_dir, 'dst/c/melon.txt')),
+    ])
+    return tmp_dir, items
+
+  def test_move_files(self):
+    tmp_dir, items = self._make_items()
+    progress = []
+    callback = lambda item, i, num: progress.append(( i, num ))
+    result = items.move_files('666', 1, callback = callback)
+    self.assertEqual( self.native_filename_list([
+      'dst/a/kiwi.txt',
+      'dst/b/lemon.txt',
+      'dst/c/melon-666-1.txt',
+    ]), [ path.relpath(f, tmp_dir) for f in result ] )
+    self.assertEqual( [ ( 1, 3 ), ( 2, 3 ), ( 3, 3 ) ], progress )
+    self.assertEqual( self.native_filename_list([
+      'dst/a/kiwi.txt',
+      'dst/b/lemon.txt',
+      'dst/c/melon-666-1.txt',
+      'dst/c/melon.txt',
+    ]), file_find.find(tmp_dir) )
+    self.assertEqual( 'not melon', file_util.read(path.join(tmp_dir, 'dst/c/melon.txt'), codec = 'utf-8') )
+
+  def test_copy_files(self):
+    tmp_dir, items = self._make_items()
+    result = items.copy_files('666', 1, num_threads = 2)
+    self.assertEqual( 3, len(result) )
+    self.assertEqual( self.native_filename_list([
+      'dst/a/kiwi.txt',
+      'dst/b/lemon.txt',
+      'dst/c/melon-666-1.txt',
+      'dst/c/melon.txt',
+      'src/kiwi.txt',
+      'src/lemon.txt',
+      'src/melon.txt',
+    ]), file_find.find(tmp_dir) )
+
+  def test_move_files_compares_each_item_once(self):
+    tmp_dir, items = self._make_items()
+    compared = []
+    old_func = dir_operation_item.src_and_dst_are_the_same
+    def _counting_func(item):
+      compared.append(path.relpath(item.dst_filename, tmp_dir))
+      return old_func(item)
+    dir_operation_item.src_and_dst_are_the_same = _counting_func
+    try:
+      items.move_files('666', 1)
+    finally:
+      dir_operation_item.src_and_dst_are_the_same = old_func
+    self.assertEqual( self.native_filename_list([
+      'dst/b/lemon.txt',
+      'dst/c/melon.txt',
+    ]), sorted(compared) )
     
 if __name__ == '__main__':
   unit_test.main()
@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import os
 from os import path
 
 from bes.fs.dir_split import dir_split
 from bes.fs.dir_split_options import dir_split_options
+from bes.fs.dir_split_plan import dir_split_plan
+from bes.fs.file_find import file_find
 from bes.fs.file_util import file_util
 from bes.fs.testing.temp_content import multiplied_temp_content
 from bes.fs.testing.temp_content import temp_content
@@ -472,6 +475,51 @@ class test_dir_split(unit_test, unit_test_media_files):
     self.assert_filename_list_equal( expected, t.dst_files )
     self.assert_filename_list_equal( [], t.src_files )
     
+  def test_split_plan_json(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+      'file src/apple.txt "apple"',
+      'file src/kiwi.txt "kiwi"',
+      'file src/lemon.txt "lemon"',
+    ], delete = not self.DEBUG)
+    src_dir = path.join(tmp_dir, 'src')
+    dst_dir = path.join(tmp_dir, 'dst')
+    options = dir_split_options(chunk_size = 2, prefix = 'chunk-', sort_order = 'size')
+    plan = dir_split.split_plan(src_dir, dst_dir, options)
+    self.assertEqual( [
+      ( path.join(src_dir, 'kiwi.txt'), path.join(dst_dir, 'chunk-1', 'kiwi.txt') ),
+      ( path.join(src_dir, 'apple.txt'), path.join(dst_dir, 'chunk-1', 'apple.txt') ),
+      ( path.join(src_dir, 'lemon.txt'), path.join(dst_dir, 'chunk-2', 'lemon.txt') ),
+    ], [ tuple(item) for item in plan.items ] )
+    plan = dir_split_plan.from_json(plan.to_json())
+    dir_split.apply_plan(plan, dst_dir, options = options)
+    self.assert_filename_list_equal( [
+      'chunk-1/apple.txt',
+      'chunk-1/kiwi.txt',
+      'chunk-2/lemon.txt',
+    ], file_find.find(dst_dir) )
+
+  def test_split_plan_with_walk_cache_file_edited_in_place(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+      'file src/apple.txt "apple"',
+      'file src/kiwi.txt "kiwi"',
+      'file src/lemon.txt "lemon"',
+    ], delete = not self.DEBUG)
+    src_dir = path.join(tmp_dir, 'src')
+    dst_dir = path.join(tmp_dir, 'dst')
+    # An old dir mtime so the cached listing is trusted on the next scan
+    os.utime(src_dir, ( 1000000000, 1000000000 ))
+    options = dir_split_options(chunk_size = 2, prefix = 'chunk-', sort_order = 'size',
+                                walk_cache = self.make_temp_file(suffix = '.db'))
+    dir_split.split_plan(src_dir, dst_dir, options)
+    with open(path.join(src_dir, 'kiwi.txt'), 'w') as fout:
+      fout.write('kiwi is now the biggest')
+    plan = dir_split.split_plan(src_dir, dst_dir, options)
+    self.assertEqual( [
+      ( path.join(src_dir, 'apple.txt'), path.join(dst_dir, 'chunk-1', 'apple.txt') ),
+      ( path.join(src_dir, 'lemon.txt'), path.join(dst_dir, 'chunk-1', 'lemon.txt') ),
+      ( path.join(src_dir, 'kiwi.txt'), path.join(dst_dir, 'chunk-2', 'kiwi.txt') ),
+    ], [ tuple(item) for item in plan.items ] )
+
   def _split_test(self,
                   multiplied_content_items = None,
                   content_multiplier = 1,
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os.path as path
+
+from bes.fs.dir_walk_cache import dir_walk_cache
+from bes.fs.file_find import file_find
+from bes.fs.file_util import file_util
+from bes.fs.testing.temp_content import temp_content
+from bes.testing.unit_test import unit_test
+
+class test_dir_walk_cache(unit_test):
+
+  def _make_cache(self):
+    cache = dir_walk_cache(self.make_temp_file(suffix = '.db', non_existent = True))
+    # trust listings right away so the tests dont have to sleep
+    cache._RACY_NS = 0
+    return cache
+
+  def test_scandir(self):
+    tmp_dir = self.make_temp_dir()
+    file_util.save(path.join(tmp_dir, 'kiwi.txt'), content = 'kiwi')
+    file_util.mkdir(path.join(tmp_dir, 'fruits'))
+    cache = self._make_cache()
+    entries = sorted(cache.scandir(tmp_dir), key = lambda entry: entry.name)
+    self.assertEqual( [ 'fruits', 'kiwi.txt' ], [ entry.name for entry in entries ] )
+    self.assertEqual( [ True, False ], [ entry.is_dir() for entry in entries ] )
+    self.assertEqual( 4, entries[1].stat().st_size )
+    self.assertEqual( ( 0, 1 ), ( cache.hits, cache.misses ) )
+    entries = sorted(cache.scandir(tmp_dir), key = lambda entry: entry.name)
+    self.assertEqual( [ 'fruits', 'kiwi.txt' ], [ entry.name for entry in entries ] )
+    self.assertEqual( ( 1, 1 ), ( cache.hits, cache.misses ) )
+
+  def test_scandir_rescans_changed_dir(self):
+    tmp_dir = self.make_temp_dir()
+    file_util.save(path.join(tmp_dir, 'kiwi.txt'), content = 'kiwi')
+    cache = self._make_cache()
+    self.assertEqual( [ 'kiwi.txt' ], [ entry.name for entry in cache.scandir(tmp_dir) ] )
+    file_util.save(path.join(tmp_dir, 'lemon.txt'), content = 'lemon')
+    self.assertEqual( [ 'kiwi.txt', 'lemon.txt' ], sorted([ entry.name for entry in cache.scandir(tmp_dir) ]) )
+    self.assertEqual( ( 0, 2 ), ( cache.hits, cache.misses ) )
+
+  def test_scandir_persists(self):
+    tmp_dir = self.make_temp_dir()
+    file_util.save(path.join(tmp_dir, 'kiwi.txt'), content = 'kiwi')
+    db_filename = self.make_temp_file(suffix = '.db', non_existent = True)
+    cache = dir_walk_cache(db_filename)
+    cache._RACY_NS = 0
+    cache.scandir(tmp_dir)
+    cache.flush()
+    cache = dir_walk_cache(db_filename)
+    cache._RACY_NS = 0
+    self.assertEqual( [ 'kiwi.txt' ], [ entry.name for entry in cache.scandir(tmp_dir) ] )
+    self.assertEqual( ( 1, 0 ), ( cache.hits, cache.misses ) )
+
+  def test_find_with_walk_cache(self):
+    tmp_dir = temp_content.write_items_to_temp_dir([
+      'file foo.txt "foo.txt\n" 644',
+      'file subdir/bar.txt "bar.txt\n" 644',
+      'file subdir/subberdir/baz.txt "baz.txt\n" 644',
+      'file emptyfile.txt',
+      'dir emptydir "" 755',
+    ], delete = not self.DEBUG)
+    cache = self._make_cache()
+    expected = file_find.find(tmp_dir)
+    self.assertEqual( expected, file_find.find(tmp_dir, walk_cache = cache) )
+    self.assertEqual( 0, cache.hits )
+    self.assertEqual( expected, file_find.find(tmp_dir, walk_cache = cache) )
+    self.assertEqual( 4, cache.hits )
+    file_util.remove(path.join(tmp_dir, 'subdir/subberdir'))
+    self.assertEqual( [
+      'emptyfile.txt',
+      'foo.txt',
+      'subdir/bar.txt',
+    ], file_find.find(tmp_dir, walk_cache = cache) )
+
+if __name__ == '__main__':
+  unit_test.main()
@@ -1,6 +1,10 @@
 #!/usr/bin/env python
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
+import multiprocessing
+import os
+import os.path as path
+
 from bes.testing.unit_test import unit_test
 from bes.fs.file_cache import file_cache
 from bes.fs.file_util import file_util
@@ -28,5 +32,66 @@ class test_file_cache(unit_test):
 
     self.assertEqual( expected_content, actual_content )
 
+  def test_cached_content_hit(self):
+    tmp_cache_dir = self.make_temp_dir(prefix = 'test_cached_root_', suffix = '.dir')
+    tmp_filename = self.make_temp_file(content = 'foo\n')
+    file_cache.reset_stats()
+    self.assertEqual( b'foo\n', file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir) )
+    self.assertEqual( b'foo\n', file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir) )
+    self.assertEqual( ( 1, 1, 0 ), file_cache.stats() )
+
+  def test_cached_content_changed(self):
+    tmp_cache_dir = self.make_temp_dir(prefix = 'test_cached_root_', suffix = '.dir')
+    tmp_filename = self.make_temp_file(content = 'foo\n')
+    file_cache.reset_stats()
+    self.assertEqual( b'foo\n', file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir) )
+    file_util.save(tmp_filename, content = 'bar\n')
+    self.assertEqual( b'bar\n', file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir) )
+    self.assertEqual( ( 0, 2, 0 ), file_cache.stats() )
+
+  def test_cached_content_cheap_key(self):
+    tmp_cache_dir = self.make_temp_dir(prefix = 'test_cached_root_', suffix = '.dir')
+    tmp_filename = self.make_temp_file(content = 'foo\n')
+    file_cache.reset_stats()
+    self.assertEqual( b'foo\n', file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir, cheap_key = True) )
+    self.assertEqual( b'foo\n', file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir, cheap_key = True) )
+    self.assertEqual( ( 1, 1, 0 ), file_cache.stats() )
+    with open(tmp_filename, 'w') as f:
+      f.write('kiwi\n')
+    self.assertEqual( b'kiwi\n', file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir, cheap_key = True) )
+    self.assertEqual( ( 1, 2, 0 ), file_cache.stats() )
+
+  def test_max_bytes_evicts_least_recently_used(self):
+    tmp_cache_dir = self.make_temp_dir(prefix = 'test_cached_root_', suffix = '.dir')
+    tmp_files = [ self.make_temp_file(content = c * 100) for c in 'abc' ]
+    file_cache.reset_stats()
+    for i, tmp_filename in enumerate(tmp_files):
+      file_cache.cached_content(tmp_filename, cache_dir = tmp_cache_dir, max_bytes = 250)
+      # make sure the lru order does not depend on the mtime granularity
+      self._set_last_used(tmp_cache_dir, tmp_filename, i)
+    self.assertEqual( ( 0, 3, 1 ), file_cache.stats() )
+    self.assertEqual( 200, file_cache.cache_size(cache_dir = tmp_cache_dir) )
+    file_cache.cached_content(tmp_files[1], cache_dir = tmp_cache_dir, max_bytes = 250)
+    file_cache.cached_content(tmp_files[2], cache_dir = tmp_cache_dir, max_bytes = 250)
+    self.assertEqual( ( 2, 3, 1 ), file_cache.stats() )
+
+  def _set_last_used(self, cache_dir, filename, when):
+    key = file_cache._make_key(path.abspath(filename))
+    os.utime(path.join(cache_dir, 'checksums', key), ( when, when ))
+
+  @staticmethod
+  def _worker(args):
+    filename, cache_dir = args
+    return file_cache.cached_content(filename, cache_dir = cache_dir, max_bytes = 1000)
+
+  def test_many_processes(self):
+    tmp_cache_dir = self.make_temp_dir(prefix = 'test_cached_root_', suffix = '.dir')
+    tmp_files = [ self.make_temp_file(content = str(i) * 300) for i in range(0, 8) ]
+    args = [ ( tmp_files[i % len(tmp_files)], tmp_cache_dir ) for i in range(0, 64) ]
+    with multiprocessing.Pool(4) as pool:
+      result = pool.map(self._worker, args)
+    self.assertEqual( [ file_util.read(filename) for filename, _ in args ], result )
+    self.assertTrue( file_cache.cache_size(cache_dir = tmp_cache_dir) <= 1000 )
+
 if __name__ == '__main__':
   unit_test.main()
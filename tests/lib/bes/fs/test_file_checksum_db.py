@@ -52,5 +52,58 @@ class test_file_metadata_db(unit_test):
     self.assertEqual( file_util.checksum('sha256', tmp_file), db.checksum('sha256', tmp_file) )
     self.assertEqual( 2, db.count )
     
+  def test_checksum_many(self):
+    tmp_dir = self.make_temp_dir()
+    db = file_checksum_db(tmp_dir)
+    tmp_files = [ temp_file.make_temp_file(suffix = '.txt', content = 'this is foo {}\n'.format(i)) for i in range(10) ]
+    expected = dict([ ( f, file_util.checksum('sha256', f) ) for f in tmp_files ])
+    self.assertEqual( expected, db.checksum_many('sha256', tmp_files, num_threads = 4, batch_size = 3) )
+    self.assertEqual( 10, db.count )
+    db = file_checksum_db(tmp_dir)
+    self.assertEqual( expected, db.checksum_many('sha256', tmp_files) )
+    self.assertEqual( 0, db.count )
+    
+  def test_batch(self):
+    tmp_dir = self.make_temp_dir()
+    db = file_checksum_db(tmp_dir)
+    tmp_file = temp_file.make_temp_file(suffix = '.txt', content = 'this is foo\n')
+    with db.batch():
+      self.assertEqual( file_util.checksum('sha256', tmp_file), db.checksum('sha256', tmp_file) )
+      self.assertEqual( file_util.checksum('sha256', tmp_file), db.checksum('sha256', tmp_file) )
+      self.assertEqual( 1, db.count )
+      self.assertEqual( [], file_checksum_db(tmp_dir).get_values_many([ tmp_file ])[tmp_file] )
+    db = file_checksum_db(tmp_dir)
+    self.assertEqual( file_util.checksum('sha256', tmp_file), db.checksum('sha256', tmp_file) )
+    self.assertEqual( 0, db.count )
+
+  def test_batch_flush_failure(self):
+    tmp_dir = self.make_temp_dir()
+    db = file_checksum_db(tmp_dir)
+    tmp_file = temp_file.make_temp_file(suffix = '.txt', content = 'this is foo\n')
+    def _fail(values):
+      raise IOError('disk full')
+    with db.batch():
+      db.checksum('sha256', tmp_file)
+      db.set_values_many = _fail
+      with self.assertRaises(IOError):
+        db.flush()
+      # the pending checksum is kept so the flush can be retried
+      del db.set_values_many
+      db.flush()
+    self.assertEqual( file_util.checksum('sha256', tmp_file), file_checksum_db(tmp_dir).checksum('sha256', tmp_file) )
+
+    db2 = file_checksum_db(tmp_dir)
+    tmp_file2 = temp_file.make_temp_file(suffix = '.txt', content = 'this is bar\n')
+    db2.set_values_many = _fail
+    with self.assertRaises(IOError):
+      with db2.batch():
+        db2.checksum('sha256', tmp_file2)
+
+    # a failed flush does not hide the error raised by the body
+    with self.assertRaises(ValueError):
+      with db2.batch():
+        db2.checksum('sha256', tmp_file2)
+        raise ValueError('body failed')
+    
 if __name__ == '__main__':
   unit_test.main()
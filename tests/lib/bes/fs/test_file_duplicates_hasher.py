@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import hashlib
+
+from bes.fs.file_duplicates_hasher import file_duplicates_hasher
+from bes.testing.unit_test import unit_test
+
+class test_file_duplicates_hasher(unit_test):
+
+  def test_head_checksums(self):
+    f1 = self.make_temp_file(content = 'kiwi is green')
+    f2 = self.make_temp_file(content = 'kiwi is brown')
+    h = file_duplicates_hasher()
+    self.assertEqual( {
+      f1: hashlib.sha256(b'kiwi').hexdigest(),
+      f2: hashlib.sha256(b'kiwi').hexdigest(),
+    }, h.head_checksums([ f1, f2 ], 4) )
+
+  def test_tail_checksums(self):
+    f1 = self.make_temp_file(content = 'kiwi is green')
+    f2 = self.make_temp_file(content = 'lemon is green')
+    h = file_duplicates_hasher(num_threads = 2)
+    self.assertEqual( {
+      f1: hashlib.sha256(b'green').hexdigest(),
+      f2: hashlib.sha256(b'green').hexdigest(),
+    }, h.tail_checksums([ f1, f2 ], 5) )
+
+  def test_head_checksums_with_missing_file(self):
+    f1 = self.make_temp_file(content = 'kiwi')
+    f2 = self.make_temp_file(content = 'lemon', non_existent = True)
+    h = file_duplicates_hasher(num_threads = 2)
+    self.assertEqual( {
+      f1: hashlib.sha256(b'kiwi').hexdigest(),
+    }, h.head_checksums([ f1, f2 ], 1024) )
+
+  def test_checksums_with_processes(self):
+    f1 = self.make_temp_file(content = 'kiwi')
+    f2 = self.make_temp_file(content = 'lemon')
+    f3 = self.make_temp_file(content = 'kiwi')
+    f4 = self.make_temp_file(content = 'melon', non_existent = True)
+    files = [ f1, f2, f3, f4 ]
+    actual = file_duplicates_hasher(num_threads = 2, use_processes = True).checksums(files)
+    self.assertEqual( {
+      f1: hashlib.sha256(b'kiwi').hexdigest(),
+      f2: hashlib.sha256(b'lemon').hexdigest(),
+      f3: hashlib.sha256(b'kiwi').hexdigest(),
+    }, actual )
+    self.assertEqual( file_duplicates_hasher(num_threads = 2).checksums(files), actual )
+
+  def test_group(self):
+    self.assertEqual( {
+      'a': [ 'f1', 'f3' ],
+    }, file_duplicates_hasher._group({ 'f3': 'a', 'f2': 'b', 'f1': 'a' }, lambda f, v: v) )
+
+if __name__ == '__main__':
+  unit_test.main()
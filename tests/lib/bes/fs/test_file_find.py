@@ -1,8 +1,9 @@
 #!/usr/bin/env python
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import os.path as path
+import os, os.path as path
 from bes.testing.unit_test import unit_test
+from bes.testing.unit_test_function_skip import unit_test_function_skip
 from bes.fs.file_find import file_find
 from bes.fs.temp_file import temp_file
 from bes.fs.testing.temp_content import temp_content
@@ -376,6 +377,107 @@ class test_file_find(unit_test):
       'fruit/lemon.fruit',
       'fruit/strawberry.fruit',
     ]), file_find.find(tmp_dir, match_re = [ r'^f.*$' ], match_basename = False) )
+
+  def test_iter_find(self):
+    tmp_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+      'file subdir/bar.txt "bar.txt\n"',
+      'file subdir/subberdir/baz.txt "baz.txt\n"',
+      'dir emptydir',
+    ])
+    self.assertEqual( self.native_filename_list([
+      'foo.txt',
+      'subdir/bar.txt',
+      'subdir/subberdir/baz.txt',
+    ]), sorted(file_find.iter_find(tmp_dir)) )
+
+  def test_iter_find_with_prune_function(self):
+    tmp_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+      'file subdir/bar.txt "bar.txt\n"',
+      'file subdir/subberdir/baz.txt "baz.txt\n"',
+      'file other/kiwi.txt "kiwi.txt\n"',
+    ])
+    prune = lambda d: path.basename(d) == 'subberdir'
+    self.assertEqual( self.native_filename_list([
+      'foo.txt',
+      'other/kiwi.txt',
+      'subdir/bar.txt',
+    ]), sorted(file_find.iter_find(tmp_dir, prune_function = prune)) )
+
+  def test_remove_empty_dirs(self):
+    tmp_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+      'file subdir/bar.txt "bar.txt\n"',
+      'dir subdir/a/b/c',
+      'dir emptydir',
+      'dir nested/d/e/f',
+    ])
+    removed = file_find.remove_empty_dirs(tmp_dir)
+    self.assertEqual( self.native_filename_list([
+      'emptydir',
+      'nested',
+      'nested/d',
+      'nested/d/e',
+      'nested/d/e/f',
+      'subdir/a',
+      'subdir/a/b',
+      'subdir/a/b/c',
+    ]), [ path.relpath(d, tmp_dir) for d in removed ] )
+    self.assertEqual( self.native_filename_list([
+      'foo.txt',
+      'subdir',
+      'subdir/bar.txt',
+    ]), file_find.find(tmp_dir, file_type = file_find.ANY) )
+
+  def test_remove_empty_dirs_root(self):
+    tmp_dir = self._make_temp_content([
+      'dir a/b/c',
+    ])
+    self.assertEqual( 4, len(file_find.remove_empty_dirs(tmp_dir)) )
+    self.assertFalse( path.exists(tmp_dir) )
+
+  def test_remove_empty_dirs_depth(self):
+    tmp_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+      'dir a/b/c/d',
+      'dir e/f',
+    ])
+    removed = file_find.remove_empty_dirs(tmp_dir, min_depth = 2, max_depth = 3)
+    self.assertEqual( self.native_filename_list([
+      'e/f',
+    ]), [ path.relpath(d, tmp_dir) for d in removed ] )
+    removed = file_find.remove_empty_dirs(tmp_dir, min_depth = 2, max_depth = 4)
+    self.assertEqual( self.native_filename_list([
+      'a/b',
+      'a/b/c',
+      'a/b/c/d',
+    ]), [ path.relpath(d, tmp_dir) for d in removed ] )
+
+  @unit_test_function_skip.skip_if_not_unix()
+  def test_file_find_links(self):
+    tmp_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+      'file subdir/bar.txt "bar.txt\n"',
+    ])
+    os.symlink('foo.txt', path.join(tmp_dir, 'foo_link.txt'))
+    os.symlink('subdir', path.join(tmp_dir, 'subdir_link'))
+    self.assertEqual( [
+      'foo.txt',
+      'subdir/bar.txt',
+    ], file_find.find(tmp_dir, file_type = file_find.FILE) )
+    self.assertEqual( [
+      'foo_link.txt',
+      'subdir_link',
+    ], file_find.find(tmp_dir, file_type = file_find.LINK) )
+    self.assertEqual( [
+      'subdir',
+    ], file_find.find(tmp_dir, file_type = file_find.DIR) )
+    self.assertEqual( [
+      'foo.txt',
+      'subdir/bar.txt',
+      'subdir_link/bar.txt',
+    ], file_find.find(tmp_dir, file_type = file_find.FILE, follow_links = True) )
     
 if __name__ == '__main__':
   unit_test.main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import multiprocessing
+import os.path as path
+
+from bes.fs.file_lock import file_lock
+from bes.fs.file_util import file_util
+from bes.testing.unit_test import unit_test
+
+class test_file_lock(unit_test):
+
+  def test_lock(self):
+    lock_filename = path.join(self.make_temp_dir(), 'sub', 'foo.lock')
+    with file_lock(lock_filename) as lock:
+      self.assertTrue( lock.locked )
+      self.assertFalse( file_lock(lock_filename).acquire(blocking = False) )
+    self.assertFalse( lock.locked )
+    other = file_lock(lock_filename)
+    self.assertTrue( other.acquire(blocking = False) )
+    other.release()
+
+  @staticmethod
+  def _worker(args):
+    lock_filename, counter_filename = args
+    for _ in range(0, 20):
+      with file_lock(lock_filename):
+        value = int(file_util.read(counter_filename, codec = 'utf-8'))
+        file_util.save(counter_filename, content = str(value + 1))
+    return True
+
+  def test_many_processes(self):
+    tmp_dir = self.make_temp_dir()
+    lock_filename = path.join(tmp_dir, 'counter.lock')
+    counter_filename = path.join(tmp_dir, 'counter.txt')
+    file_util.save(counter_filename, content = '0')
+    with multiprocessing.Pool(4) as pool:
+      pool.map(self._worker, [ ( lock_filename, counter_filename ) ] * 4)
+    self.assertEqual( '80', file_util.read(counter_filename, codec = 'utf-8') )
+
+if __name__ == '__main__':
+  unit_test.main()
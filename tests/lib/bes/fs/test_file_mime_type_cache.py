@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os.path as path
+
+from bes.fs.file_mime_type_cache import file_mime_type_cache
+from bes.fs.file_util import file_util
+from bes.testing.unit_test import unit_test
+
+from _bes_unit_test_common.unit_test_media_files import unit_test_media_files
+
+class test_file_mime_type_cache(unit_test, unit_test_media_files):
+
+  def test_mime_types(self):
+    db_filename = self.make_temp_file(suffix = '.db', non_existent = True)
+    tmp_png = self.make_temp_file(suffix = '.png', non_existent = True)
+    file_util.copy(self.png_file, tmp_png)
+    cache = file_mime_type_cache(db_filename)
+    self.assertEqual( { tmp_png: 'image/png' }, cache.mime_types([ tmp_png ]) )
+    self.assertEqual( ( 0, 1 ), ( cache.hits, cache.misses ) )
+    cache = file_mime_type_cache(db_filename)
+    self.assertEqual( { tmp_png: 'image/png' }, cache.mime_types([ tmp_png ]) )
+    self.assertEqual( ( 1, 0 ), ( cache.hits, cache.misses ) )
+
+  def test_mime_types_changed_file(self):
+    db_filename = self.make_temp_file(suffix = '.db', non_existent = True)
+    tmp_png = self.make_temp_file(suffix = '.png', non_existent = True)
+    file_util.copy(self.png_file, tmp_png)
+    cache = file_mime_type_cache(db_filename)
+    self.assertEqual( { tmp_png: 'image/png' }, cache.mime_types([ tmp_png ]) )
+    with open(tmp_png, 'a') as f:
+      f.write('more')
+    self.assertEqual( { tmp_png: 'image/png' }, cache.mime_types([ tmp_png ]) )
+    self.assertEqual( ( 0, 2 ), ( cache.hits, cache.misses ) )
+
+if __name__ == '__main__':
+  unit_test.main()
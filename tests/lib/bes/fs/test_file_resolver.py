@@ -276,6 +276,29 @@ class test_file_resolve(unit_test):
     ], [ '${tmp_dir}' ], recursive = True, ignore_files = [ tmp_ignore_file1, tmp_ignore_file2 ] )
     self.assert_string_equal( expected, actual, ignore_white_space = True, multi_line = True )
     
+  def test_iter_resolve_files(self):
+    tmp_dir = self.make_temp_dir()
+    temp_content.write_items([
+      'file cheese.txt "this is cheese.txt" 644',
+      'file a/lemon.txt "this is lemon.txt" 644',
+      'file b/kiwi.txt "this is kiwi.txt" 644',
+    ], tmp_dir)
+    options = file_resolver_options(recursive = True)
+    items = list(file_resolver.iter_resolve_files([ tmp_dir ], options = options))
+    self.assertEqual( [ 0, 1, 2 ], [ item.index for item in items ] )
+    self.assertEqual( sorted([ item.filename_abs for item in file_resolver.resolve_files([ tmp_dir ], options = options) ]),
+                      sorted([ item.filename_abs for item in items ]) )
+
+  def test_iter_resolve_files_with_limit(self):
+    tmp_dir = self.make_temp_dir()
+    temp_content.write_items([
+      'file cheese.txt "this is cheese.txt" 644',
+      'file a/lemon.txt "this is lemon.txt" 644',
+      'file b/kiwi.txt "this is kiwi.txt" 644',
+    ], tmp_dir)
+    options = file_resolver_options(recursive = True, limit = 2)
+    self.assertEqual( 2, len(list(file_resolver.iter_resolve_files([ tmp_dir ], options = options))) )
+
   def _test_resolve_files(self,
                           items,
                           files,
@@ -283,7 +283,34 @@ class test_file_split(unit_test, unit_test_media_files):
     file_split.unsplit_files(unsplit_tmp_archive, files)
     self.assertEqual( file_util.checksum('sha256', tmp_archive), file_util.checksum('sha256', unsplit_tmp_archive) )
     file_util.remove(files)
-    
+
+  def test_unsplit_files_with_hash_algorithm(self):
+    tmp_file = self.make_temp_file(content = self._make_content(1024 * 100))
+    files = file_split.split_file(tmp_file, 1024 * 30)
+    self.assertEqual( 4, len(files) )
+
+    unsplit_fast = self.make_temp_file()
+    self.assertEqual( None, file_split.unsplit_files(unsplit_fast, files) )
+    unsplit_hashed = self.make_temp_file()
+    digest = file_split.unsplit_files(unsplit_hashed, files, hash_algorithm = 'sha256')
+    expected = file_util.checksum('sha256', tmp_file)
+    self.assertEqual( expected, digest )
+    self.assertEqual( expected, file_util.checksum('sha256', unsplit_fast) )
+    self.assertEqual( expected, file_util.checksum('sha256', unsplit_hashed) )
+
+  def test_find_and_unsplit_many_groups_with_threads(self):
+    items = []
+    for i in range(0, 10):
+      for j in range(1, 4):
+        items.append(temp_content('file', f'src/g{i}/foo{i}.txt.00{j}', f'foo{i}{j}', 0o0644))
+    options = file_split_options(recursive = True, num_threads = 4)
+    with dir_operation_tester(extra_content_items = items) as t:
+      file_split.find_and_unsplit([ t.src_dir ], options = options)
+    for i in range(0, 10):
+      self.assert_text_file_equal( f'foo{i}1foo{i}2foo{i}3', f'{t.src_dir}/g{i}/foo{i}.txt' )
+    self.assertEqual( sorted([ f'g{i}/foo{i}.txt' for i in range(0, 10) ]),
+                      sorted([ f for f in t.src_files if f.endswith('.txt') ]) )
+
   @classmethod
   def _make_content(clazz, size):
     chars = [ c for c in string.ascii_letters ]
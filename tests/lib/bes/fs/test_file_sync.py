@@ -135,5 +135,49 @@ class test_file_find(unit_test):
     self.assertEqual( 0o0644, file_util.mode(path.join(tmp_dst_dir, 'bar.sh')) )
     self.assertEqual( 0o0755, file_util.mode(path.join(tmp_dst_dir, 'foo.txt')) )
     
+  def test_file_sync_dry_run(self):
+    tmp_src_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+      'file subdir/bar.txt "bar.txt\n"',
+    ])
+    tmp_dst_dir = self._make_temp_content([
+      'file subdir/bar.txt "bar.txt\n"',
+      'file old.txt "old.txt\n"',
+    ])
+    plan = file_sync.sync(tmp_src_dir, tmp_dst_dir, dry_run = True)
+    self.assertEqual( [ 'foo.txt' ], plan.copy )
+    self.assertEqual( [ 'old.txt' ], plan.remove )
+    self.assertEqual( 1, plan.unchanged )
+    self.assertEqual( [
+      self.native_filename('old.txt'),
+      self.native_filename('subdir/bar.txt'),
+    ], file_find.find(tmp_dst_dir, relative = True) )
+
+  def test_file_sync_unchanged_content_keeps_mtime(self):
+    tmp_src_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+    ])
+    tmp_dst_dir = temp_file.make_temp_dir()
+    file_sync.sync(tmp_src_dir, tmp_dst_dir)
+    dst_foo = path.join(tmp_dst_dir, 'foo.txt')
+    self.assertEqual( os.stat(path.join(tmp_src_dir, 'foo.txt')).st_mtime_ns, os.stat(dst_foo).st_mtime_ns )
+    os.utime(dst_foo, ( 1000, 1000 ))
+    plan = file_sync.sync(tmp_src_dir, tmp_dst_dir)
+    self.assertTrue( plan.empty )
+    self.assertEqual( 1000, file_util.mtime(dst_foo) )
+
+  def test_file_sync_same_size_changed_content(self):
+    tmp_src_dir = self._make_temp_content([
+      'file foo.txt "foo.txt\n"',
+    ])
+    tmp_dst_dir = temp_file.make_temp_dir()
+    file_sync.sync(tmp_src_dir, tmp_dst_dir)
+    src_foo = path.join(tmp_src_dir, 'foo.txt')
+    file_util.save(src_foo, content = 'bar.txt\n')
+    os.utime(src_foo, ( 2000, 2000 ))
+    plan = file_sync.sync(tmp_src_dir, tmp_dst_dir, num_threads = 2)
+    self.assertEqual( [ 'foo.txt' ], plan.copy )
+    self.assertEqual( 'bar.txt\n', file_util.read(path.join(tmp_dst_dir, 'foo.txt'), codec = 'utf8') )
+
 if __name__ == "__main__":
   unit_test.main()
@@ -34,6 +34,14 @@ class test_git(unit_test):
     file_util.save(bar, content = 'bar.txt\n')
     return [ 'bar.txt', 'foo.txt' ]
 
+  @git_temp_home_func()
+  def test_parse_branch_ref(self):
+    self.assertEqual( ( 'master', 'local', True, 1, 2, 'deadbee', 'fred', 'fix the thing' ),
+                      git._parse_branch_ref('*\0refs/heads/master\0deadbee\0[ahead 1, behind 2]\0<fred.flintstone@bedrock.com>\0fix  the  thing\0') )
+    self.assertEqual( ( 'b1', 'remote', False, 0, 0, 'deadbee', 'fred', 'add foo' ),
+                      git._parse_branch_ref(' \0refs/remotes/origin/b1\0deadbee\0\0<fred@bedrock.com>\0add foo\0') )
+    self.assertEqual( None, git._parse_branch_ref(' \0refs/remotes/origin/HEAD\0deadbee\0\0<fred@bedrock.com>\0add foo\0refs/remotes/origin/master') )
+
   @git_temp_home_func()
   def test_add(self):
     tmp_repo = self._create_tmp_repo()
@@ -3,11 +3,33 @@
 
 from bes.testing.unit_test import unit_test
 from bes.git.git_archive_cache import git_archive_cache
+from bes.git.git_temp_repo import git_temp_repo
+from bes.git.git_unit_test import git_temp_home_func
 
 class test_git_archive_cache(unit_test):
 
   def test_caca(self):
     pass
+
+  @git_temp_home_func()
+  def test_get_tarballs(self):
+    r = git_temp_repo(remote = True, debug = self.DEBUG)
+    revisions = []
+    for i in range(0, 3):
+      r.write_temp_content([
+        'file foo.txt "foo {}" 644'.format(i),
+      ])
+      r.add([ 'foo.txt' ])
+      r.commit('foo {}'.format(i), [ 'foo.txt' ])
+      r.push('origin', 'master')
+      revisions.append(r.last_commit_hash(short_hash = True))
+    cache = git_archive_cache(self.make_temp_dir())
+    tarballs = cache.get_tarballs(r.address, revisions)
+    self.assertEqual( [ cache.tarball_path(r.address, revision) for revision in revisions ], tarballs )
+    self.assertTrue( all([ cache.has_tarball(r.address, revision) for revision in revisions ]) )
+    self.assertEqual( 1, cache.mirror_cache.num_fetches )
+    self.assertEqual( tarballs[1], cache.get_tarball(r.address, revisions[1]) )
+    self.assertEqual( 1, cache.mirror_cache.num_fetches )
   
 if __name__ == '__main__':
   unit_test.main()
@@ -24,6 +24,38 @@ class test_git_clone_manager(unit_test):
     r1b.remove('foo.txt')
     r1b.commit('remove foo.txt', 'foo.txt')
     r1b.push()
+
+  @git_temp_home_func()
+  def test_update_pulls_from_mirror(self):
+    r1 = self._make_repo()
+    r1.write_temp_content([
+      'file foo.txt "this is foo" 644',
+    ])
+    r1.add([ 'foo.txt' ])
+    r1.commit('add foo.txt', [ 'foo.txt' ])
+    r1.push('origin', 'master')
+
+    g = GCM(self.make_temp_dir(suffix = '.gcm.dir'))
+    r1b = g.update(r1.address)
+    self.assertEqual( 'this is foo', r1b.read_file('foo.txt') )
+
+    r1.write_temp_content([
+      'file foo.txt "this is foo v2" 644',
+    ])
+    r1.commit('change foo.txt', [ 'foo.txt' ])
+    r1.push('origin', 'master')
+    r1b = g.update(r1.address)
+    self.assertEqual( 'this is foo v2', r1b.read_file('foo.txt') )
+    self.assertEqual( 2, g.mirror_cache.num_fetches )
+
+    r1b.write_temp_content([
+      'file bar.txt "this is bar" 644',
+    ])
+    r1b.add([ 'bar.txt' ])
+    r1b.commit('add bar.txt', [ 'bar.txt' ])
+    r1b.push()
+    r1.pull()
+    self.assertEqual( 'this is bar', r1.read_file('bar.txt') )
             
   def _make_repo(self, remote = True, content = None, prefix = None):
     return git_temp_repo(remote = remote, content = content, prefix = prefix, debug = self.DEBUG)
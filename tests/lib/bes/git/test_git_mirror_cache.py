@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
+
+import os.path as path
+import tarfile
+
+from bes.testing.unit_test import unit_test
+from bes.fs.file_util import file_util
+from bes.git.git_mirror_cache import git_mirror_cache
+from bes.git.git_temp_repo import git_temp_repo
+from bes.git.git_unit_test import git_temp_home_func
+
+class test_git_mirror_cache(unit_test):
+
+  @git_temp_home_func()
+  def test_archive_many_revisions_one_fetch(self):
+    r, revisions = self._make_repo_with_revisions(3)
+    mc = git_mirror_cache(self.make_temp_dir(suffix = '.mirrors'))
+    for i, revision in enumerate(revisions):
+      tmp_tgz = self.make_temp_file(suffix = '.tar.gz')
+      mc.archive(r.address, revision, 'foo', tmp_tgz)
+      with tarfile.open(tmp_tgz, mode = 'r:gz') as archive:
+        member = 'foo-{}/foo.txt'.format(revision)
+        self.assertEqual( 'foo {}\n'.format(i).encode('utf-8'), archive.extractfile(member).read() )
+    self.assertEqual( 1, mc.num_fetches )
+
+  @git_temp_home_func()
+  def test_fetch_when_revision_is_new(self):
+    r, revisions = self._make_repo_with_revisions(1)
+    mc = git_mirror_cache(self.make_temp_dir(suffix = '.mirrors'))
+    mc.update(r.address, revisions = revisions)
+    mc.update(r.address, revisions = revisions)
+    self.assertEqual( 1, mc.num_fetches )
+    _, new_revisions = self._add_revisions(r, 1, 1)
+    mc.update(r.address, revisions = new_revisions)
+    self.assertEqual( 2, mc.num_fetches )
+    # branches always fetch since they move
+    mc.update(r.address, revisions = [ 'master' ])
+    self.assertEqual( 3, mc.num_fetches )
+
+  @git_temp_home_func()
+  def test_add_worktree(self):
+    r, revisions = self._make_repo_with_revisions(2)
+    mc = git_mirror_cache(self.make_temp_dir(suffix = '.mirrors'))
+    tmp_dir = path.join(self.make_temp_dir(), 'wt')
+    mc.add_worktree(r.address, revisions[0], tmp_dir)
+    self.assertEqual( 'foo 0\n', file_util.read(path.join(tmp_dir, 'foo.txt'), codec = 'utf-8') )
+
+  @git_temp_home_func()
+  def test_evict(self):
+    r1, revisions1 = self._make_repo_with_revisions(1)
+    r2, revisions2 = self._make_repo_with_revisions(1)
+    mc = git_mirror_cache(self.make_temp_dir(suffix = '.mirrors'))
+    mc.update(r1.address)
+    mc.update(r2.address)
+    self.assertEqual( [ mc.mirror_path(r1.address) ], mc.evict(mc.size() - 1) )
+    self.assertFalse( mc.has_mirror(r1.address) )
+    self.assertTrue( mc.has_mirror(r2.address) )
+
+  def _make_repo_with_revisions(self, num):
+    r = git_temp_repo(remote = True, debug = self.DEBUG)
+    return self._add_revisions(r, 0, num)
+
+  def _add_revisions(self, r, start, num):
+    revisions = []
+    for i in range(start, start + num):
+      r.write_temp_content([
+        'file foo.txt "foo {}\n" 644'.format(i),
+      ])
+      r.add([ 'foo.txt' ])
+      r.commit('foo {}'.format(i), [ 'foo.txt' ])
+      r.push('origin', 'master')
+      revisions.append(r.last_commit_hash(short_hash = True))
+    return r, revisions
+
+if __name__ == '__main__':
+  unit_test.main()
@@ -3,6 +3,7 @@
 
 from bes.testing.unit_test import unit_test
 from bes.git.git_status import git_status
+from bes.git.git_status import git_status_list
 from bes.git.git_status_action import git_status_action
 
 class test_status(unit_test):
@@ -23,5 +24,24 @@ class test_status(unit_test):
     self.assertEqual( ( git_status_action.RENAMED, 'foo.py', 'bar.py' ),
                       git_status.parse_line('R  foo.py -> bar.py') )
 
+  def test_parse_porcelain_v2(self):
+    text = '''\
+# branch.oid 0123456789012345678901234567890123456789
+# branch.head master
+# branch.upstream origin/master
+# branch.ab +1 -0
+1 .M N... 100644 100644 100644 aaaa aaaa kiwi.txt
+1 A. N... 000000 100644 100644 0000 bbbb new file.txt
+2 R. N... 100644 100644 100644 cccc cccc R100 bar.py\tfoo.py
+? untracked.txt
+! ignored.txt
+'''
+    self.assertEqual( [
+      ( git_status_action.MODIFIED, 'kiwi.txt', None ),
+      ( git_status_action.ADDED, 'new file.txt', None ),
+      ( git_status_action.RENAMED, 'foo.py', 'bar.py' ),
+      ( git_status_action.UNTRACKED, 'untracked.txt', None ),
+    ], [ item.as_tuple() for item in git_status_list.parse_porcelain_v2(text) ] )
+
 if __name__ == '__main__':
   unit_test.main()
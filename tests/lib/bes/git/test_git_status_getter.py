@@ -51,5 +51,33 @@ add commit2 commit2
       self.assertEqual( False, status.last_commit.is_merge_commit )
       self.assertEqual( ( 0, 0 ), status.branch_status )
     
+  @git_temp_home_func()
+  def test_repo_status_changes_and_ahead(self):
+    config = '''\
+add commit1 commit1
+  kiwi.txt: this is kiwi.txt
+'''
+    r = git_temp_repo(remote = True, debug = self.DEBUG, config = config, prefix = 'status')
+    r.repo.push('origin', 'master')
+    r.repo.write_temp_content([
+      'file lemon.txt "this is lemon.txt" 644',
+    ])
+    r.repo.add([ 'lemon.txt' ])
+    r.repo.commit('add lemon.txt', [ 'lemon.txt' ])
+    r.repo.write_temp_content([
+      'file kiwi.txt "this is kiwi.txt v2" 644',
+      'file orange.txt "this is orange.txt" 644',
+    ])
+    not_a_repo = git_repo(self.make_temp_dir())
+
+    options = git_repo_status_options(show_untracked = True, num_tries = 1)
+    result = dict([ ( item.repo.root, item.status ) for item in git_status_getter.get_status([ r.repo, not_a_repo ], options = options) ])
+    status = result[r.repo.root]
+    self.assertEqual( ( 1, 0 ), status.branch_status )
+    self.assertEqual( 'master', status.active_branch )
+    self.assertEqual( 'add lemon.txt', status.last_commit.message )
+    self.assertEqual( [ ' M kiwi.txt', '?? orange.txt' ], [ str(item) for item in status.change_status ] )
+    self.assertEqual( None, result[not_a_repo.root] )
+
 if __name__ == '__main__':
   unit_test.main()
@@ -117,6 +117,42 @@ class test_check(unit_test):
     check.check__test_check_wine(None, allow_none = True)
     check.check__test_check_wine_seq([ _test_check_wine(), _test_check_wine() ])
     check.check__test_check_wine_seq(None, allow_none = True)
+
+  def test_seq_mode_full(self):
+    with self.assertRaises(TypeError) as context:
+      check.check_string_seq([ 'a' ] * 100 + [ 6 ] + [ 'b' ] * 100)
+
+  def test_seq_mode_sample(self):
+    old_mode = check.get_seq_mode()
+    check.set_seq_mode(check.SEQ_SAMPLE)
+    try:
+      # the sample skips the bad entry
+      check.check_string_seq([ 'a', 6 ] + [ 'b' ] * 200)
+      with self.assertRaises(TypeError) as context:
+        check.check_string_seq([ 'a' ] * 100 + [ 6 ])
+      with self.assertRaises(TypeError) as context:
+        check.check_string_seq([ 'a', 6 ])
+      with self.assertRaises(TypeError) as context:
+        check.check_string_seq(6)
+    finally:
+      check.set_seq_mode(old_mode)
+
+  def test_seq_mode_none(self):
+    old_mode = check.get_seq_mode()
+    check.set_seq_mode(check.SEQ_NONE)
+    try:
+      check.check_string_seq([ 'a', 6 ])
+      check.check_dict({ 'a': 6 }, value_type = check.STRING_TYPES)
+      with self.assertRaises(TypeError) as context:
+        check.check_string_seq(6)
+      with self.assertRaises(TypeError) as context:
+        check.check_string(6)
+    finally:
+      check.set_seq_mode(old_mode)
+
+  def test_set_seq_mode_invalid(self):
+    with self.assertRaises(ValueError) as context:
+      check.set_seq_mode('caca')
     
 if __name__ == '__main__':
   unit_test.main()
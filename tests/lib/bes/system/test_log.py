@@ -298,6 +298,53 @@ class test_log(unit_test):
 (foo.ERROR)  error
 (foo.INFO)  info
 (foo.WARNING)  warning
+'''
+    self.assert_string_equal( expected, rv.output, native_line_breaks = True )
+
+  def test_is_enabled(self):
+    l = logger('test_log_is_enabled')
+    self.assertFalse( l.is_enabled(log.DEBUG) )
+    self.assertTrue( l.is_enabled(log.ERROR) )
+    log.set_tag_level('test_log_is_enabled', log.DEBUG)
+    self.assertTrue( l.is_enabled(log.DEBUG) )
+    self.assertTrue( l.is_debug )
+    log.set_tag_level('test_log_is_enabled', log.DEFAULT_LEVEL)
+    self.assertFalse( l.is_debug )
+
+  def test_is_enabled_pattern(self):
+    log.configure('test_log_pattern_*=debug')
+    self.assertTrue( log.is_enabled('test_log_pattern_kiwi', log.DEBUG) )
+    self.assertFalse( log.is_enabled('test_log_other_kiwi', log.DEBUG) )
+
+  def test_lazy_message_not_formatted_when_disabled(self):
+    l = logger('test_log_lazy')
+    def _message():
+      raise AssertionError('should not be called')
+    l.log_d(_message)
+    l.log_d('{}', self)
+    l.log_method_d()
+
+  @staticmethod
+  def _test_log_func_lazy(args):
+    l = logger('foo')
+    l.configure('format=very_brief')
+    l.log_c(lambda: 'critical')
+    l.log_e('{} is {}', 'kiwi', 'green')
+    l.log_d(lambda: 'debug {}', 42)
+
+  def test_lazy_message(self):
+    rv = self.run_test('foo=error', self._test_log_func_lazy)
+    expected = '''\
+(foo.CRITICAL)  critical
+(foo.ERROR)  kiwi is green
+'''
+    self.assert_string_equal( expected, rv.output, native_line_breaks = True )
+
+    rv = self.run_test('foo=debug', self._test_log_func_lazy)
+    expected = '''\
+(foo.CRITICAL)  critical
+(foo.ERROR)  kiwi is green
+(foo.DEBUG)  debug 42
 '''
     self.assert_string_equal( expected, rv.output, native_line_breaks = True )
 
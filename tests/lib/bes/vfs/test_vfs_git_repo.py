@@ -18,10 +18,10 @@ from bes.git.git_unit_test import git_temp_home_func
 
 class _vfs_git_repo_tester(vfs_tester):
 
-  def __init__(self, fixture, use_lfs, items = None):
+  def __init__(self, fixture, use_lfs, items = None, pull_ttl = None):
     self.config_dir = fixture.make_temp_dir(suffix = '.config.dir')
     self.repo = git_temp_repo(remote = True, content = items, debug = fixture.DEBUG, prefix = '.repo')
-    fs = vfs_git_repo('<unittest>', self.repo.address, self.config_dir, use_lfs)
+    fs = vfs_git_repo('<unittest>', self.repo.address, self.config_dir, use_lfs, pull_ttl = pull_ttl)
     super(_vfs_git_repo_tester, self).__init__(fs)
 
 class test_vfs_git_repo(unit_test):
@@ -444,9 +444,63 @@ foo.txt file 7 ddab29ff2c393ee52855d21a240eb05f775df88e3ce347df759f0c4b80356c35
 '''
     self.assertEqual( expected, t.list_dir('/', False, tester.OPTIONS) )
     
+  @git_temp_home_func()
+  def test_pull_ttl(self):
+    tester = self._make_tester(items = self._TEST_ITEMS, pull_ttl = 3600.0)
+    self.assertFalse( tester.fs.has_file('new.txt') )
+    tester.repo.add_file('new.txt', 'new.txt', push = True)
+    # still within the ttl so the clone is not pulled
+    self.assertFalse( tester.fs.has_file('new.txt') )
+    tester.fs._last_pull_time -= 3600.0
+    self.assertTrue( tester.fs.has_file('new.txt') )
+
+  @git_temp_home_func()
+  def test_no_pull_ttl(self):
+    tester = self._make_tester(items = self._TEST_ITEMS)
+    self.assertFalse( tester.fs.has_file('new.txt') )
+    tester.repo.add_file('new.txt', 'new.txt', push = True)
+    self.assertTrue( tester.fs.has_file('new.txt') )
+
+  @git_temp_home_func()
+  def test_batch(self):
+    tester = self._make_tester(items = self._TEST_ITEMS)
+    tmp_file1 = self.make_temp_file(content = 'kiwi')
+    tmp_file2 = self.make_temp_file(content = 'lemon')
+    with tester.fs.batch():
+      tester.fs.upload_file(tmp_file1, 'kiwi.txt')
+      tester.fs.upload_file(tmp_file2, 'lemon.txt')
+      tester.fs.remove_file('foo.txt')
+    tester.repo.pull()
+    self.assertEqual( 'kiwi', tester.repo.read_file('kiwi.txt') )
+    self.assertEqual( 'lemon', tester.repo.read_file('lemon.txt') )
+    self.assertFalse( tester.repo.has_file('foo.txt') )
+    # all the changes are in one commit
+    last_commit = tester.repo.last_commit_hash()
+    self.assertEqual( [ 'foo.txt', 'kiwi.txt', 'lemon.txt' ], sorted(tester.repo.files_for_commit(last_commit)) )
+    self.assertEqual( 'update 3 files', tester.repo.commit_message(last_commit) )
+
+  @git_temp_home_func()
+  def test_batch_with_error(self):
+    tester = self._make_tester(items = self._TEST_ITEMS)
+    tester.repo.pull()
+    last_commit = tester.repo.last_commit_hash()
+    tmp_file1 = self.make_temp_file(content = 'kiwi')
+    with self.assertRaises(RuntimeError):
+      with tester.fs.batch():
+        tester.fs.upload_file(tmp_file1, 'kiwi.txt')
+        tester.fs.remove_file('foo.txt')
+        raise RuntimeError('failed')
+    tester.repo.pull()
+    self.assertEqual( last_commit, tester.repo.last_commit_hash() )
+    self.assertFalse( tester.repo.has_file('kiwi.txt') )
+    self.assertTrue( tester.repo.has_file('foo.txt') )
+    # the clone is usable after the failed batch
+    self.assertFalse( tester.fs.has_file('kiwi.txt') )
+    self.assertTrue( tester.fs.has_file('foo.txt') )
+
   @classmethod
-  def _make_tester(clazz, use_lfs = False, items = None):
-    return _vfs_git_repo_tester(clazz, use_lfs, items = items)
+  def _make_tester(clazz, use_lfs = False, items = None, pull_ttl = None):
+    return _vfs_git_repo_tester(clazz, use_lfs, items = items, pull_ttl = pull_ttl)
   
   @classmethod
   def _make_tester_with_items(clazz, use_lfs = False):
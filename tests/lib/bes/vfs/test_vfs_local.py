@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 #-*- coding:utf-8; mode:python; indent-tabs-mode: nil; c-basic-offset: 2; tab-width: 2 -*-
 
-import os, pprint, sys
+import os, pprint, sqlite3, sys
 from os import path
 from datetime import datetime
 
@@ -344,6 +344,48 @@ class test_vfs_local(unit_test):
      'foo.txt file 7 sha256:ddab29ff2c393ee52855d21a240eb05f775df88e3ce347df759f0c4b80356c35 p1=hello p2=666\n',
       tester.file_info('foo.txt', tester.OPTIONS) )
 
+  def test_list_dir_recursive_with_attributes(self):
+    root_dir = temp_content.write_items_to_temp_dir(self._TEST_ITEMS, delete = not self.DEBUG)
+    fs = vfs_local('<unittest>', root_dir)
+    fs.set_file_attributes('subdir/bar.txt', { 'p1': 'hello' })
+    attributes = {}
+    def _collect(entries):
+      for entry in entries:
+        if entry.is_file():
+          attributes[entry.filename] = entry.attributes
+        _collect(entry.children or [])
+    _collect(fs.list_dir('/', True, None))
+    self.assertEqual( {
+      'emptyfile.txt': {},
+      'foo.txt': {},
+      'subdir/bar.txt': { 'p1': 'hello' },
+      'subdir/subberdir/baz.txt': {},
+    }, attributes )
+
+  def test_pooled_handles(self):
+    root_dir = temp_content.write_items_to_temp_dir(self._TEST_ITEMS, delete = not self.DEBUG)
+    fs1 = vfs_local('<unittest>', root_dir)
+    fs2 = vfs_local('<unittest>', root_dir)
+    fs1.list_dir('/', True, None)
+    self.assertTrue( fs1._metadata_db() is fs2._metadata_db() )
+    self.assertTrue( fs1._checksum_db() is fs2._checksum_db() )
+
+  def test_clear_pool(self):
+    root_dir = temp_content.write_items_to_temp_dir(self._TEST_ITEMS, delete = not self.DEBUG)
+    fs = vfs_local('<unittest>', root_dir)
+    fs.list_dir('/', True, None)
+    metadata_db = fs._metadata_db()
+    checksum_db = fs._checksum_db()
+    vfs_local.clear_pool()
+    with self.assertRaises(sqlite3.ProgrammingError):
+      metadata_db.get_values('attributes', 'foo.txt')
+    with self.assertRaises(sqlite3.ProgrammingError):
+      checksum_db.get_values_many([ 'foo.txt' ])
+    self.assertFalse( fs._metadata_db() is metadata_db )
+    self.assertFalse( fs._checksum_db() is checksum_db )
+    # the pool makes new handles on demand
+    fs.list_dir('/', True, None)
+
   def test_download_to_file(self):
     tester = self._make_tester()
     tmp_file = self.make_temp_file()